@@ -0,0 +1,45 @@
+"""
+Declared dtypes of the coating-line datasets, shared by `custom.py` and the data
+loaders in `starter/`. Dtypes are given by name, so the mapping can be passed as is
+to `pd.read_csv(dtype=...)`, `DataFrame.astype` and `DatasetArgs.dtypes`.
+"""
+
+LOT_ID = "ロット番号"
+TARGET = "ブリードアウト"
+COATING_LENGTH = "塗布長"
+PRODUCT_TYPE = "種別"
+MACHINE = "号機"
+MATERIAL = "塗布材料"
+
+# Known values, PRODUCT_TYPES in the order of the codes used by `custom.preprocess`
+COATING_LENGTHS = ["30m", "100m", "300m", "500m", "1000m", "1200m", "1500m"]
+PRODUCT_TYPES = ["製造", "試作品", "研究所テスト", "製造部テスト"]
+
+# Low-cardinality strings. Categories are taken from the data rather than fixed
+# here, so values outside the known sets are kept instead of becoming missing.
+CATEGORICAL_COLUMNS = [COATING_LENGTH, PRODUCT_TYPE, MACHINE, MATERIAL]
+SENSOR_COLUMNS = [
+    "コーター部温度",
+    "コーター部相対湿度",
+    "ポンプ圧力",
+    "乾燥ゾーン1温度",
+    "乾燥ゾーン2温度",
+    "UV照度",
+    "チャンバー内O2濃度",
+    "UVロール温度",
+]
+# Whole hours, nullable so missing readings do not turn the column into floats
+COUNTER_COLUMNS = ["ランプ点灯時間"]
+
+DTYPES = {
+    # Fixed 9 characters, "SC" and 7 digits. The pandas string dtype rather than
+    # "string[pyarrow]", which needs pyarrow in the model environment
+    LOT_ID: "string",
+    **{column: "category" for column in CATEGORICAL_COLUMNS},
+    **{column: "float32" for column in SENSOR_COLUMNS},
+    **{column: "Int32" for column in COUNTER_COLUMNS},
+    # Nullable, so rows without an actual yet can still be read
+    TARGET: "boolean",
+}
+# Scoring data, which has no target
+FEATURE_DTYPES = {k: v for k, v in DTYPES.items() if k != TARGET}
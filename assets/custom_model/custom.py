@@ -4,18 +4,317 @@ All rights reserved.
 This is proprietary source code of DataRobot, Inc. and its affiliates.
 Released under the terms of DataRobot Tool and Utility Agreement.
 """
+
+import io
+import json
+import logging
+import os
+import pickle
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
 import pandas as pd
+from coating_schema import (
+    COATING_LENGTH,
+    COATING_LENGTHS,
+    FEATURE_DTYPES,
+    LOT_ID,
+    MACHINE,
+    MATERIAL,
+    PRODUCT_TYPE,
+    PRODUCT_TYPES,
+    TARGET,
+)
+from model_artifact import (
+    ARTIFACT_DIR_NAME,
+    converted_from,
+    load_forest,
+    read_manifest,
+)
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILE_NAME = "clf_0.pkl"
+IMPUTATION_VALUES_FILE_NAME = "imputation_values.json"
+# Encoded categorical features are imputed with the mode, numeric ones with the median
+MODE_IMPUTED_FEATURES = ["塗布長", "種別"]
+# Feature order of clf_0.pkl, used when the model does not record its feature names
+FEATURE_NAMES = [
+    "塗布長",
+    "種別",
+    "コーター部温度",
+    "コーター部相対湿度",
+    "ポンプ圧力",
+    "乾燥ゾーン1温度",
+    "乾燥ゾーン2温度",
+    "UV照度",
+    "ランプ点灯時間",
+    "チャンバー内O2濃度",
+    "UVロール温度",
+]
+
+# Codes of the categorical features, `preprocess` encodes them the same way
+CATEGORY_MAPS = {
+    "塗布長": {length: int(length[:-1]) for length in COATING_LENGTHS},
+    "種別": {product_type: code for code, product_type in enumerate(PRODUCT_TYPES)},
+}
+
+# Rows of the synthetic batch scored by `load_model`, 0 skips the warmup
+WARMUP_ROWS_ENV = "CUSTOM_MODEL_WARMUP_ROWS"
+DEFAULT_WARMUP_ROWS = 64
+
+# Populated once by `load_model`
+_preprocessor: Optional["Preprocessor"] = None
+# Set by `load_model` once the model can serve, see `readiness`
+_readiness: Optional[Dict[str, Any]] = None
+
 
 def preprocess(df: pd.DataFrame) -> pd.DataFrame:
-    if 'ロット番号' in df.columns:
-        df = df.drop(columns=["ロット番号"])
+    if LOT_ID in df.columns:
+        df = df.drop(columns=[LOT_ID])
     df["塗布長"] = df["塗布長"].str[:-1].astype(int)
-    df = df.drop(columns=["号機"])
-    seizou_dict = {'製造': 0, '試作品': 1, '研究所テスト': 2, '製造部テスト': 3}
+    df = df.drop(columns=[MACHINE])
+    seizou_dict = {"製造": 0, "試作品": 1, "研究所テスト": 2, "製造部テスト": 3}
     df["種別"] = df["種別"].map(seizou_dict)
     return df
 
-def transform(data, model):
+
+class Preprocessor:
+    """
+    Vectorized equivalent of `preprocess` followed by imputation, built once at model load.
+    Categorical columns are encoded through fixed category sets and lookup tables, and every
+    feature is written straight into a single float32 block in model feature order, which
+    drops all other columns in one projection.
+    Parameters
+    ----------
+    feature_names: list of str, model input columns in order
+    imputation_values: dict or None, fit-time values used to fill missing entries
+    category_maps: dict or None, codes by category of each categorical feature
+    """
+
+    def __init__(
+        self,
+        feature_names: Any,
+        imputation_values: Optional[Dict[str, Any]] = None,
+        category_maps: Optional[Dict[str, Dict[str, int]]] = None,
+    ) -> None:
+        self.feature_names = list(feature_names)
+        self.imputation_values = imputation_values
+        # Unknown categories get code -1, which indexes the trailing NaN of each table
+        self.lookups = {
+            column: (
+                pd.CategoricalDtype(list(codes)),
+                np.array(list(codes.values()) + [np.nan], np.float32),
+            )
+            for column, codes in (category_maps or CATEGORY_MAPS).items()
+        }
+        self.fill_row: Optional[np.ndarray] = None
+        if imputation_values is not None:
+            self.fill_row = np.array(
+                [imputation_values.get(c, np.nan) for c in self.feature_names],
+                dtype=np.float32,
+            )
+
+    def encode(self, column: str, values: pd.Series, out: np.ndarray) -> None:
+        dtype, table = self.lookups[column]
+        # Categories are resolved once per distinct value, rows only go through
+        # integer lookups. Missing values get code -1 from factorize.
+        codes, uniques = pd.factorize(values)
+        lut = table.take(pd.Categorical(uniques, dtype=dtype).codes)
+        if column == "塗布長":
+            # Lengths outside the known set are still parsed
+            unknown = np.isnan(lut)
+            if unknown.any():
+                lut[unknown] = pd.to_numeric(
+                    pd.Series(uniques[unknown]).astype(str).str[:-1], errors="coerce"
+                )
+        np.take(np.append(lut, np.float32(np.nan)), codes, out=out)
+
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        # Column-major so each feature is written contiguously and pandas wraps the
+        # block without copying it
+        out = np.empty((len(df), len(self.feature_names)), dtype=np.float32, order="F")
+        for i, column in enumerate(self.feature_names):
+            if column in self.lookups:
+                self.encode(column, df[column], out[:, i])
+            else:
+                out[:, i] = df[column].to_numpy(dtype=np.float32, na_value=np.nan)
+        if self.fill_row is not None:
+            np.copyto(out, self.fill_row, where=np.isnan(out))
+        return pd.DataFrame(out, columns=self.feature_names, copy=False)
+
+
+def read_input_data(input_binary_data: bytes) -> pd.DataFrame:
+    """
+    Parse a CSV scoring payload with the declared dtypes instead of inferring them.
+    Parameters
+    ----------
+    input_binary_data: bytes, request body or batch file sent to the model
+    Returns
+    -------
+    pd.DataFrame
+    """
+    return pd.read_csv(io.BytesIO(input_binary_data), dtype=FEATURE_DTYPES)
+
+
+def fit_imputation_values(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Compute per-column imputation values from a training dataset.
+    Parameters
+    ----------
+    df: pd.DataFrame, raw training data in the scoring input layout
+    Returns
+    -------
+    dict mapping each feature to the value used to fill its missing entries
+    """
+    df = preprocess(df.drop(columns=[TARGET], errors="ignore"))
+    values = {}
+    for column in df.columns:
+        if column in MODE_IMPUTED_FEATURES:
+            value = df[column].mode().iloc[0]
+        else:
+            value = df[column].median()
+        values[column] = value.item() if hasattr(value, "item") else value
+    return values
+
+
+def load_imputation_values(code_dir: str) -> Optional[Dict[str, Any]]:
+    path = os.path.join(code_dir, IMPUTATION_VALUES_FILE_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        values: Dict[str, Any] = json.load(f)
+    return values
+
+
+def load_artifact_manifest(code_dir: str) -> Optional[Dict[str, Any]]:
+    """
+    Manifest of the compact model artifact, None when it is missing or was not
+    converted from the shipped pickle.
+    """
+    artifact_dir = os.path.join(code_dir, ARTIFACT_DIR_NAME)
+    if not os.path.isdir(artifact_dir):
+        return None
+    manifest = read_manifest(artifact_dir)
+    model_path = os.path.join(code_dir, MODEL_FILE_NAME)
+    if os.path.exists(model_path) and not converted_from(manifest, model_path):
+        logger.warning(
+            "%s is stale, loading %s instead", ARTIFACT_DIR_NAME, MODEL_FILE_NAME
+        )
+        return None
+    return manifest
+
+
+def load_model(code_dir: str) -> Any:
+    """
+    Load the model and the fit-time artifacts shipped next to it. The compact
+    artifact is memory-mapped when it matches clf_0.pkl, which is unpickled otherwise.
+    Parameters
+    ----------
+    code_dir: str, directory the custom model folder was unpacked to
+    Returns
+    -------
+    object, the deserialized model
+    """
+    global _preprocessor, _readiness
+    _readiness = None
+    start = time.perf_counter()
+    manifest = load_artifact_manifest(code_dir)
+    model: Any
+    if manifest is not None:
+        model = load_forest(os.path.join(code_dir, ARTIFACT_DIR_NAME), manifest)
+        _preprocessor = build_preprocessor(
+            model, manifest["imputation_values"], manifest["category_maps"]
+        )
+    else:
+        with open(os.path.join(code_dir, MODEL_FILE_NAME), "rb") as f:
+            model = pickle.load(f)
+        _preprocessor = build_preprocessor(model, load_imputation_values(code_dir))
+    loaded = time.perf_counter()
+    rows = warmup_rows()
+    if rows > 0:
+        warmup(model, rows)
+    _readiness = {
+        "model": type(model).__name__,
+        "load_ms": (loaded - start) * 1e3,
+        "warmup_rows": rows,
+        "warmup_ms": (time.perf_counter() - loaded) * 1e3,
+    }
+    return model
+
+
+def warmup_rows() -> int:
+    return int(os.environ.get(WARMUP_ROWS_ENV, DEFAULT_WARMUP_ROWS))
+
+
+def synthetic_batch(rows: int) -> pd.DataFrame:
+    """
+    Scoring input covering every known category, with the fit-time values, or
+    zeros without them, in the numeric columns.
+    Parameters
+    ----------
+    rows: int, number of rows
+    Returns
+    -------
+    pd.DataFrame in the raw scoring input layout
+    """
+    imputation_values = (_preprocessor and _preprocessor.imputation_values) or {}
+    data: Dict[str, Any] = {}
+    for column in FEATURE_DTYPES:
+        if column == LOT_ID:
+            values = [f"SC{i:07d}" for i in range(rows)]
+        elif column == COATING_LENGTH:
+            values = [COATING_LENGTHS[i % len(COATING_LENGTHS)] for i in range(rows)]
+        elif column == PRODUCT_TYPE:
+            values = [PRODUCT_TYPES[i % len(PRODUCT_TYPES)] for i in range(rows)]
+        elif column in (MACHINE, MATERIAL):
+            values = ["warmup"] * rows
+        else:
+            values = [imputation_values.get(column, 0)] * rows
+        data[column] = values
+    return pd.DataFrame(data)
+
+
+def warmup(model: Any, rows: int = DEFAULT_WARMUP_ROWS) -> None:
+    """
+    Score a synthetic batch through the request path, CSV parsing, `transform` and
+    `predict_proba`, so the first request does not pay for lazy imports and
+    first-call initialization in pandas, pyarrow and numpy.
+    Parameters
+    ----------
+    model: object, the deserialized model
+    rows: int, rows of the synthetic batch
+    """
+    # Also the single-row path most online requests take
+    for size in (rows, 1):
+        body = synthetic_batch(size).to_csv(index=False).encode()
+        model.predict_proba(transform(read_input_data(body), model))
+
+
+def readiness() -> Optional[Dict[str, Any]]:
+    """
+    Load and warmup timings of the model, None until `load_model` has finished.
+    Returns
+    -------
+    dict or None
+    """
+    return _readiness
+
+
+def build_preprocessor(
+    model: Any,
+    imputation_values: Optional[Dict[str, Any]] = None,
+    category_maps: Optional[Dict[str, Dict[str, int]]] = None,
+) -> Preprocessor:
+    return Preprocessor(
+        getattr(model, "feature_names_in_", FEATURE_NAMES),
+        imputation_values,
+        category_maps,
+    )
+
+
+def transform(data: pd.DataFrame, model: Any) -> pd.DataFrame:
     """
     Note: This hook may not have to be implemented for your model.
     In this case implemented for the model used in the example.
@@ -31,6 +330,27 @@ def transform(data, model):
     """
     # Execute any steps you need to do before scoring
     # Remove target columns if they're in the dataset
-    data = preprocess(data)
-    data = data.fillna(data.mode().iloc[0])
-    return data
\ No newline at end of file
+    global _preprocessor
+    if _preprocessor is None:
+        _preprocessor = build_preprocessor(model)
+    data = _preprocessor(data)
+    if _preprocessor.fill_row is None:
+        # No fit-time statistics were shipped, fall back to the batch mode
+        data = data.fillna(data.mode().iloc[0])
+    return data
+
+
+def score(data: pd.DataFrame, model: Any, **kwargs: Any) -> pd.DataFrame:
+    """
+    Score the transformed data. Required since the compact artifact is not an sklearn
+    model DRUM knows how to call.
+    Parameters
+    ----------
+    data: pd.DataFrame, output of `transform`
+    model: object, the deserialized model
+    Returns
+    -------
+    pd.DataFrame with a probability column per class label
+    """
+    probabilities = model.predict_proba(data)
+    return pd.DataFrame(probabilities, columns=[str(c) for c in model.classes_])
@@ -0,0 +1,293 @@
+"""
+Copyright 2021 DataRobot, Inc. and its affiliates.
+All rights reserved.
+This is proprietary source code of DataRobot, Inc. and its affiliates.
+Released under the terms of DataRobot Tool and Utility Agreement.
+
+Compact, versioned artifact of the tree ensemble in `clf_0.pkl`.
+
+    clf_0.model/
+        manifest.json  format version, features, dtypes, imputation values,
+                       category maps, classes and the layout of arrays.bin
+        arrays.bin     node arrays of all trees, 64-byte aligned little endian
+
+Loading reads the manifest and memory-maps `arrays.bin`, neither unpickling nor
+importing sklearn, and workers forked or started on the same host share the pages.
+Only the converter needs the fitted sklearn model.
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+ARTIFACT_DIR_NAME = "clf_0.model"
+MANIFEST_FILE_NAME = "manifest.json"
+ARRAYS_FILE_NAME = "arrays.bin"
+FORMAT_NAME = "tree-ensemble"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+# Rows scored at a time, the node indices of all trees take a few MB per chunk
+PREDICT_CHUNK_ROWS = 8192
+# Bytes hashed at a time
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def converted_from(manifest: Dict[str, Any], model_path: str) -> bool:
+    """
+    Whether the artifact was converted from the pickle at `model_path`. Retrained
+    forests with the same hyperparameters pickle to the same size, so the hash is
+    compared too, it reads the pickle in a fraction of a millisecond.
+    Parameters
+    ----------
+    manifest: dict, contents of manifest.json
+    model_path: str, path of the pickle
+    """
+    if os.path.getsize(model_path) != manifest.get("source_size"):
+        return False
+    return file_sha256(model_path) == manifest.get("source_sha256")
+
+
+class CompactForest:
+    """
+    Probability-averaging tree ensemble equivalent to the sklearn forest it was
+    converted from. Node arrays hold every tree, children are global node indices
+    and leaves point to themselves, so the rows of a chunk descend all trees in
+    lockstep and memory stays bounded by the chunk size.
+    Parameters
+    ----------
+    manifest: dict, contents of manifest.json
+    arrays: dict of np.ndarray, node arrays, possibly memory-mapped
+    """
+
+    def __init__(self, manifest: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> None:
+        self.manifest = manifest
+        self.feature_names_in_ = np.array(manifest["feature_names"], dtype=object)
+        self.n_features_in_ = len(manifest["feature_names"])
+        self.classes_ = np.array(manifest["classes"])
+        self.max_depth = manifest["max_depth"]
+        self.roots = arrays["roots"]
+        self.children_left = arrays["children_left"]
+        self.children_right = arrays["children_right"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.missing_go_to_left = arrays["missing_go_to_left"]
+        self.value = arrays["value"]
+        # Scoring tables, small next to the input. Inputs are widened to twice the
+        # features, missing values as +inf then as -inf, and each node reads the
+        # copy that sends them its missing_go_to_left way.
+        self._column = (
+            self.feature + self.n_features_in_ * self.missing_go_to_left
+        ).astype(np.intp)
+        # Rounded down, float32 inputs compare against them as sklearn compares
+        # them against the float64 thresholds
+        threshold = self.threshold.astype(np.float32)
+        self._threshold = np.where(
+            threshold > self.threshold,
+            np.nextafter(threshold, np.float32(-np.inf)),
+            threshold,
+        )
+        self._left = self.children_left.astype(np.intp)
+        self._right = self.children_right.astype(np.intp)
+        self._roots = self.roots.astype(np.intp)
+        self._class_values = [
+            np.ascontiguousarray(self.value[:, k]) for k in range(self.value.shape[1])
+        ]
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        probabilities = np.empty((len(X), len(self._class_values)))
+        for start in range(0, len(X), PREDICT_CHUNK_ROWS):
+            stop = start + PREDICT_CHUNK_ROWS
+            self._predict_chunk(X[start:stop], probabilities[start:stop])
+        probabilities /= len(self.roots)
+        return probabilities
+
+    def _predict_chunk(self, X: np.ndarray, out: np.ndarray) -> None:
+        # `transform` returns column-major frames, rows are gathered from a copy
+        X = np.ascontiguousarray(X)
+        missing = np.isnan(X)
+        inputs = np.concatenate(
+            [
+                np.where(missing, np.float32(np.inf), X),
+                np.where(missing, np.float32(-np.inf), X),
+            ],
+            axis=1,
+        )
+        # Every row starts at the roots, whose splits read one column per tree
+        roots = self._roots[:, np.newaxis]
+        nodes = np.where(
+            inputs.T.take(self._column[self._roots], axis=0) <= self._threshold[roots],
+            self._left[roots],
+            self._right[roots],
+        )
+        flat = inputs.ravel()
+        offsets = np.arange(len(X), dtype=np.intp) * inputs.shape[1]
+        for _ in range(self.max_depth - 1):
+            go_left = flat.take(offsets + self._column.take(nodes)) <= (
+                self._threshold.take(nodes)
+            )
+            nodes = np.where(go_left, self._left.take(nodes), self._right.take(nodes))
+        for k, values in enumerate(self._class_values):
+            out[:, k] = values.take(nodes).sum(axis=0)
+
+    def predict(self, X: Any) -> np.ndarray:
+        classes: np.ndarray = self.classes_.take(self.predict_proba(X).argmax(axis=1))
+        return classes
+
+
+def forest_arrays(model: Any) -> Dict[str, np.ndarray]:
+    """
+    Flatten the trees of a fitted sklearn forest classifier into node arrays.
+    Parameters
+    ----------
+    model: sklearn.ensemble.RandomForestClassifier or ExtraTreesClassifier
+    Returns
+    -------
+    dict of np.ndarray, the arrays of `CompactForest`
+    """
+    roots, left, right, feature, threshold, missing_left, value = ([] for _ in range(7))
+    offset = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        local = np.arange(n_nodes)
+        is_leaf = tree.children_left == -1
+        roots.append(offset)
+        left.append(offset + np.where(is_leaf, local, tree.children_left))
+        right.append(offset + np.where(is_leaf, local, tree.children_right))
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(tree.threshold)
+        missing_left.append(
+            getattr(tree, "missing_go_to_left", np.zeros(n_nodes, dtype=np.uint8))
+        )
+        # Single output, class weights per leaf normalized to probabilities
+        counts = tree.value[:, 0, :]
+        totals = counts.sum(axis=1, keepdims=True)
+        value.append(counts / np.where(totals == 0, 1, totals))
+        offset += n_nodes
+    return {
+        "roots": np.array(roots, dtype="<i4"),
+        "children_left": np.concatenate(left).astype("<i4"),
+        "children_right": np.concatenate(right).astype("<i4"),
+        "feature": np.concatenate(feature).astype("<i4"),
+        "threshold": np.concatenate(threshold).astype("<f8"),
+        "missing_go_to_left": np.concatenate(missing_left).astype(bool),
+        "value": np.concatenate(value).astype("<f8"),
+    }
+
+
+def save_forest(
+    model: Any,
+    artifact_dir: str,
+    feature_names: Sequence[str],
+    feature_dtypes: Optional[Dict[str, str]] = None,
+    imputation_values: Optional[Dict[str, Any]] = None,
+    category_maps: Optional[Dict[str, Dict[str, int]]] = None,
+    source_path: Optional[str] = None,
+) -> str:
+    """
+    Write the artifact of a fitted forest, replacing an existing one.
+    Parameters
+    ----------
+    model: fitted sklearn forest classifier with a single output
+    artifact_dir: str, directory to write manifest.json and arrays.bin to
+    feature_names: list of str, model input columns in order
+    feature_dtypes: dict or None, dtypes of the scoring input columns
+    imputation_values: dict or None, fit-time values used to fill missing entries
+    category_maps: dict or None, codes of the categorical features by category
+    source_path: str or None, pickle the model was loaded from, see `converted_from`
+    Returns
+    -------
+    str, path of the manifest
+    """
+    arrays = forest_arrays(model)
+    layout: Dict[str, Dict[str, Any]] = {}
+    os.makedirs(artifact_dir, exist_ok=True)
+    tmp_suffix = f".{os.getpid()}.tmp"
+    arrays_path = os.path.join(artifact_dir, ARRAYS_FILE_NAME)
+    with open(arrays_path + tmp_suffix, "wb") as f:
+        for name, array in arrays.items():
+            f.write(b"\0" * (-f.tell() % ALIGNMENT))
+            layout[name] = {
+                "offset": f.tell(),
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+            }
+            f.write(np.ascontiguousarray(array).tobytes())
+    manifest = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "model_type": type(model).__name__,
+        "source_sha256": None if source_path is None else file_sha256(source_path),
+        "source_size": None if source_path is None else os.path.getsize(source_path),
+        "feature_names": list(feature_names),
+        # The model scores float32 features, these are the raw scoring columns
+        "feature_dtypes": dict(feature_dtypes or {}),
+        "imputation_values": imputation_values,
+        "category_maps": category_maps,
+        "classes": np.asarray(model.classes_).tolist(),
+        "n_trees": len(arrays["roots"]),
+        "max_depth": max(e.tree_.max_depth for e in model.estimators_),
+        "arrays": layout,
+    }
+    manifest_path = os.path.join(artifact_dir, MANIFEST_FILE_NAME)
+    with open(manifest_path + tmp_suffix, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    # The manifest goes last, it is only replaced once arrays.bin is complete
+    os.replace(arrays_path + tmp_suffix, arrays_path)
+    os.replace(manifest_path + tmp_suffix, manifest_path)
+    return manifest_path
+
+
+def read_manifest(artifact_dir: str) -> Dict[str, Any]:
+    with open(os.path.join(artifact_dir, MANIFEST_FILE_NAME), encoding="utf-8") as f:
+        manifest: Dict[str, Any] = json.load(f)
+    if (
+        manifest.get("format") != FORMAT_NAME
+        or manifest.get("version") != FORMAT_VERSION
+    ):
+        raise ValueError(
+            f"Unsupported model artifact {manifest.get('format')} "
+            f"v{manifest.get('version')} in {artifact_dir}, "
+            f"expected {FORMAT_NAME} v{FORMAT_VERSION}. "
+            "Rebuild it with `python -m starter.custom_model`."
+        )
+    return manifest
+
+
+def load_forest(
+    artifact_dir: str, manifest: Optional[Dict[str, Any]] = None
+) -> CompactForest:
+    """
+    Load an artifact written by `save_forest` with memory-mapped node arrays.
+    Parameters
+    ----------
+    artifact_dir: str, directory of manifest.json and arrays.bin
+    manifest: dict or None, already read manifest
+    Returns
+    -------
+    CompactForest
+    """
+    manifest = manifest or read_manifest(artifact_dir)
+    buffer = np.memmap(os.path.join(artifact_dir, ARRAYS_FILE_NAME), mode="r")
+    arrays = {}
+    for name, spec in manifest["arrays"].items():
+        shape = tuple(spec["shape"])
+        arrays[name] = np.frombuffer(
+            buffer,
+            dtype=np.dtype(spec["dtype"]),
+            count=int(np.prod(shape)),
+            offset=spec["offset"],
+        ).reshape(shape)
+    return CompactForest(manifest, arrays)
@@ -0,0 +1,86 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Joining a batch of actuals, indexed store vs re-merging all predictions.
+
+- merge: `pd.merge` of every stored prediction with the actuals, then LogLoss
+  per day
+- indexed: `AccuracyStore.join_actuals` on a store of the same predictions, then
+  its report
+
+    python -m benchmarks.bench_accuracy --predictions 5000000 --actuals 100000
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(".")
+
+from starter.accuracy import AccuracyStore
+from starter.drift_data import format_lot_ids
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--predictions", type=int, default=5_000_000)
+    parser.add_argument("--actuals", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    predictions = pd.DataFrame(
+        {
+            "ロット番号": format_lot_ids(10000, args.predictions),
+            "probability": rng.random(args.predictions),
+            "date_col": np.datetime64("2025-03-10")
+            + rng.integers(0, 14, args.predictions),
+        }
+    )
+    sample = rng.choice(args.predictions, args.actuals, replace=False)
+    actuals = pd.DataFrame(
+        {
+            "ロット番号": predictions["ロット番号"].to_numpy()[sample],
+            "ブリードアウト": rng.random(args.actuals) < 0.2,
+        }
+    )
+    print(f"{args.actuals} actuals joined to {args.predictions} predictions")
+    print(f"{'mode':>8} {'time [s]':>9}")
+
+    start = time.perf_counter()
+    joined = predictions.merge(actuals, on="ロット番号")
+    p = joined["probability"].clip(1e-15, 1 - 1e-15)
+    y = joined["ブリードアウト"]
+    log_loss = pd.Series(-np.where(y, np.log(p), np.log1p(-p)))
+    log_loss.groupby(joined["date_col"]).mean()
+    print(f"{'merge':>8} {time.perf_counter() - start:>9.3f}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = AccuracyStore(tmp_dir)
+        store.add_predictions(
+            predictions["ロット番号"],
+            predictions["probability"],
+            days=predictions["date_col"],
+        )
+        start = time.perf_counter()
+        store.join_actuals(actuals["ロット番号"], actuals["ブリードアウト"])
+        store.report()
+        print(f"{'indexed':>8} {time.perf_counter() - start:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
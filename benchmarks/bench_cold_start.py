@@ -0,0 +1,144 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""First-request latency of a freshly started model server, without and with warmup.
+
+Each run starts `starter.scoring_server` in a new process, as a deployment with
+`min_computes=0` does when a request arrives after idling. It reports the time
+until the port is open, until `/ready` and to the first response, next to the
+latency of the requests that follow. The cold runs set CUSTOM_MODEL_WARMUP_ROWS=0.
+
+    python -m benchmarks.bench_cold_start --repeat 5 --rows 1
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.append(".")
+
+from starter.paths import PROJECT_ROOT, custom_model_dir
+
+
+def post(url: str, body: bytes) -> float:
+    start = time.perf_counter()
+    request = urllib.request.Request(
+        url, data=body, headers={"Content-Type": "text/csv"}
+    )
+    with urllib.request.urlopen(request) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def wait_ready(url: str, timeout: float = 120.0) -> Dict[str, Any]:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url) as response:
+                ready: Dict[str, Any] = json.loads(response.read())
+                return ready
+        except urllib.error.HTTPError as e:
+            if e.code != 503:
+                raise
+        time.sleep(0.005)
+    raise TimeoutError(f"{url} was not ready after {timeout}s")
+
+
+def start_and_score(
+    code_dir: Path, body: bytes, warmup_rows: int, requests: int
+) -> Dict[str, float]:
+    env = {**os.environ, "CUSTOM_MODEL_WARMUP_ROWS": str(warmup_rows)}
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "starter.scoring_server",
+            "--port",
+            "0",
+            "--code-dir",
+            str(code_dir),
+        ],
+        cwd=PROJECT_ROOT,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    try:
+        assert server.stdout is not None
+        url = server.stdout.readline().strip().rsplit(" ", 1)[-1]
+        listening = time.perf_counter()
+        wait_ready(f"{url}/ready")
+        ready = time.perf_counter()
+        first = post(f"{url}/predict", body)
+        following = [post(f"{url}/predict", body) for _ in range(requests)]
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        "listen_sec": listening - start,
+        "ready_sec": ready - start,
+        "first_ms": first * 1e3,
+        "to_first_response_sec": ready - start + first,
+        "following_ms": statistics.median(following) * 1e3,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--warmup-rows", type=int, default=64)
+    parser.add_argument("--code-dir", type=Path, default=custom_model_dir)
+    parser.add_argument(
+        "--data", type=Path, default=PROJECT_ROOT / "assets" / "prediction_data.csv"
+    )
+    args = parser.parse_args()
+
+    with open(args.data, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    body = "\n".join(lines[: args.rows + 1]).encode() + b"\n"
+
+    print(
+        f"{'mode':>5} {'listen [s]':>11} {'ready [s]':>10} {'first [ms]':>11} "
+        f"{'next [ms]':>10} {'to first response [s]':>22}"
+    )
+    for mode, warmup_rows in (("cold", 0), ("warm", args.warmup_rows)):
+        runs: List[Dict[str, float]] = [
+            start_and_score(args.code_dir, body, warmup_rows, args.requests)
+            for _ in range(args.repeat)
+        ]
+
+        def median(key: str) -> float:
+            return statistics.median(run[key] for run in runs)
+
+        print(
+            f"{mode:>5} {median('listen_sec'):>11.2f} {median('ready_sec'):>10.2f} "
+            f"{median('first_ms'):>11.1f} {median('following_ms'):>10.1f} "
+            f"{median('to_first_response_sec'):>22.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Reading a prediction dataset, `pd.read_csv` vs `starter.dataset_io`.
+
+- read_csv: parse the whole CSV file
+- convert: first `read_dataset` of the CSV file, including the Arrow IPC copy
+- cached: later `read_dataset` of the same file, memory-mapped
+- projected: cached read of the date and lot number columns only
+- parquet: `read_dataset` of the same data as Parquet
+
+    python -m benchmarks.bench_dataset_io --rows 2000000
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+import pandas as pd
+
+sys.path.append(".")
+
+from starter import dataset_io
+from starter.drift_data import DriftScenario, write_scenario
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    scenario = DriftScenario(days=10, rows_per_day=args.rows // 10)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        dataset_io.columnar_cache_dir = Path(tmp_dir) / "columnar"
+        csv_path = Path(tmp_dir) / "prediction_data.csv"
+        parquet_path = Path(tmp_dir) / "prediction_data.parquet"
+        write_scenario(scenario, csv_path)
+        write_scenario(scenario, parquet_path)
+        size_mb = csv_path.stat().st_size / 2**20
+        print(f"{scenario.rows} rows, {size_mb:.0f} MB CSV")
+        print(f"{'mode':>10} {'time [s]':>9}")
+
+        runs: List[Tuple[str, Callable[[], pd.DataFrame]]] = [
+            ("read_csv", lambda: pd.read_csv(csv_path)),
+            ("convert", lambda: dataset_io.read_dataset(csv_path)),
+            ("cached", lambda: dataset_io.read_dataset(csv_path)),
+            (
+                "projected",
+                lambda: dataset_io.read_dataset(
+                    csv_path, columns=["date_col", "ロット番号"]
+                ),
+            ),
+            ("parquet", lambda: dataset_io.read_dataset(parquet_path)),
+        ]
+        for mode, read in runs:
+            start = time.perf_counter()
+            read()
+            print(f"{mode:>10} {time.perf_counter() - start:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
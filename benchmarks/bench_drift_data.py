@@ -0,0 +1,103 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Drift data generation, notebook loops vs `starter.drift_data`.
+
+- notebook: per-day `df.sample`, per-row lot number loop and per-date label flips
+  over filtered frames, as in `notebooks/create_precdiction_data.ipynb`
+- vectorized: `iter_scenario_chunks`, then `write_scenario` to CSV and Parquet
+
+    python -m benchmarks.bench_drift_data --rows 10000000
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(".")
+
+from starter.drift_data import (
+    DriftScenario,
+    iter_scenario_chunks,
+    load_base_data,
+    write_scenario,
+)
+
+
+def notebook_style(scenario: DriftScenario, base: pd.DataFrame) -> pd.DataFrame:
+    dates = scenario.dates()
+    flip_rates = scenario.day_values(scenario.label_flip_rates)
+    frames = []
+    for i, date in enumerate(dates):
+        sample = base.sample(n=scenario.rows_per_day, replace=True, random_state=i)
+        sample["date_col"] = date
+        frames.append(sample)
+    data = pd.concat(frames)
+
+    lot_num = []
+    init_num = scenario.lot_start
+    for _ in range(data.shape[0]):
+        lot_num.append(f"SC{str(init_num).zfill(7)}")
+        init_num += 1
+    data["ロット番号"] = lot_num
+
+    bleedout = []
+    for i, date in enumerate(data["date_col"].unique()):
+        labels = data[data["date_col"] == date]["ブリードアウト"].to_numpy()
+        labels = np.logical_or(labels, np.random.rand(len(labels)) < flip_rates[i])
+        bleedout.extend(labels.tolist())
+    data["ブリードアウト"] = bleedout
+    return data
+
+
+def vectorized(scenario: DriftScenario, base: pd.DataFrame) -> None:
+    for _ in iter_scenario_chunks(scenario, base):
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--csv", action="store_true", help="Also time CSV output")
+    args = parser.parse_args()
+
+    base = load_base_data()
+    scenario = DriftScenario(days=args.days, rows_per_day=args.rows // args.days)
+    print(f"{scenario.rows} rows over {scenario.days} days")
+    print(f"{'step':>18} {'time [s]':>9} {'rows/s':>12}")
+
+    def report(step: str, elapsed: float) -> None:
+        print(f"{step:>18} {elapsed:>9.2f} {scenario.rows / elapsed:>12,.0f}")
+
+    for step, generate in (("notebook", notebook_style), ("vectorized", vectorized)):
+        start = time.perf_counter()
+        generate(scenario, base)
+        report(step, time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        suffixes = [".parquet", ".csv"] if args.csv else [".parquet"]
+        for suffix in suffixes:
+            start = time.perf_counter()
+            write_scenario(scenario, Path(tmp_dir) / f"drift{suffix}", base=base)
+            report(f"vectorized{suffix}", time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-call cost of `starter.i18n.gettext`.
+
+Compares resolving the locale and catalog on every message, as `gettext` used
+to, against the cached translation registry.
+
+    python -m benchmarks.bench_i18n --locale ja_JP --calls 1000
+"""
+
+import argparse
+import gettext as gettext_module
+import os
+import sys
+import time
+from typing import Callable
+
+sys.path.append(".")
+
+from starter import i18n
+from starter.i18n import LanguageCode, LocaleSettings, app_locale_env_name
+
+MESSAGE = "Submit"
+
+
+def uncached_gettext(message: str) -> str:
+    if LocaleSettings().app_locale == LanguageCode.EN:
+        ctx = gettext_module.NullTranslations()
+    else:
+        ctx = gettext_module.translation(
+            "base",
+            localedir=LocaleSettings().get_locale_dir(),
+            languages=[LocaleSettings().app_locale],
+            fallback=True,
+        )
+    return ctx.gettext(message)
+
+
+def time_per_call(gettext: Callable[[str], str], calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        gettext(MESSAGE)
+    return (time.perf_counter() - start) / calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--locale", choices=[locale.value for locale in LanguageCode], default="ja_JP"
+    )
+    parser.add_argument("--calls", type=int, default=1000)
+    args = parser.parse_args()
+
+    os.environ[app_locale_env_name] = args.locale
+    LocaleSettings().setup_locale()
+    # First call loads the catalog
+    i18n.gettext(MESSAGE)
+
+    uncached = time_per_call(uncached_gettext, args.calls)
+    cached = time_per_call(i18n.gettext, args.calls)
+    print(f"{'locale':>8} {'uncached [us]':>14} {'cached [us]':>12} {'speedup':>8}")
+    print(
+        f"{args.locale:>8} {uncached * 1e6:>14.2f} {cached * 1e6:>12.3f} "
+        f"{uncached / cached:>7.0f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Import time of app-facing modules, parsed from `python -X importtime`.
+
+Every module is imported in a fresh interpreter, the best of `--repeat` runs is
+reported with the slowest imports it pulled in by their own time.
+
+    python -m benchmarks.bench_import_time starter.api starter.schema
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+sys.path.append(".")
+
+from starter.paths import PROJECT_ROOT
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)\s*$")
+
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """Self and cumulative microseconds of every module in `-X importtime` output"""
+    times = {}
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, _, module = match.groups()
+            times[module] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def import_times(module: str) -> Dict[str, Tuple[int, int]]:
+    """Import `module` in a fresh interpreter from the project root"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def best_import_time(module: str, repeat: int = 3) -> Dict[str, Tuple[int, int]]:
+    """The run with the lowest cumulative time of `module`, as the least disturbed"""
+    runs = [import_times(module) for _ in range(repeat)]
+    return min(runs, key=lambda times: times[module][1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=["starter.api"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'module':>32} {'cumulative [ms]':>16} {'modules':>8}")
+    slowest: List[Tuple[str, str, int]] = []
+    for module in args.modules:
+        times = best_import_time(module, args.repeat)
+        print(f"{module:>32} {times[module][1] / 1000:>16.1f} {len(times):>8}")
+        slowest += [(module, name, t[0]) for name, t in times.items()]
+    print()
+    print(f"{'imported by':>32} {'module':>32} {'self [ms]':>10}")
+    for module, name, self_us in sorted(slowest, key=lambda s: -s[2])[: args.top]:
+        print(f"{module:>32} {name:>32} {self_us / 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Peak memory of dataset ingestion, whole file vs chunked.
+
+Generates a CSV of `--rows` rows resampled from the training data, then prepares
+it for upload in a fresh process per mode:
+
+- whole: `pd.read_csv`, preprocess and serialize in memory, as uploading a
+  DataFrame does
+- chunked: `starter.ingest.write_preprocessed_csv_gz`
+
+    python -m benchmarks.bench_ingest --rows 10000000
+"""
+
+import argparse
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Tuple
+
+import pandas as pd
+
+sys.path.append(".")
+
+from starter.dataset_io import DEFAULT_CHUNK_ROWS
+from starter.ingest import write_preprocessed_csv_gz
+from starter.paths import default_training_data_path
+
+PAGE_SIZE_MB = os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def generate_csv(path: Path, rows: int, chunk_rows: int = 1_000_000) -> None:
+    training_data = pd.read_csv(default_training_data_path)
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < rows:
+            n = min(chunk_rows, rows - written)
+            chunk = training_data.sample(n=n, replace=True, random_state=written)
+            chunk.to_csv(f, index=False, header=written == 0)
+            written += n
+
+
+def preprocess(df: pd.DataFrame) -> pd.DataFrame:
+    return df.assign(塗布長=df["塗布長"].str[:-1].astype(int))
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * PAGE_SIZE_MB
+
+
+class PeakRss:
+    """Sample the resident set size in the background and keep the maximum"""
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self.peak = rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def __enter__(self) -> "PeakRss":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_mb())
+
+
+def ingest_whole(file_path: str, output_path: str) -> None:
+    df = preprocess(pd.read_csv(file_path))
+    buffer = io.BytesIO()
+    df.to_csv(buffer, index=False, encoding="utf-8")
+
+
+def ingest_chunked(file_path: str, output_path: str) -> None:
+    write_preprocessed_csv_gz(file_path, output_path, preprocess)
+
+
+def measure(mode: str, file_path: str, output_path: str) -> Tuple[float, float]:
+    baseline = rss_mb()
+    start = time.perf_counter()
+    with PeakRss() as peak:
+        {"whole": ingest_whole, "chunked": ingest_chunked}[mode](file_path, output_path)
+    return time.perf_counter() - start, peak.peak - baseline
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = Path(tmp_dir) / "lots.csv"
+        generate_csv(file_path, args.rows)
+        size_mb = file_path.stat().st_size / 2**20
+        print(f"{args.rows} rows, {size_mb:.0f} MB, chunks of {DEFAULT_CHUNK_ROWS}")
+        print(f"{'mode':>8} {'time [s]':>9} {'peak RSS over baseline [MB]':>28}")
+        context = multiprocessing.get_context("spawn")
+        for mode in ("whole", "chunked"):
+            with context.Pool(1) as pool:
+                elapsed, peak = pool.apply(
+                    measure, (mode, str(file_path), str(file_path) + ".gz")
+                )
+            print(f"{mode:>8} {elapsed:>9.1f} {peak:>28.0f}")
+
+
+if __name__ == "__main__":
+    main()
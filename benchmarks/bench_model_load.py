@@ -0,0 +1,132 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Load time, scoring throughput and memory of the custom model, pickle vs. artifact.
+
+Every run is a fresh interpreter importing `custom.py` and calling `load_model`,
+as a container started from `min_computes=0` does, followed by one scored row and
+a `--rows` batch as a batch prediction job sends it. The peak RSS added by the
+batch is measured on top of the transformed input.
+
+    python -m benchmarks.bench_model_load --repeat 5 --rows 1000000
+"""
+
+import argparse
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict
+
+sys.path.append(".")
+
+from starter.paths import custom_model_dir
+
+LOAD_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import pandas as pd
+import custom
+model = custom.load_model(sys.argv[1])
+loaded = time.perf_counter()
+row = pd.read_csv(sys.argv[2], nrows=1)
+model.predict_proba(custom.transform(row, model))
+scored = time.perf_counter()
+
+def status_mb(key):
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith(key)) / 1024
+
+rss_mb = status_mb("VmRSS")
+batch = custom.transform(
+    pd.read_csv(sys.argv[2]).sample(int(sys.argv[3]), replace=True, random_state=0),
+    model,
+)
+# The peak so far is reset, so VmHWM is the peak of scoring the batch alone
+with open("/proc/self/clear_refs", "w") as f:
+    f.write("5")
+before_mb = status_mb("VmRSS")
+batch_start = time.perf_counter()
+model.predict_proba(batch)
+batch_sec = time.perf_counter() - batch_start
+print(json.dumps({
+    "load_sec": loaded - start,
+    "first_row_sec": scored - loaded,
+    "rss_mb": rss_mb,
+    "batch_sec": batch_sec,
+    "batch_peak_mb": status_mb("VmHWM") - before_mb,
+    "model": type(model).__name__,
+    "sklearn": "sklearn" in sys.modules,
+}))
+"""
+
+
+def cold_load(code_dir: Path, data_path: Path, rows: int) -> Dict[str, Any]:
+    result = subprocess.run(
+        [sys.executable, "-c", LOAD_SCRIPT, str(code_dir), str(data_path), str(rows)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    stats: Dict[str, Any] = json.loads(result.stdout.splitlines()[-1])
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument(
+        "--data",
+        type=Path,
+        default=custom_model_dir.parent / "prediction_data.csv",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # The same folder without the artifact, so `load_model` unpickles
+        pickle_dir = Path(tmp) / "custom_model"
+        shutil.copytree(
+            custom_model_dir,
+            pickle_dir,
+            ignore=shutil.ignore_patterns("__pycache__", "clf_0.model"),
+        )
+        print(
+            f"{'format':>10} {'model':>22} {'sklearn':>8} {'load [ms]':>10} "
+            f"{'first row [ms]':>15} {'RSS [MB]':>9} {'rows/s':>10} "
+            f"{'batch peak [MB]':>16}"
+        )
+        for name, code_dir in (("pickle", pickle_dir), ("artifact", custom_model_dir)):
+            runs = [
+                cold_load(code_dir, args.data, args.rows) for _ in range(args.repeat)
+            ]
+
+            def median(key: str) -> float:
+                return float(statistics.median(run[key] for run in runs))
+
+            print(
+                f"{name:>10} {runs[0]['model']:>22} {str(runs[0]['sklearn']):>8} "
+                f"{median('load_sec') * 1e3:>10.1f} "
+                f"{median('first_row_sec') * 1e3:>15.1f} "
+                f"{median('rss_mb'):>9.1f} {args.rows / median('batch_sec'):>10.0f} "
+                f"{median('batch_peak_mb'):>16.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Batch scoring throughput of the custom model preprocessing.
+
+Compares the original `transform` (`preprocess` plus a per-batch mode fill)
+and `preprocess` followed by the precomputed fill against the `Preprocessor`
+built once at model load. The batch goes through a CSV round trip so string
+columns look like they do when DRUM parses a request.
+
+    python -m benchmarks.bench_preprocess --rows 1000000
+"""
+
+import argparse
+import io
+import statistics
+import sys
+import time
+from typing import Any, Callable
+
+import pandas as pd
+
+sys.path.append(".")
+
+from starter.custom_model import load_custom_model
+from starter.paths import default_training_data_path
+
+
+def best_of(
+    func: Callable[[pd.DataFrame], Any], batch: pd.DataFrame, repeat: int
+) -> float:
+    timings = []
+    for _ in range(repeat):
+        data = batch.copy()
+        start = time.perf_counter()
+        func(data)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    hooks, model = load_custom_model()
+    preprocessor = hooks._preprocessor
+    buffer = io.StringIO()
+    pd.read_csv(default_training_data_path).drop(columns=[hooks.TARGET]).sample(
+        n=args.rows, replace=True, random_state=0
+    ).to_csv(buffer, index=False)
+    buffer.seek(0)
+    batch = pd.read_csv(buffer)
+
+    def batch_mode(data: pd.DataFrame) -> pd.DataFrame:
+        data = hooks.preprocess(data)
+        return data.fillna(data.mode().iloc[0])
+
+    def precomputed_fill(data: pd.DataFrame) -> pd.DataFrame:
+        data = hooks.preprocess(data)[preprocessor.feature_names]
+        return data.fillna(preprocessor.imputation_values)
+
+    timings = {
+        "batch mode": best_of(batch_mode, batch, args.repeat),
+        "preprocess": best_of(precomputed_fill, batch, args.repeat),
+        "compiled": best_of(preprocessor, batch, args.repeat),
+    }
+    print(f"{'pipeline':>12} {'time [ms]':>10} {'rows/s':>14} {'speedup':>8}")
+    for name, elapsed in timings.items():
+        print(
+            f"{name:>12} {elapsed * 1e3:>10.1f} {args.rows / elapsed:>14,.0f} "
+            f"{timings['batch mode'] / elapsed:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
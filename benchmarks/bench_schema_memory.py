@@ -0,0 +1,74 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Memory per row of the retraining files, inferred vs declared dtypes.
+
+- inferred: `pd.read_csv` without dtypes
+- declared: `pd.read_csv` with `coating_schema.DTYPES`
+- arrow: `read_dataset` with the same dtypes, from the cached Arrow copy
+
+    python -m benchmarks.bench_schema_memory assets/retrain_01.csv assets/retrain_02.csv
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+import pandas as pd
+
+sys.path.append(".")
+
+from starter import dataset_io
+from starter.custom_model import load_coating_schema
+from starter.paths import PROJECT_ROOT
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "files",
+        nargs="*",
+        type=Path,
+        default=[
+            PROJECT_ROOT / "assets" / "retrain_01.csv",
+            PROJECT_ROOT / "assets" / "retrain_02.csv",
+        ],
+    )
+    args = parser.parse_args()
+    dtypes = load_coating_schema().DTYPES
+
+    print(f"{'file':>16} {'mode':>9} {'bytes/row':>10} {'time [s]':>9}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        dataset_io.columnar_cache_dir = Path(tmp_dir)
+        for path in args.files:
+            # Converted before timing, as it is once per file
+            dataset_io.columnar_path(path)
+            runs: List[Tuple[str, Callable[[], pd.DataFrame]]] = [
+                ("inferred", lambda: pd.read_csv(path)),
+                ("declared", lambda: pd.read_csv(path, dtype=dtypes)),
+                ("arrow", lambda: dataset_io.read_dataset(path, dtypes=dtypes)),
+            ]
+            for mode, read in runs:
+                start = time.perf_counter()
+                df = read()
+                elapsed = time.perf_counter() - start
+                per_row = df.memory_usage(deep=True).sum() / len(df)
+                print(f"{path.name:>16} {mode:>9} {per_row:>10.1f} {elapsed:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
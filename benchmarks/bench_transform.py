@@ -0,0 +1,88 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-request latency of the custom model `transform` hook.
+
+Compares imputing with the per-batch mode against the precomputed imputation
+values shipped next to `clf_0.pkl`.
+
+    python -m benchmarks.bench_transform --sizes 1 100 10000 1000000
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from typing import Any
+
+import pandas as pd
+
+sys.path.append(".")
+
+from starter.custom_model import load_custom_model
+from starter.paths import default_training_data_path
+
+
+def make_batch(training_data: pd.DataFrame, size: int) -> pd.DataFrame:
+    return training_data.sample(n=size, replace=True, random_state=0).reset_index(
+        drop=True
+    )
+
+
+def time_transform(
+    hooks: Any, model: Any, preprocessor: Any, batch: pd.DataFrame, repeat: int
+) -> float:
+    hooks._preprocessor = preprocessor
+    timings = []
+    for _ in range(repeat):
+        data = batch.copy()
+        start = time.perf_counter()
+        hooks.transform(data, model)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1, 100, 10_000, 1_000_000]
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    hooks, model = load_custom_model()
+    precomputed_preprocessor = hooks._preprocessor
+    batch_mode_preprocessor = hooks.build_preprocessor(model)
+    training_data = pd.read_csv(default_training_data_path).drop(columns=[hooks.TARGET])
+
+    print(
+        f"{'rows':>10} {'batch mode [ms]':>16} {'precomputed [ms]':>17} {'speedup':>8}"
+    )
+    for size in args.sizes:
+        batch = make_batch(training_data, size)
+        repeat = args.repeat if size < 1_000_000 else 1
+        batch_mode = time_transform(
+            hooks, model, batch_mode_preprocessor, batch, repeat
+        )
+        precomputed = time_transform(
+            hooks, model, precomputed_preprocessor, batch, repeat
+        )
+        print(
+            f"{size:>10} {batch_mode * 1e3:>16.2f} {precomputed * 1e3:>17.2f} "
+            f"{batch_mode / precomputed:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import atexit
+import os
 import sys
+import time
+from typing import Any, Callable, List
 
 import pulumi
 from pulumi import Output
@@ -25,9 +29,10 @@ import yaml
 sys.path.append("..")
 
 from infra import (
+    settings_datasets,
     settings_main,
 )
-from infra.common.papermill import run_notebook
+from infra.common.papermill import notebook_fingerprint, run_notebook_if_changed
 from infra.settings_deployment import (
     deployment_args,
     retraining_policy_settings
@@ -42,23 +47,76 @@ from infra.common.schema_retraining import (
     TriggerType,
 )
 
-from infra.settings_main import model_training_nb_path, model_training_output_path,project_name, challenger_model_output_path
+from infra.settings_main import model_training_nb_path, model_training_output_path,project_name, challenger_model_output_path, challenger_state_path, PROJECT_ROOT
 
+from starter.challengers import read_pending
 from starter.i18n import LocaleSettings
 from starter.resources import (
     deployment_env_name,
     scoring_dataset_env_name,
 )
 from starter.schema import AppSettings
-from starter.make_prediction import prediction_and_upload_actual
-from starter.make_challenger import train_and_create_challangers
+from starter.stack_outputs import stack_output_cache
+from starter.jobs import JobRunner, format_status
+from starter.timing import span, tracer
 
 
-LocaleSettings().setup_locale()
+@atexit.register
+def report_timings() -> None:
+    # Runs once the engine has resolved every output and the apply callbacks are done
+    print(tracer.format_summary())
+    if settings_main.export_trace:
+        print(f"Trace written to {tracer.export_chrome_trace(settings_main.trace_output_path)}")
+
+
+def time_until_created(name: str, output: Output[Any]) -> None:
+    """Record the time from declaring a resource until its ID is known"""
+    start = time.perf_counter()
+    output.apply(lambda _: tracer.add(name, "resources", start))
+
+
+def submit_job(name: str, target: str) -> Callable[[List[Any]], None]:
+    """Apply callback starting a background job once its arguments are known"""
+
+    def callback(args: List[Any]) -> None:
+        if pulumi.runtime.is_dry_run():
+            return
+        with span(f"submit {name}", phase="jobs"):
+            state = job_runner.submit(name, target, [f"{arg}" for arg in args])
+        pulumi.info(format_status(state))
+
+    return callback
 
-if not model_training_output_path.exists():
-    pulumi.info("Executing model training notebook...")
-    run_notebook(model_training_nb_path)
+
+# Long workflows run in detached processes, see `python -m starter.jobs status`
+job_runner = JobRunner()
+for job_state in job_runner.list():
+    pulumi.info(format_status(job_state))
+
+
+LocaleSettings().setup_locale()
+# Outputs are about to change, make the next lookup ask the CLI
+stack_output_cache.discard_snapshot(project_name)
+
+# The notebook is re-executed only when its code, training data or settings change
+model_training_fingerprint = notebook_fingerprint(
+    model_training_nb_path,
+    input_paths=[
+        PROJECT_ROOT / settings_datasets.training_dataset.file_path,
+        PROJECT_ROOT / "infra" / "settings_datasets.py",
+        PROJECT_ROOT / "infra" / "settings_main.py",
+    ],
+    extra={
+        "project_name": project_name,
+        "locale": LocaleSettings().app_locale,
+        "endpoint": os.environ.get("DATAROBOT_ENDPOINT"),
+        "use_case": os.environ.get("DATAROBOT_DEFAULT_USE_CASE"),
+    },
+)
+if run_notebook_if_changed(
+    model_training_nb_path, model_training_output_path, model_training_fingerprint
+):
+    pulumi.info("Executed model training notebook, inputs changed")
 else:
     pulumi.info(
         f"Using existing model training outputs in '{model_training_output_path}'"
@@ -69,6 +127,7 @@ with open(model_training_output_path) as f:
 prediction_environment = datarobot.PredictionEnvironment(
     **settings_main.prediction_environment_args,
 )
+time_until_created("PredictionEnvironment", prediction_environment.id)
 
 
 deployment = datarobot.Deployment(
@@ -77,6 +136,7 @@ deployment = datarobot.Deployment(
     **deployment_args.model_dump(),
     use_case_ids=[model_training_output.use_case_id],
 )
+time_until_created("Deployment", deployment.id)
 # ------ 再学習用のポリシーを作成 -------
 retraining_policy = datarobot.DeploymentRetrainingPolicy(
         deployment_id=deployment.id,
@@ -114,6 +174,8 @@ retraining_policy_datadrift = datarobot.DeploymentRetrainingPolicy(
             "type":TriggerType.data_drift_decline,
         },
 )
+time_until_created("DeploymentRetrainingPolicy", retraining_policy.id)
+time_until_created("DeploymentRetrainingPolicy", retraining_policy_datadrift.id)
 
 custom_model = datarobot.CustomModel(f"Custom Model [{project_name}]",
                                               base_environment_id="5e8c889607389fe0f466c72d",
@@ -129,6 +191,7 @@ custom_model = datarobot.CustomModel(f"Custom Model [{project_name}]",
                                               use_case_ids=[model_training_output.use_case_id],
                                               training_dataset_id=model_training_output.training_dataset_id,
                                               folder_path="../assets/custom_model")
+time_until_created("CustomModel", custom_model.version_id)
 
 example_registered_model = datarobot.RegisteredModel(f"Registered Custom Model [{project_name}]",
                                                      custom_model_version_id=custom_model.version_id,
@@ -136,16 +199,31 @@ example_registered_model = datarobot.RegisteredModel(f"Registered Custom Model [
                                                      #name=model_training_output.registered_model_name,
                                                      use_case_ids=[model_training_output.use_case_id],
                                                      description="Description for the example registered model")
+time_until_created("RegisteredModel", example_registered_model.id)
 
 if not challenger_model_output_path.exists():
+    pulumi.info("Submitting prediction and actual upload job...")
+    Output.all(deployment.id).apply(
+        submit_job(
+            "prediction_and_upload_actual",
+            "starter.make_prediction:prediction_and_upload_actual",
+        )
+    )
 
-    
-    pulumi.info("Making prediction and set actual...")
-    Output.all(deployment.id).apply(lambda args: prediction_and_upload_actual(f"{args[0]}"))
-    pulumi.info("Executing challanger traning and register...")
+# A run that left challengers pending wrote no output and failed, so it is retried
+pending_challengers = read_pending(challenger_state_path)
+if not challenger_model_output_path.exists() or pending_challengers:
+    if pending_challengers:
+        pulumi.info("Challengers still pending: " + ", ".join(pending_challengers))
+    pulumi.info("Submitting challanger training and registration job...")
     
     Output.all(deployment.id, prediction_environment.id) \
-        .apply(lambda args: train_and_create_challangers(f"{args[0]}", f"{args[1]}"))
+        .apply(
+            submit_job(
+                "train_and_create_challangers",
+                "starter.make_challenger:train_and_create_challangers",
+            )
+        )
 else:
     pulumi.info(
         f"Using existing model training outputs in '{challenger_model_output_path}'"
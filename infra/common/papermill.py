@@ -13,22 +13,137 @@
 # limitations under the License.
 
 
+import hashlib
+import json
 import pathlib
 import sys
-from typing import Optional
+from typing import Any, Dict, Iterable, Mapping, Optional
 
 import papermill as pm
+import yaml
 
+from starter.dataset_cache import file_sha256
+from starter.timing import timed
 
-def run_notebook(
-    nb_path: pathlib.Path, output_path: Optional[pathlib.Path] = None
+# Keys added to a notebook's output YAML
+FINGERPRINT_KEY = "notebook_fingerprint"
+CELL_DURATIONS_KEY = "notebook_cell_durations"
+
+
+def notebook_fingerprint(
+    nb_path: pathlib.Path,
+    parameters: Optional[Mapping[str, Any]] = None,
+    input_paths: Iterable[pathlib.Path] = (),
+    extra: Optional[Mapping[str, Any]] = None,
+) -> str:
+    """Hash everything a notebook execution depends on
+
+    Parameters
+    ----------
+    nb_path : pathlib.Path
+        Notebook whose cell sources are hashed, outputs and metadata are ignored
+    parameters : Mapping[str, Any], optional
+        Papermill parameters
+    input_paths : Iterable[pathlib.Path]
+        Files read by the notebook, e.g. datasets and settings modules
+    extra : Mapping[str, Any], optional
+        Other values the results depend on, e.g. environment variables
+    """
+    with open(nb_path, encoding="utf-8") as f:
+        notebook = json.load(f)
+    digest = hashlib.sha256()
+    for cell in notebook["cells"]:
+        if cell["cell_type"] == "code":
+            source = cell["source"]
+            digest.update(
+                "".join(source).encode()
+                if isinstance(source, list)
+                else source.encode()
+            )
+            digest.update(b"\0")
+    for input_path in input_paths:
+        digest.update(file_sha256(input_path).encode())
+    digest.update(
+        json.dumps(
+            [parameters or {}, extra or {}], sort_keys=True, default=str
+        ).encode()
+    )
+    return digest.hexdigest()
+
+
+def read_fingerprint(output_path: pathlib.Path) -> Optional[str]:
+    with open(output_path) as f:
+        fingerprint: Optional[str] = (yaml.safe_load(f) or {}).get(FINGERPRINT_KEY)
+    return fingerprint
+
+
+def record_execution(
+    output_path: pathlib.Path,
+    fingerprint: str,
+    cell_durations: Optional[Dict[str, float]] = None,
 ) -> None:
-    pm.execute_notebook(
+    """Store the fingerprint, and cell durations if given, in the output YAML"""
+    with open(output_path) as f:
+        outputs = yaml.safe_load(f) or {}
+    outputs[FINGERPRINT_KEY] = fingerprint
+    if cell_durations is not None:
+        outputs[CELL_DURATIONS_KEY] = cell_durations
+    with open(output_path, "w") as f:
+        yaml.dump(outputs, f, allow_unicode=True)
+
+
+@timed(phase="training")
+def run_notebook(
+    nb_path: pathlib.Path,
+    output_path: Optional[pathlib.Path] = None,
+    parameters: Optional[Mapping[str, Any]] = None,
+) -> Dict[str, float]:
+    """Execute a notebook and return the duration of each code cell in seconds"""
+    notebook = pm.execute_notebook(
         nb_path,
         output_path,
+        parameters=dict(parameters or {}),
         cwd=nb_path.parent,
         log_output=False,
         progress_bar=False,
         stderr_file=sys.stderr,
         stdout_file=sys.stdout,
     )
+    return {
+        cell.get("id", str(i)): round(cell.metadata.papermill.get("duration") or 0, 3)
+        for i, cell in enumerate(notebook.cells)
+        if cell.cell_type == "code" and "papermill" in cell.metadata
+    }
+
+
+def run_notebook_if_changed(
+    nb_path: pathlib.Path,
+    settings_output_path: pathlib.Path,
+    fingerprint: str,
+    parameters: Optional[Mapping[str, Any]] = None,
+) -> bool:
+    """Execute a notebook unless its output YAML was produced from the same inputs
+
+    The notebook must write `settings_output_path`. Outputs written before
+    fingerprints were recorded are adopted as up to date rather than re-executed.
+
+    Returns
+    -------
+    bool :
+        Whether the notebook was executed
+    """
+    if settings_output_path.exists():
+        recorded = read_fingerprint(settings_output_path)
+        if recorded == fingerprint:
+            return False
+        if recorded is None:
+            record_execution(settings_output_path, fingerprint)
+            return False
+
+    cell_durations = run_notebook(nb_path, parameters=parameters)
+    record_execution(settings_output_path, fingerprint, cell_durations)
+    for cell_id, duration in sorted(
+        cell_durations.items(), key=lambda item: item[1], reverse=True
+    )[:3]:
+        print(f"{nb_path.name} cell {cell_id}: {duration:.1f}s")
+    return True
@@ -14,7 +14,7 @@
 
 from __future__ import annotations
 
-from typing import Any, List, Optional, Tuple
+from typing import Any, Dict, List, Literal, Optional, Tuple
 
 import datarobot as dr
 import pulumi_datarobot as datarobot
@@ -71,6 +71,10 @@ class DatasetArgs(BaseModel):
     resource_name: str
     file_path: str
     name: str | None = None
+    # csv, parquet or arrow (Arrow IPC / Feather v2), inferred from the suffix if unset
+    format: Literal["csv", "parquet", "arrow"] | None = None
+    # Column dtypes applied when the file is read, e.g. {"ロット番号": "string"}
+    dtypes: Dict[str, str] | None = None
 
 
 class UseCaseArgs(BaseModel):
@@ -184,4 +188,4 @@ class DeploymentRetrainingPolicyArgs(BaseModel):
     project_options: ProjectOptions | None = None
     project_options_strategy: str | None = None
     time_series_options: TimeSeriesOptions | None = None
-    trigger: Trigger | None = None
\ No newline at end of file
+    trigger: Trigger | None = None
@@ -14,10 +14,11 @@
 
 
 import os
-import subprocess
 
 import pulumi
 
+from starter.stack_outputs import get_stack_name
+
 
 def get_stack() -> str:
     """Retrieve the active pulumi stack
@@ -39,14 +40,9 @@ def get_stack() -> str:
         return os.environ["PULUMI_STACK_CONTEXT"]
     except KeyError:
         pass
-    try:
-        return subprocess.check_output(
-            ["pulumi", "stack", "--show-name", "--non-interactive"],
-            text=True,
-            stderr=subprocess.STDOUT,
-        ).strip()
-    except subprocess.CalledProcessError:
-        pass
+    stack_name = get_stack_name()
+    if stack_name:
+        return stack_name
     raise ValueError(
         (
             "Unable to retrieve the currently active stack. "
@@ -14,18 +14,21 @@
 
 
 import os
-from urllib.parse import urlsplit
+from typing import Optional
 
+from starter.urls import url_builder
 
-def get_deployment_url(deployment_id: str) -> str:
+
+def get_deployment_url(deployment_id: str, endpoint: Optional[str] = None) -> str:
     """Translate deployment ID to GUI URL.
 
     Parameters
     ----------
     deployment_id : str
         DataRobot deployment id.
-    endpoint: str
-        DataRobot public API endpoint e.g. envir
+    endpoint: str, optional
+        DataRobot public API endpoint, `DATAROBOT_ENDPOINT` by default
     """
-    parsed_dr_url = urlsplit(os.environ["DATAROBOT_ENDPOINT"])
-    return f"{parsed_dr_url.scheme}://{parsed_dr_url.netloc}/console-nextgen/deployments/{deployment_id}/"
+    return url_builder(endpoint or os.environ["DATAROBOT_ENDPOINT"]).console_deployment(
+        deployment_id
+    )
@@ -13,34 +13,45 @@
 # limitations under the License.
 
 
+from starter.custom_model import load_coating_schema
+
 from .common.schema import DatasetArgs
 from .settings_main import project_name
 
+# Declared dtypes shared with the custom model, so loaders skip type inference
+coating_dtypes = load_coating_schema().DTYPES
+
 training_dataset = DatasetArgs(
     resource_name=f"Predictive AI MLOps Starter Training Data [{project_name}]",
     file_path="assets/train.csv",
+    dtypes=coating_dtypes,
 )
 
 prediction_datasets = [DatasetArgs(
     resource_name=f"Prediction data for data drift Accuracy: [{project_name}]",
     file_path="../assets/prediction_data.csv",
+    dtypes=coating_dtypes,
 )]
 
 actual_dataset =  DatasetArgs(
     resource_name=f"Predictive AI MLOps Starter Actual [{project_name}]",
     file_path="../assets/prediction_data_actual.csv",
+    dtypes=coating_dtypes,
 )
 
 retraining_datasets = [DatasetArgs(
     resource_name=f"Predictive AI MLOps Starter Retraining Data 01 [{project_name}]",
     file_path="../assets/retrain_01.csv",
+    dtypes=coating_dtypes,
 ),
                      DatasetArgs(
     resource_name=f"Predictive AI MLOps Starter Retraining Data 02 [{project_name}]",
     file_path="../assets/retrain_02.csv",
+    dtypes=coating_dtypes,
 ),
 #                     DatasetArgs(
 #    resource_name=f"Predictive AI MLOps Starter Retraining Data 03 [{project_name}]",
 #    file_path="../assets/再学習用データ03.csv",
+#    dtypes=coating_dtypes,
 #)
                       ]
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 
+import os
 from pathlib import Path
 
 from infra.common.globals import GlobalPredictionEnvironmentPlatforms
@@ -51,4 +52,14 @@ model_training_output_path = Path(model_training_output_path_str)
 
 challenger_model_output_name = f"challenger_model_output.{project_name}.yaml"
 challenger_model_output_path_str = f"{outputs_path_str}/{challenger_model_output_name}"
-challenger_model_output_path = Path(challenger_model_output_path_str)
\ No newline at end of file
+challenger_model_output_path = Path(challenger_model_output_path_str)
+# Checkpoint of the challengers created so far, read again by interrupted runs
+challenger_state_path = Path(outputs_path_str) / f"challenger_state.{project_name}.yaml"
+# Challengers a deployment can have next to its champion, existing ones included.
+# DataRobot allows 5 unless the organization's limit was changed.
+challenger_slots = int(os.environ.get("CHALLENGER_SLOTS", "5"))
+
+# Chrome trace of the timed spans of `pulumi up`, written when EXPORT_TRACE is 1,
+# true or yes
+export_trace = os.environ.get("EXPORT_TRACE", "").lower() in {"1", "true", "yes"}
+trace_output_path = Path(outputs_path_str) / f"pulumi_trace.{project_name}.json"
\ No newline at end of file
@@ -0,0 +1,548 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Local accuracy monitoring, joining actuals to predictions by association ID.
+
+Predictions are stored in column files memory-mapped from disk, with an
+open-addressing hash table from association ID to row. Arriving actuals are looked
+up in that table, so a join costs O(actuals) whatever the number of stored
+predictions, and only the joined rows update the running LogLoss sums and score
+histograms kept per day and per segment. Reports are computed from those
+aggregates.
+
+    python -m starter.accuracy assets/prediction_data.csv \\
+        assets/prediction_data_actual.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from starter.custom_model import load_coating_schema
+from starter.dataset_io import DEFAULT_CHUNK_ROWS, iter_dataset_chunks
+from starter.paths import PROJECT_ROOT
+
+default_store_dir = PROJECT_ROOT / "outputs" / "accuracy_store"
+
+# Score histogram resolution, AUC is exact up to ties within a bin
+SCORE_BINS = 1000
+
+# Predictions are clipped away from 0 and 1 so LogLoss stays finite
+PROBABILITY_EPSILON = 1e-15
+
+# The hash table is grown to keep at most this share of slots occupied
+MAX_LOAD_FACTOR = 0.5
+
+EMPTY_SLOT = -1
+NO_ACTUAL = -1
+NO_DAY = np.iinfo(np.int32).min
+
+# Segment ID of the aggregates over all rows
+ALL_ROWS = ""
+
+GroupKey = Tuple[int, str, int]
+
+
+def encode_keys(association_ids: Iterable[Any], width: int) -> np.ndarray:
+    """UTF-8 encode association IDs into fixed-width byte strings"""
+    encoded = np.char.encode(np.asarray(list(association_ids), dtype=str), "utf-8")
+    if encoded.dtype.itemsize > width:
+        raise ValueError(
+            f"Association IDs longer than {width} bytes, increase `key_width`"
+        )
+    keys: np.ndarray = encoded.astype(f"S{width}")
+    return keys
+
+
+def hash_keys(keys: np.ndarray) -> np.ndarray:
+    """64-bit FNV-1a style hash of fixed-width keys, 8 bytes at a time"""
+    words = keys.view(np.uint64).reshape(len(keys), -1)
+    hashes: np.ndarray = np.full(len(keys), 0xCBF29CE484222325, dtype=np.uint64)
+    for column in words.T:
+        hashes ^= column
+        hashes *= np.uint64(0x100000001B3)
+    # Final avalanche, so that the low bits used as slot depend on every byte
+    hashes ^= hashes >> np.uint64(33)
+    hashes *= np.uint64(0xFF51AFD7ED558CCD)
+    hashes ^= hashes >> np.uint64(33)
+    return hashes
+
+
+def binned_auc(histogram: np.ndarray) -> float:
+    """ROC AUC from negative and positive score histograms, NaN for one class"""
+    negatives, positives = histogram
+    n_negatives, n_positives = negatives.sum(), positives.sum()
+    if n_negatives == 0 or n_positives == 0:
+        return float("nan")
+    negatives_below = np.cumsum(negatives) - negatives
+    return float(
+        np.sum(positives * (negatives_below + negatives / 2))
+        / (n_negatives * n_positives)
+    )
+
+
+# Segments of a store created by the CLI without --segment
+DEFAULT_SEGMENTS = ["塗布長"]
+
+
+class AccuracyStore:
+    """Predictions keyed by association ID on disk, with actuals joined incrementally
+
+    Parameters
+    ----------
+    directory : str or Path
+        Folder of the column files, created if missing
+    segment_attributes : Sequence[str], optional
+        Columns to report accuracy by, besides the day, fixed when the store is
+        created. None opens an existing store with its own.
+    key_width : int
+        Bytes reserved per association ID, rounded up to a multiple of 8
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path] = default_store_dir,
+        segment_attributes: Optional[Sequence[str]] = None,
+        key_width: int = 16,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        meta_path = self.directory / "meta.json"
+        if meta_path.exists():
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if segment_attributes is not None and list(segment_attributes) != list(
+                meta["segments"]
+            ):
+                raise ValueError(
+                    f"The store in {self.directory} is segmented by "
+                    f"{list(meta['segments'])}, not {list(segment_attributes)}"
+                )
+        else:
+            meta = {
+                "rows": 0,
+                "key_width": -(-key_width // 8) * 8,
+                "segments": {name: [] for name in segment_attributes or ()},
+            }
+        self.rows: int = meta["rows"]
+        self.key_width: int = meta["key_width"]
+        self.segments: Dict[str, List[str]] = meta["segments"]
+        self._segment_codes = {
+            name: {value: i for i, value in enumerate(values)}
+            for name, values in self.segments.items()
+        }
+        self.columns: Dict[str, np.ndarray] = {}
+        self.table: np.ndarray = np.empty(0, dtype=np.int64)
+        if meta_path.exists():
+            self._open_columns()
+        else:
+            self._allocate(1024)
+        self.aggregates: Dict[GroupKey, Tuple[np.ndarray, float]] = {}
+        self._accumulate(np.flatnonzero(self.columns["actual"][: self.rows] >= 0), 1)
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __enter__(self) -> AccuracyStore:
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.flush()
+
+    # Storage
+
+    def _column_dtypes(self) -> Dict[str, Any]:
+        dtypes: Dict[str, Any] = {
+            "key": f"S{self.key_width}",
+            "probability": np.float64,
+            "day": np.int32,
+            "actual": np.int8,
+        }
+        for i in range(len(self.segments)):
+            dtypes[f"segment_{i}"] = np.int32
+        return dtypes
+
+    def _open_columns(self) -> None:
+        for name in self._column_dtypes():
+            self.columns[name] = np.load(self.directory / f"{name}.npy", mmap_mode="r+")
+        self.table = np.load(self.directory / "table.npy", mmap_mode="r+")
+
+    def _allocate(self, capacity: int) -> None:
+        """Move the columns to files of `capacity` rows and rebuild the table"""
+        fill = {"actual": NO_ACTUAL, "day": NO_DAY}
+        for name, dtype in self._column_dtypes().items():
+            path = self.directory / f"{name}.npy"
+            tmp_path = path.with_suffix(".tmp.npy")
+            column = np.lib.format.open_memmap(
+                tmp_path, mode="w+", dtype=dtype, shape=(capacity,)
+            )
+            column[: self.rows] = self.columns[name][: self.rows] if self.rows else 0
+            column[self.rows :] = fill.get(name, 0)
+            column.flush()
+            self.columns.pop(name, None)
+            os.replace(tmp_path, path)
+            self.columns[name] = np.load(path, mmap_mode="r+")
+
+        slots = 1 << int(np.ceil(np.log2(capacity / MAX_LOAD_FACTOR)))
+        table_path = self.directory / "table.npy"
+        tmp_path = table_path.with_suffix(".tmp.npy")
+        table = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=np.int64, shape=(slots,)
+        )
+        table[:] = EMPTY_SLOT
+        table.flush()
+        os.replace(tmp_path, table_path)
+        self.table = np.load(table_path, mmap_mode="r+")
+        keys = self.columns["key"][: self.rows]
+        self._place(keys, np.arange(self.rows, dtype=np.int64))
+
+    def flush(self) -> None:
+        for column in self.columns.values():
+            column.flush()  # type: ignore[attr-defined]
+        self.table.flush()  # type: ignore[attr-defined]
+        meta = {
+            "rows": self.rows,
+            "key_width": self.key_width,
+            "segments": self.segments,
+        }
+        meta_path = self.directory / "meta.json"
+        tmp_path = meta_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, meta_path)
+
+    # Hash table
+
+    def _find(self, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Row of every key, -1 if absent, and the slot where the probe ended"""
+        mask = np.uint64(len(self.table) - 1)
+        slots = (hash_keys(keys) & mask).astype(np.int64)
+        rows: np.ndarray = np.full(len(keys), EMPTY_SLOT, dtype=np.int64)
+        pending = np.arange(len(keys))
+        stored_keys = self.columns["key"]
+        while pending.size:
+            probed = self.table[slots[pending]]
+            empty = probed == EMPTY_SLOT
+            matched = ~empty
+            matched[matched] = stored_keys[probed[matched]] == keys[pending[matched]]
+            rows[pending[matched]] = probed[matched]
+            pending = pending[~(empty | matched)]
+            slots[pending] = (slots[pending] + 1) & int(mask)
+        return rows, slots
+
+    def _place(self, keys: np.ndarray, rows: np.ndarray) -> None:
+        """Insert keys known to be absent and distinct"""
+        if not len(keys):
+            return
+        _, slots = self._find(keys)
+        mask = len(self.table) - 1
+        pending = np.arange(len(keys))
+        while pending.size:
+            candidate_slots = slots[pending]
+            free = self.table[candidate_slots] == EMPTY_SLOT
+            # Keys probing the same free slot: the first one takes it
+            claimed, first = np.unique(candidate_slots[free], return_index=True)
+            winners = pending[free][first]
+            self.table[claimed] = rows[winners]
+            placed: np.ndarray = np.zeros(len(keys), dtype=bool)
+            placed[winners] = True
+            pending = pending[~placed[pending]]
+            slots[pending] = (slots[pending] + 1) & mask
+
+    def lookup(self, association_ids: Iterable[Any]) -> np.ndarray:
+        """Row of every association ID, -1 if it has no prediction"""
+        rows, _ = self._find(encode_keys(association_ids, self.key_width))
+        return rows
+
+    # Aggregates
+
+    def _group_codes(
+        self, rows: np.ndarray
+    ) -> Iterable[Tuple[str, np.ndarray, np.ndarray]]:
+        """Segment ID, day and segment value code of every row, per segment"""
+        day = self.columns["day"][rows]
+        yield ALL_ROWS, day, np.zeros(len(rows), dtype=np.int32)
+        for i, name in enumerate(self.segments):
+            yield name, day, self.columns[f"segment_{i}"][rows]
+
+    def _accumulate(self, rows: np.ndarray, sign: int) -> None:
+        """Add, or remove with `sign=-1`, joined rows from the aggregates"""
+        if not len(rows):
+            return
+        probability = np.clip(
+            self.columns["probability"][rows],
+            PROBABILITY_EPSILON,
+            1 - PROBABILITY_EPSILON,
+        )
+        actual = self.columns["actual"][rows].astype(np.int64)
+        log_loss: np.ndarray = np.where(
+            actual == 1, -np.log(probability), -np.log1p(-probability)
+        )
+        score_bin = np.minimum(
+            (probability * SCORE_BINS).astype(np.int64), SCORE_BINS - 1
+        )
+        for segment, day, value in self._group_codes(rows):
+            groups, group_of_row = np.unique(
+                np.stack([day.astype(np.int64), value.astype(np.int64)]),
+                axis=1,
+                return_inverse=True,
+            )
+            group_of_row = group_of_row.ravel()
+            n_groups = groups.shape[1]
+            histograms = np.bincount(
+                (group_of_row * 2 + actual) * SCORE_BINS + score_bin,
+                minlength=n_groups * 2 * SCORE_BINS,
+            ).reshape(n_groups, 2, SCORE_BINS)
+            log_losses = np.bincount(group_of_row, log_loss, minlength=n_groups)
+            for (group_day, group_value), histogram, group_log_loss in zip(
+                groups.T, histograms, log_losses
+            ):
+                key = (int(group_day), segment, int(group_value))
+                previous_histogram, previous_log_loss = self.aggregates.get(
+                    key, (np.zeros((2, SCORE_BINS), np.int64), 0.0)
+                )
+                self.aggregates[key] = (
+                    previous_histogram + sign * histogram,
+                    previous_log_loss + sign * float(group_log_loss),
+                )
+
+    # Writes
+
+    def _segment_code(self, name: str, values: Any) -> np.ndarray:
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object).astype(str))
+        known = self._segment_codes[name]
+        for value in uniques:
+            if value not in known:
+                known[value] = len(self.segments[name])
+                self.segments[name].append(value)
+        lookup = np.array([known[value] for value in uniques] + [-1], dtype=np.int32)
+        segment_codes: np.ndarray = lookup[codes]
+        return segment_codes
+
+    def add_predictions(
+        self,
+        association_ids: Iterable[Any],
+        probabilities: Any,
+        days: Optional[Any] = None,
+        segments: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Store positive class probabilities, replacing earlier predictions of a lot
+
+        Parameters
+        ----------
+        association_ids : Iterable
+            Association ID of every prediction
+        probabilities : array-like
+            Positive class probability of every prediction
+        days : array-like of datetime64, optional
+            Prediction date, used to report accuracy per day
+        segments : Dict[str, array-like], optional
+            Values of the segment attributes of every prediction
+        """
+        keys = encode_keys(association_ids, self.key_width)
+        # The last prediction of a lot repeated in the batch wins
+        _, last = np.unique(keys[::-1], return_index=True)
+        order = np.sort(len(keys) - 1 - last)
+        keys = keys[order]
+        values: Dict[str, np.ndarray] = {
+            "probability": np.asarray(probabilities, dtype=np.float64)[order],
+            "day": (
+                np.full(len(order), NO_DAY, dtype=np.int32)
+                if days is None
+                else _day_numbers(days)[order]
+            ),
+        }
+        for i, name in enumerate(self.segments):
+            source = (segments or {}).get(name)
+            values[f"segment_{i}"] = (
+                np.full(len(order), -1, dtype=np.int32)
+                if source is None
+                else self._segment_code(name, np.asarray(source, dtype=object)[order])
+            )
+
+        rows, _ = self._find(keys)
+        new = rows < 0
+        if new.any():
+            if self.rows + new.sum() > len(self.columns["key"]):
+                self._allocate(
+                    max(2 * len(self.columns["key"]), self.rows + int(new.sum()))
+                )
+            rows[new] = np.arange(self.rows, self.rows + new.sum())
+            self.columns["key"][rows[new]] = keys[new]
+            self._place(keys[new], rows[new])
+            self.rows += int(new.sum())
+
+        rescored = rows[~new][self.columns["actual"][rows[~new]] >= 0]
+        self._accumulate(rescored, -1)
+        for name, column_values in values.items():
+            self.columns[name][rows] = column_values
+        self._accumulate(rescored, 1)
+
+    def join_actuals(self, association_ids: Iterable[Any], actuals: Any) -> int:
+        """Join actual labels to stored predictions
+
+        Returns
+        -------
+        int :
+            Number of actuals that matched a prediction, the others are ignored
+        """
+        rows = self.lookup(association_ids)
+        labels = np.asarray(actuals)
+        if labels.dtype.kind not in "biu":
+            labels = np.isin(
+                pd.Series(labels, dtype=object).astype(str).str.lower(), ["true", "1"]
+            )
+        matched = rows >= 0
+        rows, labels = rows[matched], labels[matched].astype(np.int8)
+        # Resubmitted actuals replace the earlier ones, the last one in a batch wins
+        rows, last = np.unique(rows[::-1], return_index=True)
+        labels = labels[::-1][last]
+        self._accumulate(rows[self.columns["actual"][rows] >= 0], -1)
+        self.columns["actual"][rows] = labels
+        self._accumulate(rows, 1)
+        return int(matched.sum())
+
+    # Reads
+
+    def report(self) -> pd.DataFrame:
+        """LogLoss and AUC per day, overall and per segment value
+
+        Returns
+        -------
+        pd.DataFrame :
+            Columns date, segment, value, rows, logloss and auc, where the rows of
+            all segments together have an empty segment and value
+        """
+        records = []
+        for (day, segment, value), (histogram, log_loss) in sorted(
+            self.aggregates.items()
+        ):
+            rows = int(histogram.sum())
+            if not rows:
+                continue
+            records.append(
+                {
+                    "date": pd.NaT if day == NO_DAY else _day_to_timestamp(day),
+                    "segment": segment,
+                    "value": (
+                        ""
+                        if segment == ALL_ROWS or value < 0
+                        else self.segments[segment][value]
+                    ),
+                    "rows": rows,
+                    "logloss": log_loss / rows,
+                    "auc": binned_auc(histogram),
+                }
+            )
+        return pd.DataFrame(
+            records, columns=["date", "segment", "value", "rows", "logloss", "auc"]
+        )
+
+
+def _day_numbers(days: Any) -> np.ndarray:
+    dates = pd.to_datetime(pd.Series(days), errors="coerce").to_numpy("datetime64[D]")
+    numbers = dates.astype(np.int64)
+    numbers[np.isnat(dates)] = NO_DAY
+    day_numbers: np.ndarray = numbers.astype(np.int32)
+    return day_numbers
+
+
+def _day_to_timestamp(day: int) -> pd.Timestamp:
+    return pd.Timestamp(np.datetime64(day, "D"))
+
+
+def accuracy_decline(
+    report: pd.DataFrame,
+    reference_logloss: float,
+    at_risk: float = 0.1,
+    failing: float = 0.15,
+) -> pd.DataFrame:
+    """Status of every day's overall LogLoss relative to a reference
+
+    Mirrors an accuracy-decline trigger: a day is "at risk" or "failing" when its
+    LogLoss is worse than `reference_logloss` by more than these fractions.
+    """
+    overall = report[report["segment"] == ALL_ROWS][["date", "rows", "logloss"]]
+    change = overall["logloss"] / reference_logloss - 1
+    return overall.assign(
+        change=change,
+        status=np.select(
+            [change > failing, change > at_risk], ["failing", "at risk"], "passing"
+        ),
+    ).reset_index(drop=True)
+
+
+def score_with_custom_model(
+    file_path: Union[str, Path], chunk_rows: int = DEFAULT_CHUNK_ROWS
+) -> Iterable[Tuple[pd.DataFrame, np.ndarray]]:
+    """Score a dataset file chunk by chunk with the local custom model folder"""
+    from starter.custom_model import load_custom_model
+
+    hooks, model = load_custom_model()
+    positive = list(model.classes_).index(True)
+    dtypes = load_coating_schema().DTYPES
+    for chunk in iter_dataset_chunks(file_path, chunk_rows, dtypes=dtypes):
+        probabilities = model.predict_proba(hooks.transform(chunk, model))
+        yield chunk, probabilities[:, positive]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("predictions", type=Path, help="Prediction data file")
+    parser.add_argument("actuals", type=Path, help="Actuals file")
+    parser.add_argument("--store", type=Path, default=default_store_dir)
+    parser.add_argument("--association-id", default="ロット番号")
+    parser.add_argument("--target", default="ブリードアウト")
+    parser.add_argument("--date-col", default="date_col")
+    parser.add_argument(
+        "--segment",
+        action="append",
+        help=f"Repeatable, {DEFAULT_SEGMENTS} for a new store, "
+        "the stored ones for an existing store",
+    )
+    parser.add_argument("--reference-logloss", type=float)
+    args = parser.parse_args()
+
+    segment_attributes = args.segment
+    if segment_attributes is None and not (args.store / "meta.json").exists():
+        segment_attributes = DEFAULT_SEGMENTS
+    with AccuracyStore(args.store, segment_attributes=segment_attributes) as store:
+        for chunk, probabilities in score_with_custom_model(args.predictions):
+            store.add_predictions(
+                chunk[args.association_id],
+                probabilities,
+                days=chunk.get(args.date_col),
+                segments={name: chunk[name] for name in store.segments},
+            )
+        actuals = iter_dataset_chunks(args.actuals, dtypes=load_coating_schema().DTYPES)
+        for chunk in actuals:
+            store.join_actuals(chunk[args.association_id], chunk[args.target])
+        report = store.report()
+    with pd.option_context("display.max_rows", None, "display.width", 120):
+        print(report.to_string(index=False, float_format="{:.4f}".format))
+        if args.reference_logloss is not None:
+            print(
+                accuracy_decline(report, args.reference_logloss).to_string(index=False)
+            )
+
+
+if __name__ == "__main__":
+    main()
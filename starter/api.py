@@ -12,53 +12,110 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+"""Settings and URLs of the application, loaded on first use.
 
-import sys
-from urllib.parse import urljoin
+Importing this module is cheap, app cold start no longer pays for `datarobot`,
+`yaml`, pydantic and babel, the Pulumi CLI, the settings YAML and the stack
+outputs. They are imported and read by the first call of an accessor, and the
+result is kept for the lifetime of the process. `app_settings`, `deployment_id`
+and `scoring_dataset_id` remain available as lazy module attributes.
+"""
+
+from __future__ import annotations
 
-import datarobot as dr
-import yaml
-from pydantic import ValidationError
+import functools
+import sys
+from typing import TYPE_CHECKING, Any, Tuple
 
 sys.path.append("..")
 
-from starter.i18n import gettext
-from starter.resources import Deployment, ScoringDataset, app_settings_file_name
-from starter.schema import (
-    AppSettings,
-    AppUrls,
-)
-
-try:
-    with open(app_settings_file_name) as f:
-        app_settings = AppSettings(**yaml.safe_load(f))
-
-    deployment_id = Deployment().id
-    scoring_dataset_id = ScoringDataset().id
-except (FileNotFoundError, ValidationError) as e:
-    raise ValueError(
-        gettext(
-            "Unable to load Deployment IDs or Application Settings. "
-            "If running locally, verify you have selected the correct "
-            "stack and that it is active using `pulumi stack output`. "
-            "If running in DataRobot, verify your runtime parameters have been set correctly."
-        )
-    ) from e
+if TYPE_CHECKING:
+    from starter.schema import AppSettings, AppUrls
+
+
+@functools.lru_cache(maxsize=None)
+def _load_settings() -> Tuple[AppSettings, str, str]:
+    import yaml
+    from pydantic import ValidationError
+
+    from starter.i18n import gettext
+    from starter.resources import Deployment, ScoringDataset, get_app_settings_file_name
+    from starter.schema import AppSettings
+
+    try:
+        with open(get_app_settings_file_name()) as f:
+            app_settings = AppSettings(**yaml.safe_load(f))
+
+        deployment_id = Deployment().id
+        scoring_dataset_id = ScoringDataset().id
+    except (FileNotFoundError, ValidationError) as e:
+        raise ValueError(
+            gettext(
+                "Unable to load Deployment IDs or Application Settings. "
+                "If running locally, verify you have selected the correct "
+                "stack and that it is active using `pulumi stack output`. "
+                "If running in DataRobot, verify your runtime parameters have been set correctly."
+            )
+        ) from e
+    return app_settings, deployment_id, scoring_dataset_id
 
 
 def get_app_settings() -> AppSettings:
-    return app_settings
+    return _load_settings()[0]
 
 
-def get_app_urls() -> AppUrls:
-    base_url = urljoin(dr.Client().endpoint, "..")  # type: ignore[attr-defined]
-    use_case_url = base_url + f"usecases/{app_settings.use_case_id}/overview"
-    project_url = (
-        base_url + f"projects/{app_settings.project_id}/models/{app_settings.model_id}/"
-    )
-    deployment_url = base_url + f"deployments/{deployment_id}/overview"
+def get_deployment_id() -> str:
+    return _load_settings()[1]
+
+
+def get_scoring_dataset_id() -> str:
+    return _load_settings()[2]
+
+
+@functools.lru_cache(maxsize=None)
+def get_endpoint() -> str:
+    """API endpoint of the process-wide DataRobot client, resolved once"""
+    from starter.dr_client import get_client
+
+    endpoint: str = get_client().endpoint
+    return endpoint
+
+
+@functools.lru_cache(maxsize=None)
+def _build_app_urls(
+    endpoint: str, use_case_id: str, project_id: str, model_id: str, deployment_id: str
+) -> AppUrls:
+    from starter.schema import AppUrls
+    from starter.urls import url_builder
+
+    urls = url_builder(endpoint)
     return AppUrls(
-        use_case=use_case_url,
-        project=project_url,
-        deployment=deployment_url,
+        use_case=urls.use_case(use_case_id),
+        project=urls.project(project_id, model_id),
+        deployment=urls.deployment(deployment_id),
     )
+
+
+def get_app_urls() -> AppUrls:
+    """URLs of the app's DataRobot assets, built once per endpoint and settings"""
+    app_settings = get_app_settings()
+    return _build_app_urls(
+        get_endpoint(),
+        app_settings.use_case_id,
+        app_settings.project_id,
+        app_settings.model_id,
+        get_deployment_id(),
+    )
+
+
+_lazy_attributes = {
+    "app_settings": get_app_settings,
+    "deployment_id": get_deployment_id,
+    "scoring_dataset_id": get_scoring_dataset_id,
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _lazy_attributes:
+        return _lazy_attributes[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
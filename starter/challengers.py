@@ -0,0 +1,311 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Bulk challenger creation, checkpointed after every challenger.
+
+`ChallengerManager` creates challengers concurrently and records each one in a
+YAML checkpoint as soon as it exists, so an interrupted run resumes where it
+stopped. Challengers already on the deployment are matched by registered model
+version and never created twice, even if the checkpoint missed them.
+
+A deployment only has a few challenger slots. Challengers that do not fit are
+recorded as pending and created by a later run once slots are freed, see
+`read_pending`. Every new
+challenger replays the deployment's recent predictions server-side, so creations
+are bounded by their own concurrency rather than the training one.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Protocol
+
+import datarobot as dr
+import yaml
+from pydantic import BaseModel
+
+from starter.dr_client import AsyncDataRobot, gather_all, run
+from starter.paths import PROJECT_ROOT
+from starter.timing import timed
+
+default_challenger_state_path = PROJECT_ROOT / "outputs" / "challenger_state.yaml"
+
+# Challengers a DataRobot deployment can have next to its champion, by default.
+# Workflows pass `infra.settings_main.challenger_slots` (CHALLENGER_SLOTS)
+DEFAULT_CHALLENGER_SLOTS = 5
+# Challengers created at the same time, each one replays stored predictions
+DEFAULT_CREATE_CONCURRENCY = 2
+
+CREATED = "created"
+PENDING = "pending"
+
+
+class ExistingChallenger(BaseModel):
+    id: str
+    name: str
+    registered_model_version_id: Optional[str] = None
+
+
+class ChallengerRecord(BaseModel):
+    registered_model_version_id: str
+    status: str
+    challenger_id: Optional[str] = None
+
+
+class ChallengerBackend(Protocol):
+    """The challenger API of a deployment"""
+
+    def list(self, deployment_id: str) -> List[ExistingChallenger]: ...
+
+    def create(
+        self,
+        deployment_id: str,
+        registered_model_version_id: str,
+        prediction_environment_id: str,
+        name: str,
+    ) -> str: ...
+
+
+class DataRobotChallengers:
+    """`ChallengerBackend` on `dr.Challenger`, the champion is not listed"""
+
+    def list(self, deployment_id: str) -> List[ExistingChallenger]:
+        deployment = dr.Deployment.get(deployment_id)  # type: ignore[attr-defined]
+        champion = (getattr(deployment, "model_package", None) or {}).get("id")
+        challengers = dr.models.deployment.challenger.Challenger.list(deployment_id)
+        return [
+            ExistingChallenger(
+                id=c.id,
+                name=c.name or "",
+                registered_model_version_id=(c.model_package or {}).get("id"),
+            )
+            for c in challengers
+            if (c.model_package or {}).get("id") != champion
+        ]
+
+    @timed(phase="challengers")
+    def create(
+        self,
+        deployment_id: str,
+        registered_model_version_id: str,
+        prediction_environment_id: str,
+        name: str,
+    ) -> str:
+        challenger = dr.models.deployment.challenger.Challenger.create(
+            deployment_id=deployment_id,
+            model_package_id=registered_model_version_id,
+            prediction_environment_id=prediction_environment_id,
+            name=name,
+        )
+        return str(challenger.id)
+
+
+def read_pending(state_path: Path = default_challenger_state_path) -> List[str]:
+    """Challengers left pending in a checkpoint, whichever deployment it belongs to"""
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            state: Dict[str, Any] = yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        return []
+    return [
+        name
+        for name, record in (state.get("challengers") or {}).items()
+        if record.get("status") == PENDING
+    ]
+
+
+class ChallengerManager:
+    """Create challengers of one deployment idempotently
+
+    Parameters
+    ----------
+    deployment_id : str
+        Deployment the challengers are added to
+    prediction_environment_id : str
+        Prediction environment of the challengers
+    state_path : Path
+        YAML checkpoint, started over when it belongs to another deployment
+    slots : int
+        Challengers the deployment can have, including existing ones
+    max_concurrency : int
+        Challengers created at the same time
+    backend : ChallengerBackend, optional
+        Defaults to `DataRobotChallengers`
+    """
+
+    def __init__(
+        self,
+        deployment_id: str,
+        prediction_environment_id: str,
+        state_path: Path = default_challenger_state_path,
+        slots: int = DEFAULT_CHALLENGER_SLOTS,
+        max_concurrency: int = DEFAULT_CREATE_CONCURRENCY,
+        backend: Optional[ChallengerBackend] = None,
+    ) -> None:
+        self.deployment_id = deployment_id
+        self.prediction_environment_id = prediction_environment_id
+        self.state_path = Path(state_path)
+        self.slots = slots
+        self.max_concurrency = max_concurrency
+        self._create_slots = threading.BoundedSemaphore(max_concurrency)
+        self.backend: ChallengerBackend = backend or DataRobotChallengers()
+        self._lock = threading.Lock()
+        self.records = self._read()
+        self._existing: Optional[Dict[str, ExistingChallenger]] = None
+        self._creating = 0
+
+    def _read(self) -> Dict[str, ChallengerRecord]:
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                state: Dict[str, Any] = yaml.safe_load(f) or {}
+        except FileNotFoundError:
+            return {}
+        if state.get("deployment_id") != self.deployment_id:
+            return {}
+        return {
+            name: ChallengerRecord(**record)
+            for name, record in (state.get("challengers") or {}).items()
+        }
+
+    def _write(self) -> None:
+        state = {
+            "deployment_id": self.deployment_id,
+            "challengers": {
+                name: record.model_dump(exclude_none=True)
+                for name, record in self.records.items()
+            },
+        }
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            yaml.safe_dump(state, f, allow_unicode=True, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    def existing(self) -> Dict[str, ExistingChallenger]:
+        """Challengers on the deployment by registered model version, listed once"""
+        with self._lock:
+            if self._existing is None:
+                self._existing = {
+                    c.registered_model_version_id or c.id: c
+                    for c in self.backend.list(self.deployment_id)
+                }
+            return self._existing
+
+    def _record(self, name: str, record: ChallengerRecord) -> None:
+        self.records[name] = record
+        self._write()
+
+    def create(self, name: str, registered_model_version_id: str) -> Optional[str]:
+        """Create one challenger unless it exists, safe to call from many threads
+
+        Returns
+        -------
+        str or None :
+            ID of the challenger, None if no slot was free
+        """
+        existing = self.existing()
+        with self._lock:
+            # The deployment is the source of truth, a checkpointed challenger
+            # that was deleted since is created again
+            found = existing.get(registered_model_version_id)
+            if found is not None:
+                self._record(
+                    name,
+                    ChallengerRecord(
+                        registered_model_version_id=registered_model_version_id,
+                        status=CREATED,
+                        challenger_id=found.id,
+                    ),
+                )
+                return found.id
+            if len(existing) + self._creating >= self.slots:
+                self._record(
+                    name,
+                    ChallengerRecord(
+                        registered_model_version_id=registered_model_version_id,
+                        status=PENDING,
+                    ),
+                )
+                print(f"No free challenger slot for {name}, left pending")
+                return None
+            self._creating += 1
+
+        try:
+            with self._create_slots:
+                challenger_id = self.backend.create(
+                    self.deployment_id,
+                    registered_model_version_id,
+                    self.prediction_environment_id,
+                    name,
+                )
+        finally:
+            with self._lock:
+                self._creating -= 1
+        with self._lock:
+            existing[registered_model_version_id] = ExistingChallenger(
+                id=challenger_id,
+                name=name,
+                registered_model_version_id=registered_model_version_id,
+            )
+            self._record(
+                name,
+                ChallengerRecord(
+                    registered_model_version_id=registered_model_version_id,
+                    status=CREATED,
+                    challenger_id=challenger_id,
+                ),
+            )
+        return challenger_id
+
+    async def create_all(
+        self, drx: AsyncDataRobot, registered_ids: Mapping[str, str]
+    ) -> Dict[str, str]:
+        """Create challengers named by the keys of `registered_ids` concurrently
+
+        Returns
+        -------
+        Dict[str, str] :
+            Registered model version IDs of the challengers that exist, by name
+
+        Raises
+        ------
+        Exception :
+            The first creation error, once the other creations have finished
+        """
+        names = list(registered_ids)
+        # Listed before the creations start, not by each of them
+        await drx.call(self.existing)
+        challenger_ids = await gather_all(
+            drx.call(self.create, name, registered_ids[name]) for name in names
+        )
+        return {
+            name: registered_ids[name]
+            for name, challenger_id in zip(names, challenger_ids)
+            if challenger_id is not None
+        }
+
+    def create_bulk(self, registered_ids: Mapping[str, str]) -> Dict[str, str]:
+        """Synchronous `create_all` with its own `AsyncDataRobot`"""
+        return run(
+            lambda drx: self.create_all(drx, registered_ids),
+            max_concurrency=self.max_concurrency,
+        )
+
+    @property
+    def pending(self) -> List[str]:
+        return [
+            name for name, record in self.records.items() if record.status == PENDING
+        ]
@@ -0,0 +1,117 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Local access to the custom model folder shipped by `infra/__main__.py`."""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import importlib.util
+import json
+import sys
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Optional
+
+from starter.paths import custom_model_dir, default_training_data_path
+
+
+def _add_to_path(code_dir: Path) -> None:
+    if str(code_dir) not in sys.path:
+        sys.path.insert(0, str(code_dir))
+
+
+def load_custom_hooks(code_dir: Optional[Path] = None) -> ModuleType:
+    """Import `custom.py` the same way DRUM does, with the model folder on sys.path"""
+    code_dir = code_dir or custom_model_dir
+    _add_to_path(code_dir)
+    spec = importlib.util.spec_from_file_location("custom", code_dir / "custom.py")
+    if spec is None or spec.loader is None:
+        raise ValueError(f"Invalid custom model folder: {code_dir}")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_coating_schema(code_dir: Optional[Path] = None) -> ModuleType:
+    """Import the dtype schema `coating_schema.py` shared with `custom.py`"""
+    _add_to_path(code_dir or custom_model_dir)
+    return importlib.import_module("coating_schema")
+
+
+def load_custom_model(code_dir: Optional[Path] = None) -> tuple[ModuleType, Any]:
+    """Return the hooks module and the model loaded through its `load_model` hook"""
+    code_dir = code_dir or custom_model_dir
+    hooks = load_custom_hooks(code_dir)
+    return hooks, hooks.load_model(str(code_dir))
+
+
+def write_imputation_values(
+    training_data_path: Path = default_training_data_path,
+    code_dir: Optional[Path] = None,
+) -> Path:
+    """Compute imputation values from the training data and ship them with the model"""
+    from starter.dataset_io import read_dataset
+
+    code_dir = code_dir or custom_model_dir
+    hooks = load_custom_hooks(code_dir)
+    values = hooks.fit_imputation_values(read_dataset(training_data_path))
+    output_path: Path = code_dir / hooks.IMPUTATION_VALUES_FILE_NAME
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(values, f, ensure_ascii=False, indent=2)
+    return output_path
+
+
+def write_model_artifact(code_dir: Optional[Path] = None) -> Path:
+    """Convert the pickled model into the memory-mapped artifact `load_model` prefers
+
+    The manifest records the imputation values, so they are written first.
+    """
+    import pickle
+
+    code_dir = code_dir or custom_model_dir
+    hooks = load_custom_hooks(code_dir)
+    model_artifact = importlib.import_module("model_artifact")
+    model_path = code_dir / hooks.MODEL_FILE_NAME
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+    manifest_path = model_artifact.save_forest(
+        model,
+        str(code_dir / model_artifact.ARTIFACT_DIR_NAME),
+        feature_names=list(getattr(model, "feature_names_in_", hooks.FEATURE_NAMES)),
+        feature_dtypes=hooks.FEATURE_DTYPES,
+        imputation_values=hooks.load_imputation_values(str(code_dir)),
+        category_maps=hooks.CATEGORY_MAPS,
+        source_path=str(model_path),
+    )
+    return Path(manifest_path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Build the fit-time artifacts of the custom model folder"
+    )
+    parser.add_argument(
+        "--training-data", type=Path, default=default_training_data_path
+    )
+    parser.add_argument("--code-dir", type=Path, default=custom_model_dir)
+    args = parser.parse_args()
+    output_path = write_imputation_values(args.training_data, args.code_dir)
+    print(f"Wrote imputation values to {output_path}")
+    print(f"Wrote model artifact to {write_model_artifact(args.code_dir)}")
+
+
+if __name__ == "__main__":
+    main()
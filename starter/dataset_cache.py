@@ -0,0 +1,249 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Content-addressed cache of AI Catalog uploads.
+
+Maps a dataset's file contents, preprocessing function and upload parameters to
+the dataset ID it was uploaded as, so unchanged inputs skip both the pandas parse
+and the upload on the next `pulumi up`. Misses are uploaded through the chunked
+ingestion in `starter.ingest`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import inspect
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Union
+
+import datarobot as dr
+
+from starter.dataset_io import DEFAULT_CHUNK_ROWS, FormatLike
+from starter.ingest import Preprocess, stream_dataset_to_catalog
+from starter.paths import PROJECT_ROOT
+from starter.timing import timed
+
+default_dataset_cache_path = PROJECT_ROOT / "outputs" / "dataset_cache.json"
+
+# Bytes hashed per read, keeps memory flat for large files
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_sha256(file_path: Union[str, Path]) -> str:
+    """Hash a file in fixed-size chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def preprocess_identity(preprocess: Optional[Preprocess]) -> str:
+    """Identify a preprocessing function by its name and source code
+
+    Editing the function body invalidates every cache entry produced with it.
+    Callable objects are identified by their class source and `repr`, which must
+    include every setting that changes the output.
+    """
+    if preprocess is None:
+        return ""
+    if not inspect.isfunction(preprocess):
+        cls = type(preprocess)
+        source = (inspect.getsource(cls) + repr(preprocess)).encode()
+        return (
+            f"{cls.__module__}.{cls.__qualname__}:{hashlib.sha256(source).hexdigest()}"
+        )
+    name = f"{preprocess.__module__}.{preprocess.__qualname__}"
+    try:
+        source = inspect.getsource(preprocess).encode()
+    except (OSError, TypeError):
+        # Functions defined interactively have no source file
+        code = preprocess.__code__
+        source = code.co_code + repr(code.co_consts).encode()
+    return f"{name}:{hashlib.sha256(source).hexdigest()}"
+
+
+class DatasetCache:
+    """JSON file mapping content keys to AI Catalog dataset IDs
+
+    File digests are stored with the size and mtime they were computed for, so a
+    file that has not been touched is not read again. The cache is safe to share
+    between threads of one process.
+    """
+
+    def __init__(self, path: Path = default_dataset_cache_path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data: Dict[str, Dict[str, Any]] = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = {}
+        data.setdefault("files", {})
+        data.setdefault("datasets", {})
+        return data
+
+    def _write(self, data: Dict[str, Dict[str, Any]]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def file_digest(self, file_path: Union[str, Path]) -> str:
+        """SHA-256 of a file, recomputed only when its size or mtime changed"""
+        resolved = str(Path(file_path).resolve())
+        stat = os.stat(resolved)
+        with self._lock:
+            entry = self._read()["files"].get(resolved)
+        if (
+            entry is not None
+            and entry["size"] == stat.st_size
+            and entry["mtime_ns"] == stat.st_mtime_ns
+        ):
+            return str(entry["sha256"])
+        sha256 = file_sha256(resolved)
+        with self._lock:
+            data = self._read()
+            data["files"][resolved] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": sha256,
+            }
+            self._write(data)
+        return sha256
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            dataset_id: Optional[str] = self._read()["datasets"].get(key)
+        return dataset_id
+
+    def set(self, key: str, dataset_id: str) -> None:
+        with self._lock:
+            data = self._read()
+            data["datasets"][key] = dataset_id
+            self._write(data)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            data = self._read()
+            if data["datasets"].pop(key, None) is not None:
+                self._write(data)
+
+
+_default_cache = DatasetCache()
+
+
+def dataset_exists(dataset_id: str) -> bool:
+    try:
+        dr.Dataset.get(dataset_id)  # type: ignore[attr-defined]
+    except dr.errors.ClientError:
+        return False
+    return True
+
+
+@timed(phase="datasets")
+def get_or_create_dataset_from_file(
+    endpoint: str,
+    token: str,
+    file_path: Union[str, Path],
+    name: str,
+    use_cases: Optional[str] = None,
+    preprocess: Optional[Preprocess] = None,
+    extra_key: Iterable[str] = (),
+    cache: Optional[DatasetCache] = None,
+    verify: bool = True,
+    chunk_rows: Optional[int] = DEFAULT_CHUNK_ROWS,
+    file_format: Optional[FormatLike] = None,
+    dtypes: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Upload a dataset file to the AI Catalog unless the same content was uploaded before
+
+    Parameters
+    ----------
+    endpoint : str
+        DataRobot API endpoint
+    token : str
+        DataRobot API token
+    file_path : str or Path
+        CSV, Parquet or Arrow IPC file to upload
+    name : str
+        Dataset name in the AI Catalog
+    use_cases : str, optional
+        Use Case ID the dataset is linked to
+    preprocess : Callable[[pd.DataFrame], pd.DataFrame], optional
+        Applied to each chunk of the parsed file before uploading
+    extra_key : Iterable[str]
+        Additional values the preprocessed data depends on, e.g. the current date
+    cache : DatasetCache, optional
+        Defaults to `outputs/dataset_cache.json`
+    verify : bool
+        Check that a cached dataset still exists before returning it
+    chunk_rows : int, optional
+        Rows read and preprocessed at a time, None for preprocess hooks that need
+        the whole file
+    file_format : DatasetFormat or str, optional
+        Inferred from the file suffix by default
+    dtypes : dict, optional
+        Column dtypes applied before the preprocess hook
+
+    Returns
+    -------
+    str :
+        ID of the AI Catalog dataset
+    """
+    cache = cache or _default_cache
+    key = hashlib.sha256(
+        json.dumps(
+            [
+                endpoint,
+                name,
+                use_cases,
+                cache.file_digest(file_path),
+                preprocess_identity(preprocess),
+                list(extra_key),
+            ]
+            # Appended only when set, so existing cache entries stay valid
+            + ([{k: str(v) for k, v in dtypes.items()}] if dtypes else [])
+            # Chunk-dependent preprocess hooks upload different data per chunk size
+            + ([{"chunk_rows": chunk_rows}] if preprocess is not None else []),
+            ensure_ascii=False,
+        ).encode()
+    ).hexdigest()
+
+    dataset_id = cache.get(key)
+    if dataset_id is not None:
+        if not verify or dataset_exists(dataset_id):
+            print(f"Using cached upload of {file_path}: {dataset_id}")
+            return dataset_id
+        cache.discard(key)
+
+    uploaded_id = stream_dataset_to_catalog(
+        endpoint=endpoint,
+        token=token,
+        file_path=file_path,
+        name=name,
+        use_cases=use_cases,
+        preprocess=preprocess,
+        chunk_rows=chunk_rows,
+        file_format=file_format,
+        dtypes=dtypes,
+    )
+    cache.set(key, uploaded_id)
+    return uploaded_id
@@ -0,0 +1,325 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Single reader for dataset files in CSV, Parquet or Arrow IPC (Feather v2).
+
+CSV files are converted once to an Arrow IPC file under `outputs/columnar/`, keyed
+by the source path, size and mtime. Later reads memory-map that file instead of
+parsing text, and only the requested columns are materialised. Dates stay strings,
+as they are with `pd.read_csv`, so the frames are the same whichever way they were
+read.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from starter.paths import PROJECT_ROOT
+
+# Rows per chunk, about 10 MB for the coating datasets
+DEFAULT_CHUNK_ROWS = 100_000
+
+# Arrow IPC copies of CSV files, read at call time so tests can redirect it
+columnar_cache_dir = PROJECT_ROOT / "outputs" / "columnar"
+
+Dtypes = Dict[str, Any]
+
+
+class DatasetFormat(str, Enum):
+    CSV = "csv"
+    PARQUET = "parquet"
+    ARROW = "arrow"
+
+
+# Also accepted as plain strings, as in `DatasetArgs.format`
+FormatLike = Union[DatasetFormat, str]
+
+FORMAT_SUFFIXES = {
+    ".csv": DatasetFormat.CSV,
+    ".gz": DatasetFormat.CSV,
+    ".parquet": DatasetFormat.PARQUET,
+    ".pq": DatasetFormat.PARQUET,
+    ".arrow": DatasetFormat.ARROW,
+    ".feather": DatasetFormat.ARROW,
+    ".ipc": DatasetFormat.ARROW,
+}
+
+
+def infer_format(file_path: Union[str, Path]) -> DatasetFormat:
+    suffix = Path(file_path).suffix.lower()
+    if suffix not in FORMAT_SUFFIXES:
+        raise ValueError(f"Unknown dataset format: {file_path}")
+    return FORMAT_SUFFIXES[suffix]
+
+
+def iter_csv_chunks(
+    file_path: Union[str, Path],
+    chunk_rows: Optional[int] = DEFAULT_CHUNK_ROWS,
+    **read_csv_kwargs: Any,
+) -> Iterator[pd.DataFrame]:
+    """Read a CSV file in chunks of `chunk_rows`, or whole if it is None"""
+    if chunk_rows is None:
+        yield pd.read_csv(file_path, **read_csv_kwargs)
+        return
+    with pd.read_csv(file_path, chunksize=chunk_rows, **read_csv_kwargs) as reader:
+        yield from reader
+
+
+def csv_convert_options(file_path: Union[str, Path]) -> pa_csv.ConvertOptions:
+    """Column types inferred from the first block, with dates kept as strings"""
+    with pa_csv.open_csv(file_path) as reader:
+        schema = reader.schema
+    return pa_csv.ConvertOptions(
+        column_types={
+            field.name: pa.string()
+            for field in schema
+            if pa.types.is_temporal(field.type)
+        }
+    )
+
+
+# Column index of a value that did not fit the type inferred from the first block
+_CONVERSION_ERROR = re.compile(r"CSV column #(\d+)")
+
+
+def _widened(
+    column_types: Dict[str, pa.DataType], schema: pa.Schema, error: pa.ArrowInvalid
+) -> Dict[str, pa.DataType]:
+    # Integers become floats first, any other type that fails becomes text
+    match = _CONVERSION_ERROR.search(str(error))
+    if match is None:
+        raise error
+    field = schema.field(int(match.group(1)))
+    if pa.types.is_string(field.type):
+        raise error
+    widened = pa.float64() if pa.types.is_integer(field.type) else pa.string()
+    return {**column_types, field.name: widened}
+
+
+def csv_column_types(
+    file_path: Union[str, Path], columns: Optional[Sequence[str]] = None
+) -> Dict[str, pa.DataType]:
+    """Column types that fit every block of a CSV file, see `csv_convert_options`
+
+    A column with a later value that does not fit the type inferred from the first
+    block is widened and the file scanned again, one block at a time.
+    """
+    column_types = dict(csv_convert_options(file_path).column_types)
+    while True:
+        convert_options = pa_csv.ConvertOptions(
+            column_types=column_types, include_columns=columns
+        )
+        with pa_csv.open_csv(file_path, convert_options=convert_options) as reader:
+            try:
+                for _ in reader:
+                    pass
+                return {field.name: field.type for field in reader.schema}
+            except pa.ArrowInvalid as e:
+                column_types = _widened(column_types, reader.schema, e)
+
+
+def convert_csv_to_arrow(
+    file_path: Union[str, Path], output_path: Union[str, Path]
+) -> int:
+    """Stream a CSV file into an Arrow IPC file, returning the number of rows
+
+    When a later block does not fit the types inferred from the first one, the
+    failing column is widened and the file streamed again, so memory stays bounded
+    by the block size.
+    """
+    column_types = dict(csv_convert_options(file_path).column_types)
+    tmp_path = Path(f"{output_path}.{os.getpid()}.tmp")
+    try:
+        while True:
+            rows = 0
+            convert_options = pa_csv.ConvertOptions(column_types=column_types)
+            with pa_csv.open_csv(file_path, convert_options=convert_options) as reader:
+                try:
+                    with pa.ipc.new_file(tmp_path, reader.schema) as writer:
+                        for batch in reader:
+                            writer.write_batch(batch)
+                            rows += batch.num_rows
+                    break
+                except pa.ArrowInvalid as e:
+                    column_types = _widened(column_types, reader.schema, e)
+        os.replace(tmp_path, output_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return rows
+
+
+def iter_csv_tables(
+    file_path: Union[str, Path],
+    chunk_rows: int,
+    columns: Optional[Sequence[str]] = None,
+) -> Iterator[pa.Table]:
+    """Stream a CSV file as Arrow tables of `chunk_rows`, without an Arrow IPC copy
+
+    The column types are scanned first with `csv_column_types`, so every chunk has
+    the types a whole-file read would have.
+    """
+    convert_options = pa_csv.ConvertOptions(
+        column_types=csv_column_types(file_path, columns), include_columns=columns
+    )
+    with pa_csv.open_csv(file_path, convert_options=convert_options) as reader:
+        pending: List[pa.RecordBatch] = []
+        pending_rows = 0
+        yielded = False
+        for batch in reader:
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            while pending_rows >= chunk_rows:
+                table = pa.Table.from_batches(pending, reader.schema)
+                yield table.slice(0, chunk_rows)
+                yielded = True
+                pending = table.slice(chunk_rows).to_batches()
+                pending_rows -= chunk_rows
+        if pending_rows or not yielded:
+            yield pa.Table.from_batches(pending, reader.schema)
+
+
+def columnar_path(
+    file_path: Union[str, Path], cache_dir: Optional[Path] = None
+) -> Path:
+    """Arrow IPC copy of a CSV file, converted on first use"""
+    source = Path(file_path).resolve()
+    stat = source.stat()
+    cache_dir = cache_dir or columnar_cache_dir
+    source_id = hashlib.sha256(str(source).encode()).hexdigest()[:12]
+    prefix = f"{source.name}-{source_id}"
+    path = cache_dir / f"{prefix}-{stat.st_size}-{stat.st_mtime_ns}.arrow"
+    if not path.exists():
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        for stale in cache_dir.glob(f"{prefix}-*.arrow"):
+            stale.unlink(missing_ok=True)
+        convert_csv_to_arrow(source, path)
+    return path
+
+
+def open_table(
+    file_path: Union[str, Path],
+    columns: Optional[Sequence[str]] = None,
+    file_format: Optional[FormatLike] = None,
+    cache: bool = True,
+) -> pa.Table:
+    """Arrow table of a dataset file, memory-mapped for Arrow IPC and cached CSV
+
+    Parameters
+    ----------
+    file_path : str or Path
+        Dataset file
+    columns : Sequence[str], optional
+        Columns to read, all by default
+    file_format : DatasetFormat or str, optional
+        Inferred from the suffix by default
+    cache : bool
+        Read CSV files through their Arrow IPC copy, parse them otherwise
+    """
+    file_format = DatasetFormat(file_format or infer_format(file_path))
+    if file_format == DatasetFormat.PARQUET:
+        return pq.read_table(file_path, columns=columns)
+    if file_format == DatasetFormat.CSV and not cache:
+        return pa_csv.read_csv(
+            file_path,
+            convert_options=pa_csv.ConvertOptions(
+                column_types=csv_convert_options(file_path).column_types,
+                include_columns=columns,
+            ),
+        )
+    if file_format == DatasetFormat.CSV:
+        file_path = columnar_path(file_path)
+    with pa.memory_map(str(file_path)) as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table if columns is None else table.select(list(columns))
+
+
+def _to_pandas(table: pa.Table, dtypes: Optional[Dtypes]) -> pd.DataFrame:
+    dtypes = {k: v for k, v in (dtypes or {}).items() if k in table.column_names}
+    for name, dtype in dtypes.items():
+        if str(dtype) == "category":
+            # Dictionary-encoded columns convert straight to categoricals, without
+            # a Python string per row in between
+            i = table.column_names.index(name)
+            table = table.set_column(i, name, table.column(i).dictionary_encode())
+    df = table.to_pandas()
+    return df.astype(dtypes) if dtypes else df
+
+
+def read_dataset(
+    file_path: Union[str, Path],
+    columns: Optional[Sequence[str]] = None,
+    dtypes: Optional[Dtypes] = None,
+    file_format: Optional[FormatLike] = None,
+    cache: bool = True,
+) -> pd.DataFrame:
+    """Read a dataset file into a DataFrame, see `open_table`
+
+    `dtypes` maps columns to the pandas dtypes they are converted to.
+    """
+    return _to_pandas(open_table(file_path, columns, file_format, cache), dtypes)
+
+
+def iter_dataset_chunks(
+    file_path: Union[str, Path],
+    chunk_rows: Optional[int] = DEFAULT_CHUNK_ROWS,
+    columns: Optional[Sequence[str]] = None,
+    dtypes: Optional[Dtypes] = None,
+    file_format: Optional[FormatLike] = None,
+    cache: bool = True,
+) -> Iterator[pd.DataFrame]:
+    """Read a dataset file in chunks of `chunk_rows`, or whole if it is None
+
+    Only one chunk is converted to pandas at a time. Parquet files are read
+    batch by batch, Arrow IPC files are memory-mapped and sliced, and CSV files
+    are streamed with `iter_csv_tables` when `cache` is False.
+    """
+    file_format = DatasetFormat(file_format or infer_format(file_path))
+    if chunk_rows is None:
+        yield read_dataset(file_path, columns, dtypes, file_format, cache)
+        return
+    if file_format == DatasetFormat.CSV and not cache:
+        for table in iter_csv_tables(file_path, chunk_rows, columns):
+            yield _to_pandas(table, dtypes)
+        return
+    if file_format == DatasetFormat.PARQUET:
+        parquet_file = pq.ParquetFile(file_path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=columns):
+            yield _to_pandas(pa.Table.from_batches([batch]), dtypes)
+        return
+    table = open_table(file_path, columns, file_format, cache)
+    for offset in range(0, max(table.num_rows, 1), chunk_rows):
+        yield _to_pandas(table.slice(offset, chunk_rows), dtypes)
+
+
+def column_names(
+    file_path: Union[str, Path], file_format: Optional[FormatLike] = None
+) -> List[str]:
+    """Columns of a dataset file, read from its schema only"""
+    file_format = DatasetFormat(file_format or infer_format(file_path))
+    if file_format == DatasetFormat.PARQUET:
+        return list(pq.read_schema(file_path).names)
+    if file_format == DatasetFormat.CSV:
+        file_path = columnar_path(file_path)
+    with pa.memory_map(str(file_path)) as source:
+        return list(pa.ipc.open_file(source).schema.names)
@@ -0,0 +1,123 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Re-anchor the dates of replayed datasets relative to a target date."""
+
+from __future__ import annotations
+
+import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from starter.dataset_io import DEFAULT_CHUNK_ROWS, iter_dataset_chunks
+
+
+class DateReanchor:
+    """Shift a date column so that its latest date falls on `anchor`
+
+    Each distinct date string is parsed once with `datetime_format` and its
+    shifted value is cached, so rows only go through an integer lookup. The
+    shift comes from the date range of the whole dataset: call `fit_file` or
+    `fit` before applying the stage to chunks, otherwise the first frame it is
+    applied to is used.
+
+    Parameters
+    ----------
+    date_col : str
+        Column holding the dates
+    datetime_format : str
+        Format of the dates, used both to parse and to write them
+    anchor : datetime.date, optional
+        Date the latest date is moved to, defaults to a week from today
+    only_if_starts_on : datetime.date, optional
+        Only shift datasets whose earliest date is this one, e.g. the original
+        sample, and leave data that is already current untouched
+    """
+
+    def __init__(
+        self,
+        date_col: str,
+        datetime_format: str,
+        anchor: Optional[datetime.date] = None,
+        only_if_starts_on: Optional[datetime.date] = None,
+    ) -> None:
+        self.date_col = date_col
+        self.datetime_format = datetime_format
+        self.anchor = anchor or datetime.date.today() + datetime.timedelta(days=7)
+        self.only_if_starts_on = only_if_starts_on
+        self.offset: Optional[pd.Timedelta] = None
+        self._shifted: Dict[str, str] = {}
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}(date_col={self.date_col!r}, "
+            f"datetime_format={self.datetime_format!r}, anchor={self.anchor}, "
+            f"only_if_starts_on={self.only_if_starts_on})"
+        )
+
+    def parse(self, values: Iterable[str]) -> pd.DatetimeIndex:
+        return pd.to_datetime(pd.Index(values), format=self.datetime_format)
+
+    def fit(self, chunks: Iterable[pd.Series]) -> DateReanchor:
+        """Compute the shift from the date range over all chunks of the column"""
+        firsts, lasts = [], []
+        for chunk in chunks:
+            dates = self.parse(pd.unique(chunk.dropna()))
+            if len(dates):
+                firsts.append(dates.min())
+                lasts.append(dates.max())
+        if not lasts or (
+            self.only_if_starts_on is not None
+            and min(firsts) != pd.Timestamp(self.only_if_starts_on)
+        ):
+            self.offset = pd.Timedelta(0)
+        else:
+            self.offset = pd.Timestamp(self.anchor) - max(lasts)
+        self._shifted = {}
+        return self
+
+    def fit_file(
+        self, file_path: Union[str, Path], chunk_rows: int = DEFAULT_CHUNK_ROWS
+    ) -> DateReanchor:
+        """Fit on a dataset file, reading only the date column"""
+        return self.fit(
+            chunk[self.date_col]
+            for chunk in iter_dataset_chunks(
+                file_path,
+                chunk_rows,
+                columns=[self.date_col],
+                dtypes={self.date_col: str},
+                cache=False,
+            )
+        )
+
+    def __call__(self, dataset: pd.DataFrame) -> pd.DataFrame:
+        if self.date_col not in dataset.columns:
+            return dataset
+        if self.offset is None:
+            self.fit([dataset[self.date_col]])
+        if not self.offset:
+            return dataset
+        codes, uniques = pd.factorize(dataset[self.date_col].astype("string"))
+        new = [u for u in uniques if u not in self._shifted]
+        if new:
+            shifted = (self.parse(new) + self.offset).strftime(self.datetime_format)
+            self._shifted.update(zip(new, shifted))
+        # Missing dates get code -1, which indexes the trailing None
+        lookup = np.array([self._shifted[u] for u in uniques] + [None], dtype=object)
+        dataset[self.date_col] = lookup[codes]
+        return dataset
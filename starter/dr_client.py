@@ -0,0 +1,163 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Shared DataRobot client and thread-pooled SDK calls.
+
+`get_client` loads `.env` and configures `dr.Client` on first use. The returned
+client keeps up to `pool_size` connections alive, so REST calls made with it from
+worker threads, like the uploads of `starter.local_intake`, reuse them. The global
+SDK client is not pinned: the datarobotx `get_or_create_*` helpers configure one
+of their own on every call, with the default pool.
+
+`AsyncDataRobot` runs blocking SDK calls in a bounded thread pool, so independent
+uploads, challenger creations and actuals submissions overlap:
+
+    async with AsyncDataRobot(max_concurrency=4) as drx:
+        ids = await asyncio.gather(*(drx.call(upload, path) for path in paths))
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import TracebackType
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Type, TypeVar
+
+import datarobot as dr
+from dotenv import load_dotenv
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+T = TypeVar("T")
+
+# SDK calls running at the same time, and connections kept alive per host
+DEFAULT_CONCURRENCY = 8
+
+_client: Optional[dr.rest.RESTClientObject] = None
+_client_lock = threading.Lock()
+
+
+def pool_connections(session: Session, pool_size: int) -> Session:
+    """Keep up to `pool_size` connections alive per host, retry settings unchanged"""
+    for prefix, adapter in list(session.adapters.items()):
+        max_retries = getattr(adapter, "max_retries", 0)
+        session.mount(
+            prefix,
+            HTTPAdapter(
+                pool_connections=pool_size,
+                pool_maxsize=pool_size,
+                max_retries=max_retries,
+            ),
+        )
+    return session
+
+
+def get_client(pool_size: int = DEFAULT_CONCURRENCY) -> dr.rest.RESTClientObject:
+    """The pooled DataRobot client of this process, configured from `.env` once
+
+    A later `dr.Client(...)`, e.g. in a datarobotx helper, replaces the global SDK
+    client but not the one returned here.
+
+    Parameters
+    ----------
+    pool_size : int
+        Connections kept alive per host, only used by the first call
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            load_dotenv()
+            client = dr.Client()  # type: ignore[attr-defined]
+            _client = pool_connections(client, pool_size)  # type: ignore[assignment]
+        return _client  # type: ignore[return-value]
+
+
+def reset_client() -> None:
+    """Forget the configured client, the next `get_client` reads `.env` again"""
+    global _client
+    with _client_lock:
+        _client = None
+
+
+class AsyncDataRobot:
+    """Bounded-concurrency asyncio access to the blocking DataRobot SDK
+
+    Parameters
+    ----------
+    max_concurrency : int
+        SDK calls running at the same time, also the size of the thread pool
+    """
+
+    def __init__(self, max_concurrency: int = DEFAULT_CONCURRENCY) -> None:
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="datarobot"
+        )
+
+    async def __aenter__(self) -> AsyncDataRobot:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    async def call(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking SDK call in the thread pool"""
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(fn, *args, **kwargs)
+            )
+
+
+async def gather_all(awaitables: Iterable[Awaitable[T]]) -> List[T]:
+    """Await everything, then raise the first error if any call failed
+
+    Unlike `asyncio.gather`, the calls still running are not abandoned when one
+    fails, so no upload is left half done.
+    """
+    results = await asyncio.gather(*awaitables, return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results  # type: ignore[return-value]
+
+
+def run(
+    workflow: Callable[[AsyncDataRobot], Awaitable[T]],
+    max_concurrency: int = DEFAULT_CONCURRENCY,
+) -> T:
+    """Run an async workflow with a fresh `AsyncDataRobot` from synchronous code"""
+
+    async def main() -> T:
+        async with AsyncDataRobot(max_concurrency=max_concurrency) as drx:
+            return await workflow(drx)
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(main())
+    # Event loops do not nest, e.g. inside a Pulumi apply, so use a thread of its own
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, main()).result()
@@ -0,0 +1,349 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Local feature and target drift, checked before uploading to a deployment.
+
+The training data is summarised once into a `DriftBaseline`: for every feature,
+quantile bin edges or the most frequent categories, and the baseline counts per
+bin, stored as NumPy arrays in an `.npz` file. Scoring batches are binned against
+it in one vectorized pass and a `DriftTracker` adds their counts per time bucket
+of the date column, so PSI and Jensen-Shannon divergence can be reported at any
+point while batches keep arriving.
+
+    python -m starter.drift assets/prediction_data.csv --freq W
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from starter.custom_model import load_coating_schema
+from starter.dataset_io import DEFAULT_CHUNK_ROWS, iter_dataset_chunks, read_dataset
+from starter.paths import PROJECT_ROOT, default_training_data_path
+
+default_baseline_path = PROJECT_ROOT / "outputs" / "drift_baseline.npz"
+
+# Columns that identify rows rather than describe them
+DEFAULT_EXCLUDED_COLUMNS = ("ロット番号", "date_col")
+
+# PSI above which a feature is reported as drifted
+DRIFT_THRESHOLD = 0.15
+
+# Smoothing for empty bins, which would make PSI infinite
+EPSILON = 1e-4
+
+NUMERIC = "numeric"
+CATEGORICAL = "categorical"
+
+
+class FeatureBins:
+    """Bins of one feature: numeric ranges or categories, then missing values
+
+    Numeric features have `len(edges) + 2` bins, the ranges between the inner
+    quantile edges and a missing bin. Categorical features have one bin per
+    category, one for categories unseen in the baseline and a missing bin.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        kind: str,
+        counts: np.ndarray,
+        edges: Optional[np.ndarray] = None,
+        categories: Optional[np.ndarray] = None,
+    ) -> None:
+        self.name = name
+        self.kind = kind
+        self.counts = counts
+        self.edges = edges if edges is not None else np.empty(0)
+        self.categories = (
+            categories if categories is not None else np.empty(0, dtype=str)
+        )
+        self._category_index = {c: i for i, c in enumerate(self.categories.tolist())}
+
+    @property
+    def n_bins(self) -> int:
+        return len(self.counts)
+
+    @classmethod
+    def fit(
+        cls, name: str, values: pd.Series, n_bins: int, max_categories: int
+    ) -> FeatureBins:
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(
+            values
+        ):
+            quantiles = np.linspace(0, 1, n_bins + 1)[1:-1]
+            edges = np.unique(np.nanquantile(values.to_numpy(float), quantiles))
+            bins = cls(name, NUMERIC, np.zeros(len(edges) + 2, np.int64), edges=edges)
+        else:
+            top = values.dropna().astype(str).value_counts().index[:max_categories]
+            categories = np.asarray(sorted(top), dtype=str)
+            bins = cls(
+                name,
+                CATEGORICAL,
+                np.zeros(len(categories) + 2, np.int64),
+                categories=categories,
+            )
+        bins.counts = np.bincount(bins.bin(values), minlength=bins.n_bins)
+        return bins
+
+    def bin(self, values: pd.Series) -> np.ndarray:
+        """Bin index of every value"""
+        missing_bin = self.n_bins - 1
+        if self.kind == NUMERIC:
+            numbers = pd.to_numeric(values, errors="coerce").to_numpy(float)
+            indices: np.ndarray = np.asarray(
+                np.searchsorted(self.edges, numbers, side="right")
+            )
+            indices[np.isnan(numbers)] = missing_bin
+            return indices
+        # Distinct values are looked up once, rows only go through their codes
+        codes, uniques = pd.factorize(values)
+        other_bin = self.n_bins - 2
+        lookup = np.array(
+            [self._category_index.get(str(u), other_bin) for u in uniques]
+            + [missing_bin],
+            dtype=np.int64,
+        )
+        binned: np.ndarray = lookup[codes]
+        return binned
+
+
+def psi(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Population stability index between two histograms"""
+    e = _proportions(expected)
+    a = _proportions(actual)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def js_divergence(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Jensen-Shannon divergence between two histograms, in bits, from 0 to 1"""
+    e = _proportions(expected)
+    a = _proportions(actual)
+    m: np.ndarray = (e + a) / 2
+    return (float(np.sum(e * np.log2(e / m))) + float(np.sum(a * np.log2(a / m)))) / 2
+
+
+def _proportions(counts: np.ndarray) -> np.ndarray:
+    proportions: np.ndarray = np.maximum(counts / max(counts.sum(), 1), EPSILON)
+    normalized: np.ndarray = proportions / proportions.sum()
+    return normalized
+
+
+class DriftBaseline:
+    """Histograms of the training data, one `FeatureBins` per feature"""
+
+    def __init__(self, features: Iterable[FeatureBins]) -> None:
+        self.features = {f.name: f for f in features}
+
+    @classmethod
+    def fit(
+        cls,
+        data: pd.DataFrame,
+        exclude: Iterable[str] = DEFAULT_EXCLUDED_COLUMNS,
+        n_bins: int = 10,
+        max_categories: int = 25,
+    ) -> DriftBaseline:
+        excluded = set(exclude)
+        return cls(
+            FeatureBins.fit(name, data[name], n_bins, max_categories)
+            for name in data.columns
+            if name not in excluded
+        )
+
+    def save(self, path: Union[str, Path]) -> None:
+        arrays: Dict[str, np.ndarray] = {
+            "names": np.asarray(list(self.features), dtype=str),
+            "kinds": np.asarray([f.kind for f in self.features.values()], dtype=str),
+        }
+        for i, feature in enumerate(self.features.values()):
+            arrays[f"counts_{i}"] = feature.counts
+            arrays[f"edges_{i}"] = feature.edges
+            arrays[f"categories_{i}"] = feature.categories
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez_compressed(f, **arrays)  # type: ignore[arg-type]
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> DriftBaseline:
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls(
+                FeatureBins(
+                    str(name),
+                    str(kind),
+                    arrays[f"counts_{i}"],
+                    edges=arrays[f"edges_{i}"],
+                    categories=arrays[f"categories_{i}"],
+                )
+                for i, (name, kind) in enumerate(zip(arrays["names"], arrays["kinds"]))
+            )
+
+
+def get_or_fit_baseline(
+    training_data_path: Union[str, Path] = default_training_data_path,
+    baseline_path: Union[str, Path] = default_baseline_path,
+) -> DriftBaseline:
+    """Load the baseline, fitting it first if missing or older than the data"""
+    baseline_path = Path(baseline_path)
+    if (
+        baseline_path.exists()
+        and baseline_path.stat().st_mtime >= Path(training_data_path).stat().st_mtime
+    ):
+        return DriftBaseline.load(baseline_path)
+    baseline = DriftBaseline.fit(
+        read_dataset(training_data_path, dtypes=load_coating_schema().DTYPES)
+    )
+    baseline.save(baseline_path)
+    return baseline
+
+
+class DriftTracker:
+    """Accumulate binned scoring data per time bucket and report drift
+
+    Parameters
+    ----------
+    baseline : DriftBaseline
+        Training histograms
+    date_col : str, optional
+        Column the buckets are taken from, everything goes in one bucket if None
+        or missing from a batch
+    datetime_format : str
+        Format of `date_col`
+    freq : str
+        Pandas period of the buckets, e.g. "D" or "W"
+    """
+
+    def __init__(
+        self,
+        baseline: DriftBaseline,
+        date_col: Optional[str] = "date_col",
+        datetime_format: str = "%Y-%m-%d",
+        freq: str = "D",
+    ) -> None:
+        self.baseline = baseline
+        self.date_col = date_col
+        self.datetime_format = datetime_format
+        self.freq = freq
+        self.counts: Dict[str, Dict[pd.Timestamp, np.ndarray]] = {
+            name: {} for name in baseline.features
+        }
+
+    def buckets(self, batch: pd.DataFrame) -> Tuple[np.ndarray, pd.Index]:
+        """Bucket code of every row and the start of each bucket"""
+        if self.date_col is None or self.date_col not in batch.columns:
+            return np.zeros(len(batch), np.int64), pd.Index([pd.NaT])
+        codes, uniques = pd.factorize(batch[self.date_col])
+        dates = pd.to_datetime(
+            pd.Index(uniques), format=self.datetime_format, errors="coerce"
+        )
+        # Missing dates get code -1, which indexes the trailing NaT
+        starts = dates.to_period(self.freq).start_time.append(
+            pd.DatetimeIndex([pd.NaT])
+        )
+        bucket_of_date, bucket_starts = pd.factorize(starts, use_na_sentinel=False)
+        bucket_codes: np.ndarray = bucket_of_date[codes]
+        return bucket_codes, pd.Index(bucket_starts)
+
+    def update(self, batch: pd.DataFrame) -> None:
+        """Add the counts of a scoring batch, features it lacks are skipped"""
+        bucket_codes, bucket_starts = self.buckets(batch)
+        n_buckets = len(bucket_starts)
+        for name, feature in self.baseline.features.items():
+            if name not in batch.columns:
+                continue
+            combined = bucket_codes * feature.n_bins + feature.bin(batch[name])
+            counts = np.bincount(
+                combined, minlength=n_buckets * feature.n_bins
+            ).reshape(n_buckets, feature.n_bins)
+            accumulated = self.counts[name]
+            for bucket, bucket_counts in zip(bucket_starts, counts):
+                if bucket_counts.any():
+                    previous = accumulated.get(bucket)
+                    accumulated[bucket] = (
+                        bucket_counts if previous is None else previous + bucket_counts
+                    )
+
+    def update_from_file(
+        self, file_path: Union[str, Path], chunk_rows: int = DEFAULT_CHUNK_ROWS
+    ) -> None:
+        dtypes = load_coating_schema().DTYPES
+        for chunk in iter_dataset_chunks(file_path, chunk_rows, dtypes=dtypes):
+            self.update(chunk)
+
+    def report(
+        self, by_bucket: bool = True, threshold: float = DRIFT_THRESHOLD
+    ) -> pd.DataFrame:
+        """PSI and JS divergence per feature, and per bucket unless `by_bucket` is False
+
+        Returns
+        -------
+        pd.DataFrame :
+            Columns bucket, feature, rows, psi, js and drifted, ordered by bucket
+            then descending PSI, without bucket if `by_bucket` is False
+        """
+        records: List[Dict[str, object]] = []
+        for name, buckets in self.counts.items():
+            expected = self.baseline.features[name].counts
+            groups: List[Tuple[pd.Timestamp, np.ndarray]] = list(buckets.items())
+            if not by_bucket and groups:
+                groups = [(pd.NaT, np.sum([counts for _, counts in groups], axis=0))]
+            for bucket, actual in groups:
+                value = psi(expected, actual)
+                records.append(
+                    {
+                        "bucket": bucket,
+                        "feature": name,
+                        "rows": int(actual.sum()),
+                        "psi": value,
+                        "js": js_divergence(expected, actual),
+                        "drifted": value > threshold,
+                    }
+                )
+        columns = ["bucket", "feature", "rows", "psi", "js", "drifted"]
+        report = (
+            pd.DataFrame(records, columns=columns)
+            .sort_values(["bucket", "psi"], ascending=[True, False])
+            .reset_index(drop=True)
+        )
+        return report if by_bucket else report.drop(columns="bucket")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("batches", nargs="+", type=Path, help="Scoring data files")
+    parser.add_argument(
+        "--training-data", type=Path, default=default_training_data_path
+    )
+    parser.add_argument("--baseline", type=Path, default=default_baseline_path)
+    parser.add_argument("--freq", default="D", help="Bucket period, e.g. D or W")
+    parser.add_argument("--overall", action="store_true", help="No time buckets")
+    args = parser.parse_args()
+
+    tracker = DriftTracker(
+        get_or_fit_baseline(args.training_data, args.baseline), freq=args.freq
+    )
+    for batch in args.batches:
+        tracker.update_from_file(batch)
+    report = tracker.report(by_bucket=not args.overall)
+    with pd.option_context("display.max_rows", None, "display.width", 120):
+        print(report.to_string(index=False, float_format="{:.4f}".format))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Synthetic drift and accuracy-decline scenarios for monitoring demos and load tests.
+
+Lots are resampled from the training data and dated day by day. A scenario
+describes, per day offset from `start_date`:
+
+- label flips, the rate at which non-bleed-out lots become bleed-out
+- concept drift, flipped lots and a share of the others switch to a new coating
+  material
+- feature drift, the coating length is redrawn from a different distribution
+
+Everything is generated with NumPy on a seeded Generator, one chunk at a time, so
+10M+ row files are written with memory bounded by the chunk size.
+
+    python -m starter.drift_data --output assets/prediction_data.csv \\
+        --actuals assets/prediction_data_actual.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import yaml
+from pydantic import BaseModel, Field
+
+from starter.dataset_io import DEFAULT_CHUNK_ROWS, read_dataset
+from starter.paths import default_training_data_path
+
+
+class FeatureDrift(BaseModel):
+    """Redraw a categorical feature from a new distribution on some days"""
+
+    column: str = "塗布長"
+    days: List[int] = Field(default=[6], description="Day offsets that drift")
+    values: List[str] = ["30m", "100m"]
+    probabilities: List[float] = [0.75, 0.25]
+
+
+class DriftScenario(BaseModel):
+    """Declarative description of a drift scenario, see the module docstring"""
+
+    start_date: datetime.date = datetime.date(2025, 3, 10)
+    days: int = 14
+    rows_per_day: int = 200
+    seed: int = 42
+
+    lot_col: str = "ロット番号"
+    lot_prefix: str = "SC"
+    lot_start: int = 10000
+    lot_digits: int = 7
+
+    target_col: str = "ブリードアウト"
+    date_col: str = "date_col"
+    datetime_format: str = "%Y-%m-%d"
+    label_flip_rates: Dict[int, float] = Field(
+        default={4 + i: round(0.02 * (i + 1), 2) for i in range(10)},
+        description="Probability of a False label becoming True, by day offset",
+    )
+
+    material_col: str = "塗布材料"
+    base_material: str = "A"
+    new_material: str = "B"
+    material_change_ratio: float = Field(
+        default=1 / 3,
+        description=(
+            "Share of the day's flip rate at which unflipped False lots also switch "
+            "to the new material"
+        ),
+    )
+
+    feature_drifts: List[FeatureDrift] = [FeatureDrift()]
+
+    @property
+    def rows(self) -> int:
+        return self.days * self.rows_per_day
+
+    def day_values(self, values: Dict[int, float]) -> np.ndarray:
+        """Per-day array of a day offset mapping, 0 for days not listed"""
+        array: np.ndarray = np.zeros(self.days)
+        for day, value in values.items():
+            if 0 <= day < self.days:
+                array[day] = value
+        return array
+
+    def dates(self) -> np.ndarray:
+        start = pd.Timestamp(self.start_date)
+        dates: np.ndarray = np.asarray(
+            pd.date_range(start, periods=self.days, freq="D").strftime(
+                self.datetime_format
+            ),
+            dtype=object,
+        )
+        return dates
+
+
+def format_lot_ids(
+    start: int, count: int, prefix: str = "SC", digits: int = 7
+) -> np.ndarray:
+    """Lot IDs `f"{prefix}{str(n).zfill(digits)}"` for `start <= n < start + count`
+
+    The digits are computed arithmetically into a byte buffer rather than formatted
+    one string at a time. Numbers wider than `digits` are not truncated.
+    """
+    prefix_bytes = np.frombuffer(prefix.encode("ascii"), dtype=np.uint8)
+    lot_ids: np.ndarray = np.empty(count, dtype=object)
+    # One fixed-width block per number of digits, as zfill only pads
+    n = start
+    while n < start + count:
+        width = max(digits, len(str(n)))
+        end = min(start + count, 10**width)
+        numbers = np.arange(n, end, dtype=np.int64)
+        buffer = np.empty((len(numbers), len(prefix_bytes) + width), dtype=np.uint8)
+        buffer[:, : len(prefix_bytes)] = prefix_bytes
+        powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+        buffer[:, len(prefix_bytes) :] = (numbers[:, None] // powers) % 10 + ord("0")
+        lot_ids[n - start : end - start] = (
+            buffer.view(f"S{buffer.shape[1]}").ravel().astype(str)
+        )
+        n = end
+    return lot_ids
+
+
+def load_base_data(
+    file_path: Union[str, Path] = default_training_data_path,
+    drop: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """Lots to resample from, the training data without its lot numbers by default"""
+    base = read_dataset(file_path)
+    return base.drop(columns=[c for c in drop or ["ロット番号"] if c in base.columns])
+
+
+def iter_scenario_chunks(
+    scenario: DriftScenario,
+    base: Optional[pd.DataFrame] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Iterator[pd.DataFrame]:
+    """Generate the rows of a scenario in date order, `chunk_rows` at a time
+
+    The output depends on the seed and on `chunk_rows`.
+    """
+    if base is None:
+        base = load_base_data()
+    rng = np.random.default_rng(scenario.seed)
+    columns = {
+        name: base[name].to_numpy()
+        for name in base.columns
+        if name not in (scenario.lot_col, scenario.date_col, scenario.material_col)
+    }
+    labels = base[scenario.target_col].to_numpy(dtype=bool)
+    dates = scenario.dates()
+    flip_rates = scenario.day_values(scenario.label_flip_rates)
+    drifts = [
+        (
+            drift.column,
+            np.isin(np.arange(scenario.days), drift.days),
+            np.asarray(drift.values, dtype=object),
+            np.asarray(drift.probabilities) / np.sum(drift.probabilities),
+        )
+        for drift in scenario.feature_drifts
+    ]
+
+    for offset in range(0, scenario.rows, chunk_rows):
+        n = min(chunk_rows, scenario.rows - offset)
+        sample = rng.integers(0, len(base), n)
+        day = (offset + np.arange(n)) // scenario.rows_per_day
+        chunk: Dict[str, np.ndarray] = {
+            scenario.lot_col: format_lot_ids(
+                scenario.lot_start + offset,
+                n,
+                scenario.lot_prefix,
+                scenario.lot_digits,
+            )
+        }
+        chunk.update({name: values[sample] for name, values in columns.items()})
+
+        for column, drift_days, values, probabilities in drifts:
+            drifted = drift_days[day]
+            drawn = values[rng.choice(len(values), drifted.sum(), p=probabilities)]
+            column_values: np.ndarray = chunk[column].astype(object)
+            column_values[drifted] = drawn
+            chunk[column] = column_values
+
+        rate = flip_rates[day]
+        label = labels[sample]
+        flipped = ~label & (rng.random(n) < rate)
+        switched = flipped | (
+            ~label & (rng.random(n) < rate * scenario.material_change_ratio)
+        )
+        chunk[scenario.target_col] = label | flipped
+        chunk[scenario.date_col] = dates[day]
+        chunk[scenario.material_col] = np.where(
+            switched, scenario.new_material, scenario.base_material
+        ).astype(object)
+        yield pd.DataFrame(chunk)
+
+
+def write_scenario(
+    scenario: DriftScenario,
+    output_path: Union[str, Path],
+    actuals_path: Optional[Union[str, Path]] = None,
+    base: Optional[pd.DataFrame] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> int:
+    """Stream a scenario to CSV or Parquet, chosen by the file suffix
+
+    Parameters
+    ----------
+    scenario : DriftScenario
+        Scenario to generate
+    output_path : str or Path
+        Prediction data, without the target column if `actuals_path` is given
+    actuals_path : str or Path, optional
+        Lot numbers and their labels, for accuracy monitoring
+    base : pd.DataFrame, optional
+        Lots to resample from, the training data by default
+    chunk_rows : int
+        Rows generated and written at a time
+
+    Returns
+    -------
+    int :
+        Number of rows written
+    """
+    rows = 0
+    writers: List[_ChunkWriter] = []
+    try:
+        output = _ChunkWriter(output_path)
+        writers.append(output)
+        actuals = None
+        if actuals_path is not None:
+            actuals = _ChunkWriter(actuals_path)
+            writers.append(actuals)
+        for chunk in iter_scenario_chunks(scenario, base, chunk_rows):
+            if actuals is None:
+                output.write(chunk)
+            else:
+                output.write(chunk.drop(columns=[scenario.target_col]))
+                actuals.write(chunk[[scenario.lot_col, scenario.target_col]])
+            rows += len(chunk)
+    finally:
+        for writer in writers:
+            writer.close()
+    return rows
+
+
+class _ChunkWriter:
+    """Append DataFrames to a CSV or Parquet file through Arrow"""
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self.parquet = self.path.suffix == ".parquet"
+        self._writer: Any = None
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if not self.parquet:
+            # Written as pandas does, class labels of the actuals are True/False
+            for i, field in enumerate(table.schema):
+                if pa.types.is_boolean(field.type):
+                    table = table.set_column(
+                        i, field.name, pc.if_else(table.column(i), "True", "False")
+                    )
+        if self._writer is None:
+            self._writer = (
+                pq.ParquetWriter(self.path, table.schema)
+                if self.parquet
+                else pa_csv.CSVWriter(self.path, table.schema)
+            )
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+def load_scenario(path: Union[str, Path]) -> DriftScenario:
+    """Read a scenario from a YAML or JSON file"""
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f) if str(path).endswith(".json") else yaml.safe_load(f)
+    return DriftScenario.model_validate(config or {})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", type=Path, required=True, help=".csv or .parquet")
+    parser.add_argument("--actuals", type=Path, help="Write labels separately here")
+    parser.add_argument("--config", type=Path, help="Scenario YAML or JSON")
+    parser.add_argument("--days", type=int)
+    parser.add_argument("--rows-per-day", type=int)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    scenario = load_scenario(args.config) if args.config else DriftScenario()
+    overrides = {
+        "days": args.days,
+        "rows_per_day": args.rows_per_day,
+        "seed": args.seed,
+    }
+    scenario = scenario.model_copy(
+        update={k: v for k, v in overrides.items() if v is not None}
+    )
+    rows = write_scenario(
+        scenario, args.output, args.actuals, chunk_rows=args.chunk_rows
+    )
+    print(f"Wrote {rows} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
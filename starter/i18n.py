@@ -14,11 +14,15 @@
 
 from __future__ import annotations
 
+import argparse
 import gettext as gettext_module
+import hashlib
+import io
 import os
+import threading
 from enum import Enum
 from gettext import GNUTranslations, NullTranslations
-from typing import Union
+from typing import Dict, List, Optional, Union
 
 from babel.messages import mofile, pofile
 from pydantic import AliasChoices, Field
@@ -42,10 +46,42 @@ APP_LOCALE: LanguageCode = LanguageCode.EN
 app_locale_env_name: str = app_locale_key
 
 
-def compile_mo_from_po(locale_folder_path: str) -> None:
+# The .po hash is stored in the compiled catalog under a reserved context, which
+# normal lookups never see
+SOURCE_HASH_CONTEXT = "starter.i18n"
+SOURCE_HASH_MSGID = "po-sha256"
+
+# Catalogs compiled in memory because their folder was read-only, keyed by the
+# .mo path they would have been written to
+_in_memory_catalogs: Dict[str, bytes] = {}
+
+
+def po_sha256(po_file_path: str) -> str:
+    with open(po_file_path, "rb") as po_file:
+        return hashlib.sha256(po_file.read()).hexdigest()
+
+
+def compiled_po_sha256(mo_file_path: str) -> Optional[str]:
+    """Hash of the .po file a compiled catalog was built from, if recorded"""
+    if mo_file_path in _in_memory_catalogs:
+        translations = GNUTranslations(io.BytesIO(_in_memory_catalogs[mo_file_path]))
+    else:
+        try:
+            with open(mo_file_path, "rb") as mo_file:
+                translations = GNUTranslations(mo_file)
+        except OSError:
+            return None
+    source_hash = translations.pgettext(SOURCE_HASH_CONTEXT, SOURCE_HASH_MSGID)
+    return None if source_hash == SOURCE_HASH_MSGID else source_hash
+
+
+def compile_mo_from_po(locale_folder_path: str, force: bool = False) -> bool:
     """
-    Compile a .po file to a .mo file.
+    Compile a .po file to a .mo file, unless it was already compiled from the same content.
+    If the folder is read-only the catalog is kept in memory instead.
     :param locale_folder_path: Path to the parent locale folder.
+    :param force: Compile even if the .po file is unchanged.
+    :return: Whether the catalog was compiled.
     """
 
     mo_file_path = os.path.join(locale_folder_path, "base.mo")
@@ -54,10 +90,37 @@ def compile_mo_from_po(locale_folder_path: str) -> None:
     if not os.path.exists(po_file_path):
         raise ValueError(f"Invalid locale file: {po_file_path}")
 
+    source_hash = po_sha256(po_file_path)
+    if not force and compiled_po_sha256(mo_file_path) == source_hash:
+        return False
+
     with open(po_file_path, "r", encoding="utf-8") as po_file:
         catalog = pofile.read_po(po_file)
-    with open(mo_file_path, "wb") as mo_file:
-        mofile.write_mo(mo_file, catalog)
+    catalog.add(SOURCE_HASH_MSGID, source_hash, context=SOURCE_HASH_CONTEXT)
+    buffer = io.BytesIO()
+    mofile.write_mo(buffer, catalog)
+    try:
+        with open(mo_file_path, "wb") as mo_file:
+            mo_file.write(buffer.getvalue())
+    except OSError:
+        _in_memory_catalogs[mo_file_path] = buffer.getvalue()
+    else:
+        _in_memory_catalogs.pop(mo_file_path, None)
+    return True
+
+
+def compile_all_locales(force: bool = False) -> List[LanguageCode]:
+    """Compile the catalog of every locale, returning the ones that were compiled"""
+    locale_dir = LocaleSettings().get_locale_dir()
+    compiled = []
+    for locale in sorted(LanguageCode.get_all() - {LanguageCode.EN}):
+        if compile_mo_from_po(
+            os.path.join(locale_dir, locale, "LC_MESSAGES"), force=force
+        ):
+            compiled.append(locale)
+    if compiled:
+        invalidate_translations()
+    return compiled
 
 
 class LocaleSettings(BaseSettings):
@@ -82,24 +145,77 @@ class LocaleSettings(BaseSettings):
             )
             if not os.path.exists(locale_folder_path):
                 raise ValueError(f"Invalid locale path: {locale_folder_path}")
-            compile_mo_from_po(locale_folder_path)
+            if compile_mo_from_po(locale_folder_path):
+                # Catalogs loaded before the recompile are stale
+                invalidate_translations()
 
     def get_locale_dir(self) -> str:
         base_dir = os.path.dirname(os.path.abspath(__file__))
         return os.path.abspath(os.path.join(base_dir, "locale"))
 
 
-def get_translation_ctx() -> Union[NullTranslations, GNUTranslations]:
-    """Return a Translations instance based on the locale set in the environment"""
-    if LocaleSettings().app_locale == LanguageCode.EN:
+Translations = Union[NullTranslations, GNUTranslations]
+
+# Catalogs are loaded once per locale and the active locale is resolved once, so
+# `gettext` is a dict lookup rather than a settings parse per message
+_translations: Dict[LanguageCode, Translations] = {}
+_active_locale: Optional[LanguageCode] = None
+_translations_lock = threading.Lock()
+
+
+def load_translations(locale: LanguageCode) -> Translations:
+    """Read the compiled catalog of a locale"""
+    if locale == LanguageCode.EN:
         return gettext_module.NullTranslations()
-    else:
-        return gettext_module.translation(
-            "base",
-            localedir=LocaleSettings().get_locale_dir(),
-            languages=[LocaleSettings().app_locale],
-            fallback=True,
-        )
+    locale_dir = LocaleSettings().get_locale_dir()
+    in_memory = _in_memory_catalogs.get(
+        os.path.join(locale_dir, locale, "LC_MESSAGES", "base.mo")
+    )
+    if in_memory is not None:
+        return GNUTranslations(io.BytesIO(in_memory))
+    mo_file_path = gettext_module.find("base", localedir=locale_dir, languages=[locale])
+    if mo_file_path is None:
+        return gettext_module.NullTranslations()
+    # Not `gettext.translation`, which keeps its own cache that invalidation
+    # could not reach
+    with open(mo_file_path, "rb") as mo_file:
+        return GNUTranslations(mo_file)
+
+
+def get_active_locale() -> LanguageCode:
+    """Locale set in the environment, read once until `invalidate_translations`"""
+    global _active_locale
+    locale = _active_locale
+    if locale is None:
+        locale = LocaleSettings().app_locale
+        _active_locale = locale
+    return locale
+
+
+def get_translation_ctx(
+    locale: Optional[LanguageCode] = None,
+) -> Translations:
+    """Return a Translations instance based on the locale set in the environment"""
+    locale = locale or get_active_locale()
+    ctx = _translations.get(locale)
+    if ctx is None:
+        with _translations_lock:
+            ctx = _translations.get(locale)
+            if ctx is None:
+                ctx = load_translations(locale)
+                _translations[locale] = ctx
+    return ctx
+
+
+def invalidate_translations() -> None:
+    """Forget the active locale and loaded catalogs
+
+    Call after changing the locale environment variable or recompiling a catalog.
+    """
+    global _active_locale
+    with _translations_lock:
+        _translations.clear()
+        _active_locale = None
 
 
 def gettext_noop(message: str) -> str:
@@ -115,3 +231,19 @@ def gettext(message: str) -> str:
     as a Unicode string.
     """
     return get_translation_ctx().gettext(message)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compile the translation catalogs of every locale"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Compile unchanged catalogs too"
+    )
+    args = parser.parse_args()
+    compiled = compile_all_locales(force=args.force)
+    print(f"Compiled: {', '.join(compiled) if compiled else 'none, all up to date'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Chunked dataset ingestion with memory bounded by the chunk size.
+
+Dataset files are read in fixed-size chunks through `starter.dataset_io`, each
+chunk goes through the preprocess hook and is appended to a gzip-compressed CSV on
+disk, which the DataRobot client then streams to the AI Catalog. No more than one chunk is ever held in memory.
+"""
+
+from __future__ import annotations
+
+import gzip
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Union
+
+import pandas as pd
+from datarobotx.idp import datasets
+
+from starter.dataset_io import (
+    DEFAULT_CHUNK_ROWS,
+    FormatLike,
+    iter_dataset_chunks,
+)
+
+Preprocess = Callable[[pd.DataFrame], pd.DataFrame]
+
+
+def iter_preprocessed_chunks(
+    file_path: Union[str, Path],
+    preprocess: Optional[Preprocess] = None,
+    chunk_rows: Optional[int] = DEFAULT_CHUNK_ROWS,
+    file_format: Optional[FormatLike] = None,
+    dtypes: Optional[Dict[str, Any]] = None,
+) -> Iterator[pd.DataFrame]:
+    """Read a dataset file chunk by chunk and run each chunk through `preprocess`
+
+    Stages that need statistics of the whole file, like `DateReanchor`, implement
+    `fit_file(file_path)`, which is called before the first chunk.
+    """
+    fit_file = getattr(preprocess, "fit_file", None)
+    if fit_file is not None and chunk_rows is not None:
+        fit_file(file_path)
+    # Read once per upload, CSV files are streamed rather than copied to Arrow IPC
+    for chunk in iter_dataset_chunks(
+        file_path, chunk_rows, dtypes=dtypes, file_format=file_format, cache=False
+    ):
+        yield chunk if preprocess is None else preprocess(chunk)
+
+
+def write_preprocessed_csv_gz(
+    file_path: Union[str, Path],
+    output_path: Union[str, Path],
+    preprocess: Optional[Preprocess] = None,
+    chunk_rows: Optional[int] = DEFAULT_CHUNK_ROWS,
+    file_format: Optional[FormatLike] = None,
+    dtypes: Optional[Dict[str, Any]] = None,
+) -> int:
+    """Preprocess a dataset file chunk by chunk into a gzip-compressed CSV
+
+    See `iter_preprocessed_chunks`. The output is byte-for-byte reproducible for
+    the same input, so uploads of it can be deduplicated by content.
+
+    Returns
+    -------
+    int :
+        Number of rows written
+    """
+    rows = 0
+    # mtime=0 and no file name keep the gzip header deterministic
+    with (
+        open(output_path, "wb") as raw,
+        gzip.GzipFile(
+            filename="", fileobj=raw, mode="wb", compresslevel=1, mtime=0
+        ) as compressed,
+    ):
+        for chunk in iter_preprocessed_chunks(
+            file_path, preprocess, chunk_rows, file_format, dtypes
+        ):
+            compressed.write(
+                chunk.to_csv(index=False, header=rows == 0).encode("utf-8")
+            )
+            rows += len(chunk)
+    return rows
+
+
+def stream_dataset_to_catalog(
+    endpoint: str,
+    token: str,
+    file_path: Union[str, Path],
+    name: str,
+    use_cases: Optional[str] = None,
+    preprocess: Optional[Preprocess] = None,
+    chunk_rows: Optional[int] = DEFAULT_CHUNK_ROWS,
+    file_format: Optional[FormatLike] = None,
+    dtypes: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Upload a dataset file to the AI Catalog through a compressed, chunked spool file
+
+    Parameters
+    ----------
+    endpoint : str
+        DataRobot API endpoint
+    token : str
+        DataRobot API token
+    file_path : str or Path
+        CSV, Parquet or Arrow IPC file to upload
+    name : str
+        Dataset name in the AI Catalog
+    use_cases : str, optional
+        Use Case ID the dataset is linked to
+    preprocess : Callable[[pd.DataFrame], pd.DataFrame], optional
+        Applied to every chunk, must not depend on rows outside the chunk
+    chunk_rows : int, optional
+        Rows per chunk, None reads the whole file at once for hooks that need it
+    file_format : DatasetFormat or str, optional
+        Inferred from the file suffix by default
+    dtypes : dict, optional
+        Column dtypes applied before the preprocess hook
+
+    Returns
+    -------
+    str :
+        ID of the AI Catalog dataset
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        spool_path = Path(tmp_dir) / f"{Path(file_path).stem}.csv.gz"
+        write_preprocessed_csv_gz(
+            file_path, spool_path, preprocess, chunk_rows, file_format, dtypes
+        )
+        dataset_id: str = datasets.get_or_create_dataset_from_file(
+            endpoint=endpoint,
+            token=token,
+            name=name,
+            file_path=str(spool_path),
+            use_cases=use_cases,
+        )
+    return dataset_id
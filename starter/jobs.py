@@ -0,0 +1,319 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Background jobs for the long workflows started by `pulumi up`.
+
+A job calls a `module:function` target with string arguments in a detached
+process, so `pulumi up` finishes registering resources while uploads and
+Autopilot runs proceed. Its state is kept in `outputs/jobs/<name>.json`: status,
+timestamps, the last line it printed and its error. The output goes to
+`outputs/jobs/<name>.log`.
+
+Submitting a job that is running, or that succeeded with the same arguments, does
+nothing, so later runs reconcile instead of starting the work again. A running job
+writes a heartbeat, one that stopped updating is reported as lost and resubmitted.
+
+    python -m starter.jobs status
+    python -m starter.jobs wait
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO
+
+from pydantic import BaseModel
+
+from starter.paths import PROJECT_ROOT
+from starter.timing import tracer
+
+default_jobs_dir = PROJECT_ROOT / "outputs" / "jobs"
+
+# Seconds between heartbeats of a running job, it is lost after missing a few
+HEARTBEAT_INTERVAL = 10.0
+MISSED_HEARTBEATS = 6
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+LOST = "lost"
+FINISHED_STATUSES = {SUCCEEDED, FAILED, LOST}
+
+
+class JobState(BaseModel):
+    name: str
+    target: str
+    args: List[str] = []
+    status: str = QUEUED
+    submitted_at: float
+    started_at: Optional[float] = None
+    heartbeat_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def duration_sec(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return (self.finished_at or self.heartbeat_at or self.started_at) - (
+            self.started_at
+        )
+
+
+def spawn_detached(command: List[str], log_path: Path) -> None:
+    """Start a process that outlives the caller and does not share its output"""
+    if os.name == "nt":
+        flags = getattr(subprocess, "DETACHED_PROCESS", 0) | getattr(
+            subprocess, "CREATE_NEW_PROCESS_GROUP", 0
+        )
+        detach: Dict[str, Any] = {"creationflags": flags}
+    else:
+        detach = {"start_new_session": True}
+    with open(log_path, "ab") as log:
+        subprocess.Popen(
+            command,
+            cwd=PROJECT_ROOT,
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            **detach,
+        )
+
+
+class _ProgressWriter(io.TextIOBase):
+    """Copies output to the job log and remembers its last non-empty line"""
+
+    def __init__(self, log: TextIO) -> None:
+        self.log = log
+        self.last_line: Optional[str] = None
+        self._partial = ""
+
+    def write(self, text: str) -> int:
+        self.log.write(text)
+        self.log.flush()
+        *lines, self._partial = (self._partial + text).split("\n")
+        for line in reversed(lines):
+            if line.strip():
+                self.last_line = line.strip()
+                break
+        return len(text)
+
+    def flush(self) -> None:
+        self.log.flush()
+
+
+class JobRunner:
+    """Submits, runs and reports jobs with their state in `jobs_dir`
+
+    Parameters
+    ----------
+    jobs_dir : Path
+        Directory of the state and log files
+    spawn : Callable[[List[str], Path], None]
+        Starts the command running a job, with its output appended to the log
+    clock : Callable[[], float]
+        Wall clock, shared with the job processes
+    heartbeat_interval : float
+        Seconds between state updates of a running job
+    """
+
+    def __init__(
+        self,
+        jobs_dir: Path = default_jobs_dir,
+        spawn: Callable[[List[str], Path], None] = spawn_detached,
+        clock: Callable[[], float] = time.time,
+        heartbeat_interval: float = HEARTBEAT_INTERVAL,
+    ) -> None:
+        self.jobs_dir = Path(jobs_dir)
+        self.spawn = spawn
+        self.clock = clock
+        self.heartbeat_interval = heartbeat_interval
+
+    def state_path(self, name: str) -> Path:
+        return self.jobs_dir / f"{name}.json"
+
+    def log_path(self, name: str) -> Path:
+        return self.jobs_dir / f"{name}.log"
+
+    def read(self, name: str) -> Optional[JobState]:
+        """State of a job, running jobs without a recent heartbeat are lost"""
+        try:
+            with open(self.state_path(name), encoding="utf-8") as f:
+                state = JobState(**json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        last_seen = state.heartbeat_at or state.submitted_at
+        if (
+            state.status not in FINISHED_STATUSES
+            and self.clock() - last_seen > MISSED_HEARTBEATS * self.heartbeat_interval
+        ):
+            state.status = LOST
+            state.error = state.error or "The job process stopped without a result"
+        return state
+
+    def write(self, state: JobState) -> None:
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        path = self.state_path(state.name)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state.model_dump(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def list(self) -> List[JobState]:
+        if not self.jobs_dir.exists():
+            return []
+        states = (self.read(path.stem) for path in sorted(self.jobs_dir.glob("*.json")))
+        return [state for state in states if state is not None]
+
+    def submit(self, name: str, target: str, args: List[str]) -> JobState:
+        """Start a job in the background unless it is running or already done
+
+        Returns
+        -------
+        JobState :
+            State of the submitted job, or of the one it was reconciled with
+        """
+        current = self.read(name)
+        if current is not None and current.target == target and current.args == args:
+            if current.status in (QUEUED, RUNNING, SUCCEEDED):
+                return current
+        state = JobState(name=name, target=target, args=args, submitted_at=self.clock())
+        self.write(state)
+        self.spawn(
+            [
+                sys.executable,
+                "-m",
+                "starter.jobs",
+                "--jobs-dir",
+                str(self.jobs_dir),
+                "run",
+                name,
+            ],
+            self.log_path(name),
+        )
+        return state
+
+    @contextlib.contextmanager
+    def _heartbeat(self, state: JobState, writer: _ProgressWriter) -> Iterator[None]:
+        stop = threading.Event()
+
+        def beat() -> None:
+            while not stop.wait(self.heartbeat_interval):
+                state.heartbeat_at = self.clock()
+                state.progress = writer.last_line
+                self.write(state)
+
+        thread = threading.Thread(target=beat, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def run(self, name: str) -> JobState:
+        """Run a submitted job in this process, recording its result"""
+        state = self.read(name)
+        if state is None:
+            raise KeyError(f"No job named {name} in {self.jobs_dir}")
+        state.status = RUNNING
+        state.started_at = state.heartbeat_at = self.clock()
+        state.finished_at = state.error = state.progress = None
+        self.write(state)
+
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.log_path(name), "a", encoding="utf-8") as log:
+            writer = _ProgressWriter(log)
+            with (
+                self._heartbeat(state, writer),
+                contextlib.redirect_stdout(writer),  # type: ignore[type-var]
+            ):
+                print(f"Starting {state.target}({', '.join(state.args)})")
+                try:
+                    module_name, function_name = state.target.split(":")
+                    function = getattr(
+                        importlib.import_module(module_name), function_name
+                    )
+                    function(*state.args)
+                except Exception as e:
+                    traceback.print_exc(file=log)
+                    state.status = FAILED
+                    state.error = f"{type(e).__name__}: {e}"
+                else:
+                    state.status = SUCCEEDED
+            state.progress = writer.last_line
+            if tracer.spans:
+                log.write(tracer.format_summary() + "\n")
+        state.finished_at = state.heartbeat_at = self.clock()
+        self.write(state)
+        return state
+
+    def wait(
+        self, names: Optional[List[str]] = None, poll_sec: float = 5.0
+    ) -> List[JobState]:
+        """Block until the jobs have finished"""
+        while True:
+            states = [s for s in self.list() if names is None or s.name in names]
+            if all(s.status in FINISHED_STATUSES for s in states):
+                return states
+            time.sleep(poll_sec)
+
+
+def format_status(state: JobState) -> str:
+    duration = "" if state.duration_sec is None else f" after {state.duration_sec:.0f}s"
+    detail = state.error if state.status in (FAILED, LOST) else state.progress
+    return f"{state.name}: {state.status}{duration}" + (
+        f" - {detail}" if detail else ""
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs-dir", type=Path, default=default_jobs_dir)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="Print the state of every job")
+    wait = subparsers.add_parser("wait", help="Block until every job has finished")
+    wait.add_argument("names", nargs="*")
+    run = subparsers.add_parser("run", help="Run a submitted job in the foreground")
+    run.add_argument("name")
+    args = parser.parse_args()
+
+    runner = JobRunner(args.jobs_dir)
+    if args.command == "run":
+        state = runner.run(args.name)
+        sys.exit(0 if state.status == SUCCEEDED else 1)
+    states = (
+        runner.wait(args.names or None) if args.command == "wait" else runner.list()
+    )
+    for state in states:
+        print(format_status(state))
+    if any(state.status in (FAILED, LOST) for state in states):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
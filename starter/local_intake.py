@@ -0,0 +1,280 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Batch predictions scored straight from local files, without the AI Catalog.
+
+The file is read chunk by chunk through `starter.ingest`, and every preprocessed
+chunk is uploaded as one gzip-compressed part of a multipart `localFile` intake, up
+to `upload_concurrency` parts at a time. Once the job completes, its results are
+streamed to a local CSV file, or converted to Parquet on the way.
+
+`LocalFileBackend` has the `dr.BatchPredictionJob.score` signature, so files are
+scheduled with `PredictionJobScheduler` like catalog datasets:
+
+    python -m starter.local_intake DEPLOYMENT_ID assets/prediction_data.csv \\
+        --output outputs/predictions/prediction_data.parquet
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Protocol, Set, Union
+
+import pandas as pd
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from datarobot.utils import from_api
+
+from starter.dataset_io import DEFAULT_CHUNK_ROWS, csv_convert_options
+from starter.dr_client import get_client
+from starter.ingest import iter_preprocessed_chunks
+from starter.paths import PROJECT_ROOT
+from starter.prediction_jobs import PredictionJobResult, PredictionJobScheduler
+
+default_predictions_dir = PROJECT_ROOT / "outputs" / "predictions"
+
+# Bytes per write while streaming results to disk
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+
+class RestClient(Protocol):
+    """The subset of `dr.rest.RESTClientObject` used for local file intake"""
+
+    def post(self, url: str, data: Optional[Any] = None, **kwargs: Any) -> Any: ...
+
+    def put(self, url: str, data: Optional[Any] = None, **kwargs: Any) -> Any: ...
+
+    def get(self, url: str, params: Optional[Any] = None, **kwargs: Any) -> Any: ...
+
+    def delete(self, url: str, **kwargs: Any) -> Any: ...
+
+
+class LocalFileJob:
+    """Batch prediction job fed from a local file, downloaded once it completes"""
+
+    def __init__(
+        self, client: RestClient, job_id: str, output_path: Union[str, Path]
+    ) -> None:
+        self.id = job_id
+        self.client = client
+        self.output_path = Path(output_path)
+        self.downloaded = False
+
+    def get_status(self) -> Dict[str, Any]:
+        response = self.client.get(f"batchPredictions/{self.id}/").json()
+        status: Dict[str, Any] = from_api(response)  # type: ignore[assignment]
+        if status.get("status") == "COMPLETED" and not self.downloaded:
+            self.download(status["links"]["download"])
+        return status
+
+    def download(self, url: str) -> None:
+        """Stream the results to `output_path`, as Parquet if it ends with .parquet"""
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        parquet = self.output_path.suffix.lower() in (".parquet", ".pq")
+        csv_path = (
+            self.output_path.with_suffix(f".{os.getpid()}.csv")
+            if parquet
+            else self.output_path
+        )
+        response = self.client.get(url, stream=True)
+        with open(csv_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+        if parquet:
+            try:
+                write_csv_as_parquet(csv_path, self.output_path)
+            finally:
+                csv_path.unlink()
+        self.downloaded = True
+
+
+def write_csv_as_parquet(
+    csv_path: Union[str, Path], output_path: Union[str, Path]
+) -> None:
+    """Convert a CSV file to Parquet block by block, dates stay strings"""
+    with pa_csv.open_csv(
+        csv_path, convert_options=csv_convert_options(csv_path)
+    ) as reader:
+        with pq.ParquetWriter(output_path, reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+
+
+def compress_part(chunk: pd.DataFrame) -> bytes:
+    """One multipart intake part, a gzip-compressed CSV with its own header"""
+    return gzip.compress(
+        chunk.to_csv(index=False).encode("utf-8"), compresslevel=1, mtime=0
+    )
+
+
+class LocalFileBackend:
+    """Drop-in for `dr.BatchPredictionJob` that scores local files
+
+    Intake settings are dicts with `file_path` and `output_path`, and optionally
+    `preprocess`, `file_format` and `dtypes` as in `starter.ingest`. Other keyword
+    arguments of `score` are sent as job settings, e.g. `passthrough_columns`.
+
+    Parameters
+    ----------
+    client : RestClient, optional
+        Defaults to the shared client of `starter.dr_client`
+    upload_concurrency : int
+        Parts uploaded at the same time
+    chunk_rows : int
+        Rows per part
+    compress : bool
+        Send parts gzip-compressed with `Content-Encoding: gzip`
+    """
+
+    def __init__(
+        self,
+        client: Optional[RestClient] = None,
+        upload_concurrency: int = 4,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+        compress: bool = True,
+    ) -> None:
+        self.client: RestClient = client or get_client(upload_concurrency)  # type: ignore[assignment]
+        self.upload_concurrency = upload_concurrency
+        self.chunk_rows = chunk_rows
+        self.compress = compress
+
+    def score(
+        self, deployment: str, intake_settings: Any = None, **kwargs: Any
+    ) -> LocalFileJob:
+        settings = dict(intake_settings)
+        job_data = {
+            "deployment_id": deployment,
+            "intake_settings": {"type": "localFile", "multipart": True},
+            "output_settings": {"type": "localFile"},
+            **kwargs,
+        }
+        response = self.client.post("batchPredictions/", data=job_data).json()
+        job = LocalFileJob(self.client, response["id"], settings["output_path"])
+        chunks = iter_preprocessed_chunks(
+            settings["file_path"],
+            settings.get("preprocess"),
+            self.chunk_rows,
+            settings.get("file_format"),
+            settings.get("dtypes"),
+        )
+        try:
+            self.upload(response["links"]["csvUpload"], chunks)
+        except Exception:
+            # The job would otherwise wait for the rest of its parts
+            self.client.delete(f"batchPredictions/{job.id}/")
+            raise
+        return job
+
+    def upload(self, upload_url: str, chunks: Iterable[pd.DataFrame]) -> int:
+        """Upload chunks as parts with bounded concurrency, then finalize
+
+        At most `2 * upload_concurrency` parts are held in memory, the reader waits
+        for a part to finish before compressing more.
+
+        Returns
+        -------
+        int :
+            Number of parts uploaded
+        """
+        headers = {"Content-Type": "text/csv"}
+        if self.compress:
+            headers["Content-Encoding"] = "gzip"
+
+        def put(part_number: int, chunk: pd.DataFrame) -> None:
+            data = (
+                compress_part(chunk)
+                if self.compress
+                else chunk.to_csv(index=False).encode("utf-8")
+            )
+            self.client.put(
+                f"{upload_url}part/{part_number}", data=data, headers=headers
+            )
+
+        parts = 0
+        pending: Set[Future[None]] = set()
+        with ThreadPoolExecutor(max_workers=self.upload_concurrency) as pool:
+            for chunk in chunks:
+                if len(pending) >= 2 * self.upload_concurrency:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                pending.add(pool.submit(put, parts, chunk))
+                parts += 1
+            for future in pending:
+                future.result()
+        self.client.post(f"{upload_url}finalizeMultipart")
+        return parts
+
+
+def score_local_files(
+    deployment_id: str,
+    intake_settings: Dict[str, Dict[str, Any]],
+    backend: Optional[LocalFileBackend] = None,
+    max_in_flight: int = 4,
+    **score_kwargs: Any,
+) -> List[PredictionJobResult]:
+    """Score local files with at most `max_in_flight` jobs running
+
+    Parameters
+    ----------
+    deployment_id : str
+        Deployment used for scoring
+    intake_settings : Dict[str, Dict[str, Any]]
+        `LocalFileBackend` intake settings for each file, keyed by a name used in
+        the results
+    """
+    scheduler = PredictionJobScheduler(
+        backend=backend or LocalFileBackend(), max_in_flight=max_in_flight
+    )
+    return scheduler.run(deployment_id, intake_settings, **score_kwargs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("deployment_id")
+    parser.add_argument("file", type=Path, help="CSV, Parquet or Arrow IPC file")
+    parser.add_argument("--output", type=Path, help="CSV or Parquet results file")
+    parser.add_argument("--upload-concurrency", type=int, default=4)
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--no-compress", action="store_true")
+    parser.add_argument(
+        "--passthrough", action="append", help="Input column copied to the results"
+    )
+    args = parser.parse_args()
+
+    output = args.output or default_predictions_dir / f"{args.file.stem}.csv"
+    score_kwargs = {"passthrough_columns": args.passthrough} if args.passthrough else {}
+    backend = LocalFileBackend(
+        upload_concurrency=args.upload_concurrency,
+        chunk_rows=args.chunk_rows,
+        compress=not args.no_compress,
+    )
+    (result,) = score_local_files(
+        args.deployment_id,
+        {args.file.name: {"file_path": args.file, "output_path": output}},
+        backend=backend,
+        **score_kwargs,
+    )
+    print(
+        f"Batch prediction {result.job_id}: {result.status}, "
+        f"{result.scored_rows} rows scored in {result.duration_sec:.1f}s to {output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
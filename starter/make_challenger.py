@@ -1,28 +1,37 @@
 import pandas as pd
-from typing import List
+from typing import Callable, Dict, List, Optional
 import yaml
 
 
 import datarobot as dr
-from dotenv import load_dotenv
 
 from infra.common.schema import (
     AdvancedOptionsArgs,
     AnalyzeAndModelArgs,
     AutopilotRunArgs,
+    DatasetArgs,
 )
 from infra.settings_main import project_name, model_training_output_path
 from datarobotx.idp.autopilot import get_or_create_autopilot_run
 from datarobotx.idp.registered_model_versions import (
     get_or_create_registered_leaderboard_model_version,
 )
-from datarobotx.idp.datasets import get_or_create_dataset_from_df
+from starter.challengers import ChallengerManager
+from starter.dataset_cache import get_or_create_dataset_from_file
+from starter.dr_client import AsyncDataRobot, gather_all, get_client, run
 from infra.settings_datasets import retraining_datasets
 
 from starter.schema import AppSettings
+from starter.timing import span
 
-from infra.settings_main import challenger_model_output_path
+from infra.settings_main import (
+    challenger_model_output_path,
+    challenger_slots,
+    challenger_state_path,
+)
 
+# Retraining datasets trained and registered at the same time
+max_concurrent_retraining_pipelines = 4
 
 
 def preprocess_retraning_dataset(dataset: pd.DataFrame) -> pd.DataFrame:
@@ -41,88 +50,173 @@ def preprocess_retraning_dataset(dataset: pd.DataFrame) -> pd.DataFrame:
     return dataset
 
 
-def training_and_registered_challenger_model() -> List[str]:
-    load_dotenv()
-    client = dr.Client()
-    with open(model_training_output_path) as f:
-        model_training_output = AppSettings(**yaml.safe_load(f))
-
-    use_case_id=model_training_output.use_case_id
-    retraining_dataset_ids = []
-    for retraining_dataset in retraining_datasets:
-        df = preprocess_retraning_dataset(pd.read_csv(retraining_dataset.file_path))
-
-        print("Uploading retraning data to AI Catalog...")
-        retraining_dataset_id = get_or_create_dataset_from_df(
-            endpoint=client.endpoint,
-            token=client.token,
-            data_frame=df,
-            name=retraining_dataset.resource_name,
-            use_cases=use_case_id,
-        )
-        retraining_dataset_ids.append(retraining_dataset_id)
-
-    
-    registered_ids = []
-    for retraning_dataset_id, retraining_dataset in zip(retraining_dataset_ids, retraining_datasets):
-        print(retraning_dataset_id, retraining_dataset.resource_name)
-    
-        autopilotrun_args = AutopilotRunArgs(
-            name=retraining_dataset.resource_name,
-            advanced_options_config=AdvancedOptionsArgs(seed=42),
-            analyze_and_model_config=AnalyzeAndModelArgs(
-                metric="LogLoss",
-                mode=dr.enums.AUTOPILOT_MODE.QUICK,
-                target="ブリードアウト",
-                worker_count=-1,
-            ),
-        )
+def register_retraining_model(
+    client: dr.rest.RESTClientObject,
+    retraining_dataset: DatasetArgs,
+    use_case_id: str,
+    registered_model_name: str,
+) -> str:
+    """Run one retraining dataset through upload, Autopilot, recommendation and registration
 
-        registered_model_name =  model_training_output.registered_model_name
-        print("Running Autopilot...")
+    Returns
+    -------
+    str :
+        ID of the registered model version
+    """
+    name = retraining_dataset.resource_name
+
+    print(f"Uploading retraning data to AI Catalog: {name}")
+    retraining_dataset_id = get_or_create_dataset_from_file(
+        endpoint=client.endpoint,
+        token=client.token,
+        file_path=retraining_dataset.file_path,
+        file_format=retraining_dataset.format,
+        dtypes=retraining_dataset.dtypes,
+        name=name,
+        use_cases=use_case_id,
+        preprocess=preprocess_retraning_dataset,
+    )
+
+    autopilotrun_args = AutopilotRunArgs(
+        name=name,
+        advanced_options_config=AdvancedOptionsArgs(seed=42),
+        analyze_and_model_config=AnalyzeAndModelArgs(
+            metric="LogLoss",
+            mode=dr.enums.AUTOPILOT_MODE.QUICK,
+            target="ブリードアウト",
+            worker_count=-1,
+        ),
+    )
+    print(f"Running Autopilot: {name}")
+    with span("get_or_create_autopilot_run", phase="retraining"):
         project_id = get_or_create_autopilot_run(
             endpoint=client.endpoint,
             token=client.token,
-            dataset_id=retraning_dataset_id,
+            dataset_id=retraining_dataset_id,
             use_case=use_case_id,
             **autopilotrun_args.model_dump(),
         )
 
+    model_id = dr.ModelRecommendation.get(project_id).model_id
 
-
-        model_id = dr.ModelRecommendation.get(project_id).model_id
-
-        print("Registered recommended model...")
-        registered_model_version_id = get_or_create_registered_leaderboard_model_version(
+    print(f"Registered recommended model: {name}")
+    with span("get_or_create_registered_leaderboard_model_version", phase="retraining"):
+        return get_or_create_registered_leaderboard_model_version(
             endpoint=client.endpoint,
             token=client.token,
             model_id=model_id,
             registered_model_name=registered_model_name,
             prediction_threshold=0.5,
         )
-        registered_ids.append(registered_model_version_id)
-    return registered_ids
+
+
+def training_and_registered_challenger_model(
+    on_registered: Optional[Callable[[int, str], None]] = None,
+    max_workers: int = max_concurrent_retraining_pipelines,
+) -> Dict[int, str]:
+    """Train and register a model for every retraining dataset
+
+    Each dataset goes through its own pipeline, up to `max_workers` at a time, so the
+    wall time is bounded by the slowest Autopilot run rather than their sum.
+
+    Parameters
+    ----------
+    on_registered : Callable[[int, str], None], optional
+        Called from a worker thread with the dataset index and registered model
+        version ID as soon as each model is registered
+    max_workers : int
+        Number of pipelines running at the same time
+
+    Returns
+    -------
+    Dict[int, str] :
+        Registered model version IDs keyed by retraining dataset index, for the
+        pipelines that succeeded
+
+    Raises
+    ------
+    RuntimeError :
+        If any pipeline failed, once all the others have finished
+    """
+    client = get_client(max_workers)
+    with open(model_training_output_path) as f:
+        model_training_output = AppSettings(**yaml.safe_load(f))
+
+    registered_ids: Dict[int, str] = {}
+    errors: Dict[str, BaseException] = {}
+
+    async def pipeline(drx: AsyncDataRobot, num: int) -> None:
+        name = retraining_datasets[num].resource_name
+        try:
+            registered_ids[num] = await drx.call(
+                register_retraining_model,
+                client,
+                retraining_datasets[num],
+                model_training_output.use_case_id,
+                model_training_output.registered_model_name,
+            )
+        except Exception as e:
+            print(f"Retraining failed for {name}: {e}")
+            errors[name] = e
+            return
+        if on_registered is not None:
+            try:
+                await drx.call(on_registered, num, registered_ids[num])
+            except Exception as e:
+                print(f"Challenger creation failed for {name}: {e}")
+                errors[name] = e
+
+    async def pipelines(drx: AsyncDataRobot) -> None:
+        await gather_all(pipeline(drx, num) for num in range(len(retraining_datasets)))
+
+    run(pipelines, max_concurrency=max_workers)
+
+    if errors:
+        raise RuntimeError(
+            "Challenger pipelines failed for: " + ", ".join(errors)
+        ) from next(iter(errors.values()))
+    return dict(sorted(registered_ids.items()))
+
+
+def challenger_name(num: int) -> str:
+    return "retraining_dataset_" + str(num + 1)
 
 
 def create_challangers(registered_ids: List[str], deployment_id:str, prediction_environment_id:str):
-    load_dotenv()
+    get_client()
+    manager = ChallengerManager(
+        deployment_id,
+        prediction_environment_id,
+        state_path=challenger_state_path,
+        slots=challenger_slots,
+    )
+    return manager.create_bulk(
+        {challenger_name(num): registered_id for num, registered_id in enumerate(registered_ids)}
+    )
 
-    client = dr.Client()
+def train_and_create_challangers(deployment_id:str, prediction_environment_id:str):
+    manager = ChallengerManager(
+        deployment_id,
+        prediction_environment_id,
+        state_path=challenger_state_path,
+        slots=challenger_slots,
+    )
     registered_id_dict = {}
-    for num, registered_id in enumerate(registered_ids):
-        name = "retraining_dataset_"+str(num+1)
-        challenger = dr.models.deployment.challenger.Challenger.create(
-            deployment_id=deployment_id,
-            model_package_id=registered_id,
-            name=name,
-            prediction_environment_id=prediction_environment_id
-        )
-        registered_id_dict[name] = registered_id
-    return registered_id_dict
 
-def train_and_create_challangers(deployment_id:str, prediction_environment_id:str):
-    registered_ids=training_and_registered_challenger_model()
-    registered_id_dict = create_challangers(registered_ids=registered_ids, deployment_id=deployment_id, prediction_environment_id=prediction_environment_id)
+    # Challengers are created as soon as each model is registered, and
+    # checkpointed so a failed run does not create them again
+    def on_registered(num: int, registered_id: str) -> None:
+        name = challenger_name(num)
+        if manager.create(name, registered_id) is not None:
+            registered_id_dict[name] = registered_id
+
+    training_and_registered_challenger_model(on_registered=on_registered)
+    # No output file and a failed job, so the next `pulumi up` submits the job again
+    # and the pending challengers are created once slots are freed
+    if manager.pending:
+        raise RuntimeError(
+            "Challengers left pending, no free slot: " + ", ".join(manager.pending)
+        )
 
     with open(challenger_model_output_path, 'w') as f:
-        yaml.dump(registered_id_dict, f)
\ No newline at end of file
+        yaml.dump(dict(sorted(registered_id_dict.items())), f)
@@ -1,13 +1,43 @@
+import datetime
+
 import yaml
 import pandas as pd
 import datarobot as dr
-from dotenv import load_dotenv
 
+from infra.common.schema import DatasetArgs
 from infra.settings_main import model_training_output_path
 from infra.settings_datasets import prediction_datasets, actual_dataset
-from datarobotx.idp.datasets import get_or_create_dataset_from_df
+from infra.settings_deployment import date_col, datetime_format
+from starter.dataset_cache import get_or_create_dataset_from_file
+from starter.date_reanchor import DateReanchor
+from starter.dr_client import AsyncDataRobot, gather_all, get_client, run
+from starter.local_intake import (
+    LocalFileBackend,
+    default_predictions_dir,
+    score_local_files,
+)
+from starter.prediction_jobs import PredictionJobResult, PredictionJobScheduler
 from starter.schema import AppSettings
-from typing import List
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+# Batch prediction jobs running at the same time
+max_prediction_jobs_in_flight = 4
+# "dataset" scores the AI Catalog copies of the prediction datasets, "localFile"
+# uploads the files straight to the jobs and writes the results to outputs/predictions
+prediction_intake = "dataset"
+# First date of the shipped prediction sample, replayed to end a week from today
+prediction_data_start = datetime.date(2025, 3, 10)
+
+
+def prediction_date_reanchor(anchor: Optional[datetime.date] = None) -> DateReanchor:
+    """Date re-anchoring stage for the prediction datasets, usable on chunks"""
+    return DateReanchor(
+        date_col,
+        datetime_format,
+        anchor=anchor,
+        only_if_starts_on=prediction_data_start,
+    )
 
 
 def preprocess_prediction_dataset(dataset: pd.DataFrame) -> pd.DataFrame:
@@ -23,83 +53,152 @@ def preprocess_prediction_dataset(dataset: pd.DataFrame) -> pd.DataFrame:
     pd.DataFrame :
         Preprocessed dataset
     """
-    if 'date_col' in dataset.columns and pd.to_datetime(dataset["date_col"]).min() == pd.to_datetime('2025-03-10'):
-        dataset["date_col"] = pd.to_datetime(dataset["date_col"])
-    
-        current_date = pd.Timestamp.today().normalize() # 時間情報を省き、日付のみにする
-        time_difference = current_date - dataset["date_col"].max() + pd.Timedelta(days=7)
+    return prediction_date_reanchor()(dataset)
 
-        dataset['date_col'] = dataset['date_col'] + time_difference
-    return dataset
 
+def upload_dataset(
+    dataset: DatasetArgs,
+    use_case_id: str,
+    preprocess: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+) -> str:
+    client = get_client()
+    return get_or_create_dataset_from_file(
+        endpoint=client.endpoint,
+        token=client.token,
+        file_path=dataset.file_path,
+        file_format=dataset.format,
+        dtypes=dataset.dtypes,
+        name=dataset.resource_name,
+        use_cases=use_case_id,
+        preprocess=preprocess,
+    )
 
-def add_prediction_and_retraining_data() -> List[str]:
-    load_dotenv()
-    client = dr.Client()
 
+async def upload_datasets(
+    drx: AsyncDataRobot, include_prediction_data: bool = True
+) -> Tuple[List[str], str]:
+    """Upload the prediction datasets and the actuals at the same time"""
     with open(model_training_output_path) as f:
         model_training_output = AppSettings(**yaml.safe_load(f))
     use_case_id = model_training_output.use_case_id
     # Replace as needed with your own data ingest and/or preparation logic
-    prediction_dataset_ids = []
-    for prediction_dataset in prediction_datasets:
-        df = preprocess_prediction_dataset(pd.read_csv(prediction_dataset.file_path))
-
-        print("Uploading prediction data to AI Catalog...")
-        prediction_dataset_id = get_or_create_dataset_from_df(
-        endpoint=client.endpoint,
-        token=client.token,
-        data_frame=df,
-        name=prediction_dataset.resource_name,
-        use_cases=use_case_id,
-        )
-        prediction_dataset_ids.append(prediction_dataset_id)
-
+    uploads = [
+        # Fitted on the file's date range before chunks are shifted
+        drx.call(upload_dataset, prediction_dataset, use_case_id, prediction_date_reanchor())
+        for prediction_dataset in (prediction_datasets if include_prediction_data else [])
+    ]
     # 実データをアップロードする
-    df = pd.read_csv(actual_dataset.file_path)
-    print("Uploading actual data to AI Catalog...")
+    uploads.append(drx.call(upload_dataset, actual_dataset, use_case_id))
+    print("Uploading prediction and actual data to AI Catalog...")
+    *prediction_dataset_ids, actual_dataset_id = await gather_all(uploads)
+    return prediction_dataset_ids, actual_dataset_id
 
-    actual_dataset_id =  get_or_create_dataset_from_df(
-        endpoint=client.endpoint,
-        token=client.token,
-        data_frame=df,
-        name=actual_dataset.resource_name,
-        use_cases=use_case_id,
-    )
 
+def add_prediction_and_retraining_data(
+    include_prediction_data: bool = True,
+) -> Tuple[List[str], str]:
+    return run(lambda drx: upload_datasets(drx, include_prediction_data))
 
-    return prediction_dataset_ids, actual_dataset_id
+def make_prediction(
+    deployment_id: str,
+    prediction_dataset_ids: List[str],
+    max_in_flight: int = max_prediction_jobs_in_flight,
+    scheduler: Optional[PredictionJobScheduler] = None,
+) -> List[PredictionJobResult]:
+    """Score every prediction dataset and wait for all jobs to finish
+
+    Raises
+    ------
+    RuntimeError :
+        If any job did not complete, after all other jobs have finished
+    """
+    scheduler = scheduler or PredictionJobScheduler(max_in_flight=max_in_flight)
+    intake_settings = {
+        prediction_dataset_id: {
+            'type': 'dataset',
+            # get to make sure it exists
+            'dataset': dr.Dataset.get(prediction_dataset_id),
+        }
+        for prediction_dataset_id in prediction_dataset_ids
+    }
+    return check_prediction_results(scheduler.run(deployment_id, intake_settings))
 
-def make_prediction(deployment_id, prediction_dataset_ids):
 
-    for prediction_dataset_id in prediction_dataset_ids:
-        # get to make sure it exists
-    
-        dataset = dr.Dataset.get(prediction_dataset_id)
+def make_prediction_from_files(
+    deployment_id: str,
+    output_dir: Path = default_predictions_dir,
+    max_in_flight: int = max_prediction_jobs_in_flight,
+    backend: Optional[LocalFileBackend] = None,
+) -> List[PredictionJobResult]:
+    """Score the prediction dataset files without going through the AI Catalog
 
-        intake_settings={
-            'type': 'dataset',
-            'dataset': dataset
+    Results are written to `output_dir` as `<file name>.csv`, with the lot number
+    passed through. See `make_prediction` for errors.
+    """
+    intake_settings = {
+        prediction_dataset.resource_name: {
+            "file_path": prediction_dataset.file_path,
+            "output_path": output_dir / f"{Path(prediction_dataset.file_path).stem}.csv",
+            "preprocess": prediction_date_reanchor(),
+            "file_format": prediction_dataset.format,
+            "dtypes": prediction_dataset.dtypes,
         }
+        for prediction_dataset in prediction_datasets
+    }
+    results = score_local_files(
+        deployment_id,
+        intake_settings,
+        backend=backend,
+        max_in_flight=max_in_flight,
+        passthrough_columns=["ロット番号"],
+    )
+    return check_prediction_results(results)
+
 
-        job = dr.BatchPredictionJob.score(
-            deployment_id,
-            intake_settings=intake_settings
+def check_prediction_results(
+    results: List[PredictionJobResult],
+) -> List[PredictionJobResult]:
+    """Print a summary of every job and raise if any of them did not complete"""
+    for result in results:
+        print(
+            f"Batch prediction {result.job_id} for {result.key}: {result.status}, "
+            f"{result.scored_rows} rows scored in {result.duration_sec:.1f}s"
         )
-#    job.wait_for_completion()
+    failed = [result for result in results if not result.succeeded]
+    if failed:
+        raise RuntimeError(
+            "Batch predictions did not complete: "
+            + ", ".join(f"{r.key} ({r.status}: {r.status_details})" for r in failed)
+        )
+    return results
 
 def upload_actual(deployment_id:str, actual_dataset_id:str):
-    load_dotenv()
-    client = dr.Client()
+    get_client()
     deploy = dr.Deployment.get(deployment_id)
     job = deploy.submit_actuals_from_catalog_async(actual_dataset_id, 
                                              actual_value_column="ブリードアウト", 
                                              association_id_column="ロット番号")
+    # Raises if the actuals could not be submitted instead of dropping the job
+    job.wait_for_completion()
+
+async def score_files_and_upload_actual(drx: AsyncDataRobot, deployment_id: str) -> None:
+    """Score the prediction files while the actuals are uploaded to the AI Catalog
+
+    Actuals are only submitted once the predictions they are joined to exist.
+    """
+    _, (_, actual_dataset_id) = await gather_all(
+        [
+            drx.call(make_prediction_from_files, deployment_id),
+            upload_datasets(drx, include_prediction_data=False),
+        ]
+    )
+    await drx.call(upload_actual, deployment_id, actual_dataset_id)
 
-#    job.wait_for_completion()
 
 def prediction_and_upload_actual(deployment_id:str):
+    if prediction_intake == "localFile":
+        run(lambda drx: score_files_and_upload_actual(drx, deployment_id))
+        return
     prediction_dataset_ids, actual_dataset_id = add_prediction_and_retraining_data()
-
     make_prediction(deployment_id=deployment_id, prediction_dataset_ids=prediction_dataset_ids)
     upload_actual(deployment_id=deployment_id, actual_dataset_id=actual_dataset_id)
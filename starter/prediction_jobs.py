@@ -0,0 +1,171 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Concurrent batch prediction submission and completion tracking."""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional, Protocol, Tuple
+
+import datarobot as dr
+from pydantic import BaseModel
+
+TERMINAL_STATUSES = {"COMPLETED", "ABORTED", "FAILED"}
+TIMEOUT_STATUS = "TIMEOUT"
+
+
+class BatchPredictionJobLike(Protocol):
+    id: str
+
+    def get_status(self) -> Dict[str, Any]: ...
+
+
+class BatchPredictionBackend(Protocol):
+    """Anything with the `dr.BatchPredictionJob.score` signature"""
+
+    def score(
+        self, deployment: str, intake_settings: Any = None, **kwargs: Any
+    ) -> BatchPredictionJobLike: ...
+
+
+class PredictionJobResult(BaseModel):
+    key: str
+    job_id: Optional[str] = None
+    status: str
+    scored_rows: int = 0
+    failed_rows: int = 0
+    duration_sec: float = 0.0
+    status_details: Optional[str] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.status == "COMPLETED"
+
+
+class PredictionJobScheduler:
+    """Run batch prediction jobs with a bounded number in flight
+
+    Jobs are submitted until `max_in_flight` are running. All running jobs are polled
+    from one loop; the poll interval grows by `backoff` up to `max_poll_interval`
+    while nothing finishes and resets when a job completes, which frees a slot for
+    the next submission.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[BatchPredictionBackend] = None,
+        max_in_flight: int = 4,
+        poll_interval: float = 1.0,
+        max_poll_interval: float = 30.0,
+        backoff: float = 2.0,
+        timeout: Optional[float] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.backend = backend or dr.BatchPredictionJob  # type: ignore[attr-defined]
+        self.max_in_flight = max_in_flight
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.backoff = backoff
+        self.timeout = timeout
+        self.sleep = sleep
+        self.clock = clock
+
+    def run(
+        self,
+        deployment_id: str,
+        intake_settings: Mapping[str, Any],
+        **score_kwargs: Any,
+    ) -> List[PredictionJobResult]:
+        """Score every intake and wait for all of them
+
+        Parameters
+        ----------
+        deployment_id : str
+            Deployment used for scoring
+        intake_settings : Mapping[str, Any]
+            Intake settings for each job, keyed by a name used in the results
+        score_kwargs :
+            Passed through to `score`
+
+        Returns
+        -------
+        List[PredictionJobResult] :
+            One result per intake, in submission order
+        """
+        pending = list(intake_settings.items())
+        in_flight: Dict[str, Tuple[BatchPredictionJobLike, float]] = {}
+        results: Dict[str, PredictionJobResult] = {}
+        started = self.clock()
+        interval = self.poll_interval
+
+        while pending or in_flight:
+            while pending and len(in_flight) < self.max_in_flight:
+                key, settings = pending.pop(0)
+                submitted = self.clock()
+                try:
+                    job = self.backend.score(
+                        deployment_id, intake_settings=settings, **score_kwargs
+                    )
+                except Exception as e:
+                    results[key] = PredictionJobResult(
+                        key=key, status="FAILED", status_details=str(e)
+                    )
+                    continue
+                in_flight[key] = (job, submitted)
+
+            finished = False
+            for key, (job, submitted) in list(in_flight.items()):
+                status = job.get_status()
+                if status.get("status") in TERMINAL_STATUSES:
+                    results[key] = self._result(key, job, status, submitted)
+                    del in_flight[key]
+                    finished = True
+
+            if self.timeout is not None and self.clock() - started > self.timeout:
+                for key, (job, submitted) in in_flight.items():
+                    results[key] = self._result(
+                        key, job, {"status": TIMEOUT_STATUS}, submitted
+                    )
+                for key, _ in pending:
+                    results[key] = PredictionJobResult(key=key, status=TIMEOUT_STATUS)
+                break
+
+            if in_flight:
+                self.sleep(interval)
+            interval = (
+                self.poll_interval
+                if finished
+                else min(interval * self.backoff, self.max_poll_interval)
+            )
+
+        return [results[key] for key in intake_settings]
+
+    def _result(
+        self,
+        key: str,
+        job: BatchPredictionJobLike,
+        status: Mapping[str, Any],
+        submitted: float,
+    ) -> PredictionJobResult:
+        return PredictionJobResult(
+            key=key,
+            job_id=job.id,
+            status=status["status"],
+            scored_rows=status.get("scored_rows") or 0,
+            failed_rows=status.get("failed_rows") or 0,
+            duration_sec=self.clock() - submitted,
+            status_details=status.get("status_details"),
+        )
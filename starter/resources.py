@@ -15,8 +15,6 @@
 
 from __future__ import annotations
 
-import json
-import subprocess
 from typing import Any, Dict, Mapping, Tuple, Type, Union
 
 from pydantic import AliasChoices, Field
@@ -28,50 +26,40 @@ from pydantic_settings import (
 )
 from pydantic_settings.sources import parse_env_vars
 
+from starter.stack_outputs import get_stack_name, get_stack_outputs
+
 
 def get_stack_suffix() -> str:
-    try:
-        return (
-            "."
-            + subprocess.check_output(
-                ["pulumi", "stack", "--show-name", "--non-interactive"],
-                text=True,
-                stderr=subprocess.STDOUT,
-            ).strip()
-        )
-    except Exception:
-        pass
-    return ""
+    stack_name = get_stack_name()
+    return "." + stack_name if stack_name else ""
 
 
-app_settings_file_name = f"train_model_output{get_stack_suffix()}.yaml"
+def get_app_settings_file_name() -> str:
+    return f"train_model_output{get_stack_suffix()}.yaml"
+
+
+def __getattr__(name: str) -> Any:
+    # Looked up lazily, finding the stack may call the pulumi CLI
+    if name == "app_settings_file_name":
+        return get_app_settings_file_name()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class PulumiSettingsSource(EnvSettingsSource):
-    """Pulumi stack outputs as a pydantic settings source."""
+    """Pulumi stack outputs as a pydantic settings source.
+
+    Outputs come from the process-wide cache in `starter.stack_outputs`, so
+    instantiating settings does not call the pulumi CLI again.
+    """
 
     _PULUMI_OUTPUTS: Dict[str, str] = {}
-    _PULUMI_CALLED: bool = False
 
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         self.read_pulumi_outputs()
         super().__init__(*args, **kwargs)
 
     def read_pulumi_outputs(self) -> None:
-        try:
-            raw_outputs = json.loads(
-                subprocess.check_output(
-                    ["pulumi", "stack", "output", "-j"],
-                    text=True,
-                    stderr=subprocess.STDOUT,
-                ).strip()
-            )
-            self._PULUMI_OUTPUTS = {
-                k: v if isinstance(v, str) else json.dumps(v)
-                for k, v in raw_outputs.items()
-            }
-        except BaseException:
-            self._PULUMI_OUTPUTS = {}
+        self._PULUMI_OUTPUTS = get_stack_outputs()
 
     def _load_env_vars(self) -> Mapping[str, Union[str, None]]:
         return parse_env_vars(
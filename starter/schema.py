@@ -40,6 +40,9 @@ class AppSettings(BaseModel):
 
 
 class AppUrls(BaseModel):
+    # Shared between callers of the memoized `starter.api.get_app_urls`
+    model_config = ConfigDict(frozen=True)
+
     use_case: str
     project: str
     deployment: str
@@ -0,0 +1,461 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Local scoring server for the custom model folder.
+
+Serves `assets/custom_model` for load testing and air-gapped scoring:
+
+    python -m starter.scoring_server --port 8080 --workers 4
+
+`POST /predict` accepts CSV, JSON (records or columns) and Arrow IPC bodies and
+returns `{"predictions": [{"False": ..., "True": ...}, ...]}`. Concurrent small
+requests are coalesced into one `predict_proba` call on a process pool where
+each worker loads the model once. `GET /stats` reports p50/p99 latency and rows/s.
+
+`GET /ping` answers as soon as the port is open, `GET /ready` returns 503 until
+every worker has loaded and warmed up the model, then 200 with their timings.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from starter.custom_model import load_custom_hooks, load_custom_model
+from starter.paths import custom_model_dir
+
+ARROW_CONTENT_TYPES = (
+    "application/vnd.apache.arrow.file",
+    "application/vnd.apache.arrow.stream",
+)
+
+# Per worker process state, populated by `_init_worker`
+_hooks: Optional[ModuleType] = None
+_model: Any = None
+_ready_barrier: Any = None
+
+
+def _init_worker(code_dir: str, ready_barrier: Any = None) -> None:
+    global _hooks, _model, _ready_barrier
+    _hooks, _model = load_custom_model(Path(code_dir))
+    _ready_barrier = ready_barrier
+
+
+def _class_labels(_: int = 0) -> List[str]:
+    return [str(label) for label in _model.classes_]
+
+
+def _worker_readiness(_: int = 0) -> Dict[str, Any]:
+    # Held until every worker has loaded the model and runs one of these, so no
+    # worker takes a second one while another is still starting
+    if _ready_barrier is not None:
+        _ready_barrier.wait()
+    readiness = getattr(_hooks, "readiness", lambda: None)() or {}
+    feature_names = getattr(_model, "feature_names_in_", None)
+    return {
+        "pid": os.getpid(),
+        "class_labels": _class_labels(),
+        "feature_names": None if feature_names is None else list(feature_names),
+        **readiness,
+    }
+
+
+def _score(data: pd.DataFrame) -> np.ndarray:
+    assert _hooks is not None
+    probabilities: np.ndarray = _model.predict_proba(_hooks.transform(data, _model))
+    return probabilities
+
+
+class UnsupportedContentType(ValueError):
+    """Raised by `read_body` for bodies it has no parser for"""
+
+
+def read_body(
+    body: bytes,
+    content_type: str,
+    read_input_data: Optional[Callable[[bytes], pd.DataFrame]] = None,
+) -> pd.DataFrame:
+    """Parse a request body into a DataFrame based on its content type
+
+    CSV bodies go through the model's `read_input_data` hook when it has one, as
+    they do in DRUM.
+    """
+    content_type = content_type.split(";")[0].strip().lower()
+    if content_type in ARROW_CONTENT_TYPES:
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise UnsupportedContentType(
+                "Arrow bodies require `pyarrow` to be installed"
+            ) from e
+        reader = (
+            pa.ipc.open_file(pa.BufferReader(body))
+            if content_type.endswith("file")
+            else pa.ipc.open_stream(pa.BufferReader(body))
+        )
+        return reader.read_all().to_pandas()
+    if content_type == "application/json":
+        payload = json.loads(body)
+        if isinstance(payload, dict) and "data" in payload:
+            payload = payload["data"]
+        return pd.DataFrame(payload)
+    if content_type in ("text/csv", "text/plain", ""):
+        if read_input_data is not None:
+            return read_input_data(body)
+        return pd.read_csv(io.BytesIO(body))
+    raise UnsupportedContentType(f"Unsupported content type: {content_type}")
+
+
+class LatencyStats:
+    """Thread-safe request latency and throughput tracker"""
+
+    def __init__(self, window: int = 10_000) -> None:
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._first_request: Optional[float] = None
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+
+    def record_request(self, latency: float, rows: int) -> None:
+        with self._lock:
+            if self._first_request is None:
+                self._first_request = time.perf_counter() - latency
+            self._latencies.append(latency)
+            self.requests += 1
+            self.rows += rows
+
+    def record_batch(self) -> None:
+        with self._lock:
+            self.batches += 1
+
+    def summary(self) -> Dict[str, float]:
+        with self._lock:
+            latencies = np.array(self._latencies)
+            elapsed = (
+                time.perf_counter() - self._first_request
+                if self._first_request is not None
+                else 0.0
+            )
+            p50, p99 = (
+                np.percentile(latencies, [50, 99]) * 1e3
+                if len(latencies)
+                else (0.0, 0.0)
+            )
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "rows": self.rows,
+                "p50_ms": float(p50),
+                "p99_ms": float(p99),
+                "rows_per_sec": self.rows / elapsed if elapsed else 0.0,
+            }
+
+
+class MicroBatcher:
+    """Coalesce concurrent requests into batched `predict_proba` calls
+
+    Requests are collected until `max_batch_rows` is reached or the oldest has waited
+    `max_wait_ms`, then scored as one frame on the worker pool. Dispatch does not wait
+    for the result, so every worker can be scoring a batch at the same time.
+
+    Only requests with the same columns are concatenated, so none is NaN-filled by
+    another's layout. When a coalesced batch fails, its requests are scored one by
+    one and only the failing ones get the error.
+    """
+
+    def __init__(
+        self,
+        pool: ProcessPoolExecutor,
+        stats: LatencyStats,
+        max_batch_rows: int = 10_000,
+        max_wait_ms: float = 5.0,
+    ) -> None:
+        self.pool = pool
+        self.stats = stats
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1e3
+        self._queue: queue.Queue[Optional[Tuple[pd.DataFrame, Future[np.ndarray]]]] = (
+            queue.Queue()
+        )
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, data: pd.DataFrame) -> Future[np.ndarray]:
+        future: Future[np.ndarray] = Future()
+        self._queue.put((data, future))
+        return future
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            rows = len(item[0])
+            deadline = time.perf_counter() + self.max_wait
+            while rows < self.max_batch_rows:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._dispatch(batch)
+                    return
+                batch.append(item)
+                rows += len(item[0])
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: List[Tuple[pd.DataFrame, Future[np.ndarray]]]) -> None:
+        layouts: Dict[
+            Tuple[Any, ...], List[Tuple[pd.DataFrame, Future[np.ndarray]]]
+        ] = {}
+        for item in batch:
+            layouts.setdefault(tuple(item[0].columns), []).append(item)
+        for group in layouts.values():
+            self._submit(group)
+
+    def _submit(self, batch: List[Tuple[pd.DataFrame, Future[np.ndarray]]]) -> None:
+        frames = [data for data, _ in batch]
+        data = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+        self.stats.record_batch()
+        result = self.pool.submit(_score, data)
+        result.add_done_callback(lambda done: self._split(done, batch))
+
+    def _split(
+        self,
+        done: Future[np.ndarray],
+        batch: List[Tuple[pd.DataFrame, Future[np.ndarray]]],
+    ) -> None:
+        error = done.exception()
+        if error is not None:
+            if len(batch) > 1:
+                # Isolate the request that broke the batch
+                for item in batch:
+                    self._submit([item])
+                return
+            batch[0][1].set_exception(error)
+            return
+        probabilities = done.result()
+        offset = 0
+        for data, future in batch:
+            future.set_result(probabilities[offset : offset + len(data)])
+            offset += len(data)
+
+
+class ScoringServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        code_dir: Path = custom_model_dir,
+        workers: int = 1,
+        max_batch_rows: int = 10_000,
+        max_wait_ms: float = 5.0,
+        wait_ready: bool = True,
+    ) -> None:
+        # Workers are spawned rather than forked, the server itself is threaded
+        context = multiprocessing.get_context("spawn")
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(str(code_dir), context.Barrier(workers)),
+        )
+        self.ready = threading.Event()
+        self.class_labels: List[str] = []
+        self.feature_names: Optional[List[str]] = None
+        self.workers: List[Dict[str, Any]] = []
+        self.load_error: Optional[BaseException] = None
+        # Bodies are parsed here, the hooks module is imported without the model
+        self.hooks = load_custom_hooks(code_dir)
+        self.read_input_data = getattr(self.hooks, "read_input_data", None)
+        self.stats = LatencyStats()
+        self.batcher = MicroBatcher(self.pool, self.stats, max_batch_rows, max_wait_ms)
+        super().__init__(address, ScoringRequestHandler)
+        loader = threading.Thread(target=self._load_workers, args=(workers,))
+        loader.daemon = True
+        loader.start()
+        if wait_ready:
+            self.ready.wait()
+            if self.load_error is not None:
+                self.server_close()
+                raise self.load_error
+
+    def _load_workers(self, workers: int) -> None:
+        # One task per worker spawns the whole pool, and each worker loads and warms
+        # up the model before accepting requests. The tasks wait for each other, so
+        # every worker runs exactly one.
+        try:
+            self.workers = list(self.pool.map(_worker_readiness, range(workers)))
+            if len({worker["pid"] for worker in self.workers}) != workers:
+                raise RuntimeError(f"Not all {workers} workers reported ready")
+            self.class_labels = self.workers[0]["class_labels"]
+            self.feature_names = self.workers[0]["feature_names"]
+            self._warmup()
+        except BaseException as e:
+            self.load_error = e
+        self.ready.set()
+
+    def _warmup(self) -> None:
+        """Take a synthetic request through parsing here and scoring on a worker
+
+        Workers warm up in `load_model`, but the first body parsed and sent to the
+        pool by this process would still pay for first-call initialization.
+        """
+        if getattr(self.hooks, "warmup_rows", lambda: 0)() <= 0:
+            return
+        body = self.hooks.synthetic_batch(1).to_csv(index=False).encode()
+        self.pool.submit(
+            _score, read_body(body, "text/csv", self.read_input_data)
+        ).result()
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.batcher.close()
+        self.pool.shutdown()
+
+
+class ScoringRequestHandler(BaseHTTPRequestHandler):
+    server: ScoringServer
+
+    def do_GET(self) -> None:
+        if self.path == "/ping":
+            self._send_json(200, {"message": "OK"})
+        elif self.path == "/ready":
+            if not self.server.ready.is_set():
+                self._send_json(503, {"message": "Loading the model"})
+            elif self.server.load_error is not None:
+                self._send_json(500, {"message": str(self.server.load_error)})
+            else:
+                self._send_json(200, {"workers": self.server.workers})
+        elif self.path == "/stats":
+            self._send_json(200, self.server.stats.summary())
+        else:
+            self._send_json(404, {"message": f"Not found: {self.path}"})
+
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") != "/predict":
+            self._send_json(404, {"message": f"Not found: {self.path}"})
+            return
+        start = time.perf_counter()
+        # Requests arriving before the workers are ready wait for them
+        self.server.ready.wait()
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            data = read_body(
+                body,
+                self.headers.get("Content-Type", ""),
+                self.server.read_input_data,
+            )
+        except UnsupportedContentType as e:
+            self._send_json(415, {"message": str(e)})
+            return
+        except ValueError as e:
+            # Malformed bodies, e.g. CSV the parser rejects or invalid JSON
+            self._send_json(400, {"message": str(e)})
+            return
+        missing = [
+            column
+            for column in self.server.feature_names or []
+            if column not in data.columns
+        ]
+        if missing:
+            self._send_json(400, {"message": f"Missing columns: {', '.join(missing)}"})
+            return
+        try:
+            probabilities = self.server.batcher.submit(data).result()
+        except Exception as e:
+            self._send_json(422, {"message": str(e)})
+            return
+        labels = self.server.class_labels
+        predictions = [dict(zip(labels, row)) for row in probabilities.tolist()]
+        # Recorded before responding, so a client reading /stats next sees it
+        self.server.stats.record_request(time.perf_counter() - start, len(data))
+        self._send_json(200, {"predictions": predictions})
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the custom model locally")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--code-dir", type=Path, default=custom_model_dir)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--max-batch-rows", type=int, default=10_000)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument(
+        "--wait-ready",
+        action="store_true",
+        help="Load the workers before serving, instead of answering /ready with 503",
+    )
+    args = parser.parse_args()
+
+    server = ScoringServer(
+        (args.host, args.port),
+        code_dir=args.code_dir,
+        workers=args.workers,
+        max_batch_rows=args.max_batch_rows,
+        max_wait_ms=args.max_wait_ms,
+        wait_ready=args.wait_ready,
+    )
+    print(
+        f"Serving {args.code_dir} on http://{args.host}:{server.server_port}",
+        flush=True,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats.summary(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Process-wide cache of the active Pulumi stack and its outputs.
+
+Every `pulumi` CLI call costs from hundreds of milliseconds to seconds, so the
+stack name and outputs are looked up at most once per `ttl`. Outputs are also
+written to a snapshot in `outputs/`, keyed by stack name and the stack's last
+update time, which lets a new process reuse them without calling the CLI.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from starter.paths import PROJECT_ROOT
+
+default_snapshot_dir = PROJECT_ROOT / "outputs"
+# Seconds a lookup or snapshot is trusted without asking the CLI
+default_ttl = float(os.environ.get("PULUMI_STACK_OUTPUTS_TTL", 300))
+
+stack_context_env_name = "PULUMI_STACK_CONTEXT"
+
+
+def run_pulumi(args: List[str]) -> str:
+    return subprocess.check_output(
+        ["pulumi", *args, "--non-interactive"],
+        text=True,
+        stderr=subprocess.STDOUT,
+    ).strip()
+
+
+class StackOutputCache:
+    """Lazily populated, thread-safe cache of the active stack's outputs
+
+    Parameters
+    ----------
+    ttl : float
+        Seconds cached values are used without calling the CLI
+    snapshot_dir : Path, optional
+        Directory of the on-disk snapshots, None disables them
+    run : Callable[[List[str]], str]
+        Runs a `pulumi` command and returns its stdout
+    clock : Callable[[], float]
+        Wall clock, shared with snapshots written by other processes
+    """
+
+    def __init__(
+        self,
+        ttl: float = default_ttl,
+        snapshot_dir: Optional[Path] = default_snapshot_dir,
+        run: Callable[[List[str]], str] = run_pulumi,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.ttl = ttl
+        self.snapshot_dir = snapshot_dir
+        self.run = run
+        self.clock = clock
+        self.cli_calls = 0
+        self._lock = threading.RLock()
+        self._stack_name: Optional[str] = None
+        self._last_update: Optional[str] = None
+        self._listed_at: Optional[float] = None
+        self._outputs: Optional[Dict[str, str]] = None
+        self._fetched_at = 0.0
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._stack_name = None
+            self._listed_at = None
+            self._outputs = None
+
+    def _call(self, args: List[str]) -> Optional[str]:
+        self.cli_calls += 1
+        try:
+            return self.run(args)
+        except Exception:
+            # No CLI or no stack selected, e.g. when running inside DataRobot
+            return None
+
+    def _list_stack(self) -> Tuple[Optional[str], Optional[str]]:
+        """Name and last update time of the active stack, from one CLI call"""
+        if self._listed_at is not None and self.clock() - self._listed_at < self.ttl:
+            return self._stack_name, self._last_update
+        name = os.environ.get(stack_context_env_name)
+        last_update = None
+        raw = self._call(["stack", "ls", "--json"])
+        try:
+            stacks: List[Dict[str, Any]] = json.loads(raw) if raw else []
+        except json.JSONDecodeError:
+            stacks = []
+        for stack in stacks:
+            if name is None and stack.get("current"):
+                name = stack["name"]
+            if name is not None and (
+                stack["name"] == name or stack["name"].endswith("/" + name)
+            ):
+                last_update = stack.get("lastUpdate")
+                break
+        self._stack_name, self._last_update = name, last_update
+        self._listed_at = self.clock()
+        return name, last_update
+
+    def stack_name(self) -> Optional[str]:
+        """Name of the active stack, or None when it cannot be determined"""
+        name = os.environ.get(stack_context_env_name)
+        if name:
+            return name
+        with self._lock:
+            return self._list_stack()[0]
+
+    def _snapshot_path(self, name: str) -> Optional[Path]:
+        if self.snapshot_dir is None:
+            return None
+        return self.snapshot_dir / f"pulumi_stack_outputs.{name.replace('/', '_')}.json"
+
+    def discard_snapshot(self, name: str) -> None:
+        """Drop the snapshot of a stack that is being updated"""
+        path = self._snapshot_path(name)
+        if path is not None:
+            path.unlink(missing_ok=True)
+        self.invalidate()
+
+    def _read_snapshot(self, name: str) -> Optional[Dict[str, Any]]:
+        path = self._snapshot_path(name)
+        if path is None:
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                snapshot: Dict[str, Any] = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        return snapshot if snapshot.get("stack") == name else None
+
+    def _write_snapshot(
+        self, name: str, last_update: Optional[str], outputs: Dict[str, str]
+    ) -> None:
+        path = self._snapshot_path(name)
+        if path is None:
+            return
+        snapshot = {
+            "stack": name,
+            "last_update": last_update,
+            "fetched_at": self.clock(),
+            "outputs": outputs,
+        }
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def outputs(self) -> Dict[str, str]:
+        """Outputs of the active stack, non-string values JSON encoded"""
+        with self._lock:
+            now = self.clock()
+            if self._outputs is not None and now - self._fetched_at < self.ttl:
+                return self._outputs
+
+            name = os.environ.get(stack_context_env_name)
+            snapshot = self._read_snapshot(name) if name else None
+            if snapshot is not None and now - snapshot["fetched_at"] < self.ttl:
+                return self._remember(snapshot["outputs"])
+
+            name, last_update = self._list_stack()
+            if name is None:
+                return self._remember({})
+            snapshot = self._read_snapshot(name)
+            if (
+                snapshot is not None
+                and last_update is not None
+                and snapshot["last_update"] == last_update
+            ):
+                # The stack has not been updated since the snapshot was taken
+                self._write_snapshot(name, last_update, snapshot["outputs"])
+                return self._remember(snapshot["outputs"])
+
+            raw = self._call(["stack", "output", "-j", "--stack", name])
+            try:
+                raw_outputs: Dict[str, Any] = json.loads(raw) if raw else {}
+            except json.JSONDecodeError:
+                raw_outputs = {}
+            outputs = {
+                k: v if isinstance(v, str) else json.dumps(v)
+                for k, v in raw_outputs.items()
+            }
+            if raw is not None:
+                self._write_snapshot(name, last_update, outputs)
+            return self._remember(outputs)
+
+    def _remember(self, outputs: Dict[str, str]) -> Dict[str, str]:
+        self._outputs = outputs
+        self._fetched_at = self.clock()
+        return outputs
+
+
+stack_output_cache = StackOutputCache()
+
+
+def get_stack_name() -> Optional[str]:
+    return stack_output_cache.stack_name()
+
+
+def get_stack_outputs() -> Dict[str, str]:
+    return stack_output_cache.outputs()
@@ -0,0 +1,226 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Wall and CPU time spans for the `pulumi up` program and the workflows it runs.
+
+    with span("run_notebook", phase="training"):
+        ...
+
+    @timed(phase="datasets")
+    def get_or_create_dataset_from_file(...): ...
+
+Spans are recorded by the process-wide `tracer` from any thread. `format_summary`
+aggregates them per phase, and `export_chrome_trace` writes them in the Trace
+Event format opened by chrome://tracing and https://ui.perfetto.dev.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar, Union
+
+from pydantic import BaseModel
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+DEFAULT_PHASE = "other"
+
+
+class Span(BaseModel):
+    name: str
+    phase: str
+    # Seconds since the tracer was created or reset
+    start_sec: float
+    wall_sec: float
+    # CPU time of the thread the span ran on, excludes waiting on the network
+    cpu_sec: float
+    thread_id: int
+    error: Optional[str] = None
+
+    @property
+    def end_sec(self) -> float:
+        return self.start_sec + self.wall_sec
+
+
+class Tracer:
+    """Collects spans of one process, safe to share between threads"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.spans: List[Span] = []
+        self.origin = time.perf_counter()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.spans = []
+            self.origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str, phase: str = DEFAULT_PHASE) -> Iterator[None]:
+        """Record the wall and CPU time of the block, also when it raises"""
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            record = Span(
+                name=name,
+                phase=phase,
+                start_sec=start - self.origin,
+                wall_sec=time.perf_counter() - start,
+                cpu_sec=time.thread_time() - cpu_start,
+                thread_id=threading.get_ident(),
+                error=error,
+            )
+            with self._lock:
+                self.spans.append(record)
+
+    def add(
+        self, name: str, phase: str, start: float, end: Optional[float] = None
+    ) -> None:
+        """Record a span ending in a callback, e.g. when a Pulumi output resolves
+
+        `start` and `end` are `time.perf_counter()` values, CPU time is unknown.
+        """
+        end = time.perf_counter() if end is None else end
+        record = Span(
+            name=name,
+            phase=phase,
+            start_sec=start - self.origin,
+            wall_sec=end - start,
+            cpu_sec=0.0,
+            thread_id=threading.get_ident(),
+        )
+        with self._lock:
+            self.spans.append(record)
+
+    def timed(
+        self, name: Optional[str] = None, phase: str = DEFAULT_PHASE
+    ) -> Callable[[F], F]:
+        """Decorator recording a span for every call, named after the function"""
+
+        def decorator(fn: F) -> F:
+            span_name = name or fn.__name__
+
+            @functools.wraps(fn)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                with self.span(span_name, phase):
+                    return fn(*args, **kwargs)
+
+            return wrapper  # type: ignore[return-value]
+
+        return decorator
+
+    def phase_totals(self) -> List[Tuple[str, float, float]]:
+        """Phases with their elapsed wall time and CPU time, slowest first
+
+        Elapsed time is the union of the phase's spans, so nested and concurrent
+        spans are not counted twice. CPU time only counts outermost spans.
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start_sec)
+        by_phase: Dict[str, List[Span]] = {}
+        for s in spans:
+            by_phase.setdefault(s.phase, []).append(s)
+        totals = []
+        for phase, phase_spans in by_phase.items():
+            elapsed = 0.0
+            cpu = 0.0
+            # Ends of the outermost span running on each thread
+            open_until: Dict[int, float] = {}
+            covered_until = float("-inf")
+            for s in phase_spans:
+                elapsed += max(0.0, s.end_sec - max(s.start_sec, covered_until))
+                covered_until = max(covered_until, s.end_sec)
+                if s.start_sec >= open_until.get(s.thread_id, float("-inf")):
+                    cpu += s.cpu_sec
+                    open_until[s.thread_id] = s.end_sec
+            totals.append((phase, elapsed, cpu))
+        return sorted(totals, key=lambda t: t[1], reverse=True)
+
+    def format_summary(self) -> str:
+        """Table of phases, slowest first, each followed by its spans by name"""
+        with self._lock:
+            spans = list(self.spans)
+        rows = [("phase / span", "calls", "wall s", "max s", "cpu s", "errors")]
+        for phase, elapsed, cpu in self.phase_totals():
+            phase_spans = [s for s in spans if s.phase == phase]
+            rows.append(
+                (phase, str(len(phase_spans)), f"{elapsed:.2f}", "", f"{cpu:.2f}", "")
+            )
+            names: Dict[str, List[Span]] = {}
+            for s in phase_spans:
+                names.setdefault(s.name, []).append(s)
+            for name, named in sorted(
+                names.items(), key=lambda item: -sum(s.wall_sec for s in item[1])
+            ):
+                rows.append(
+                    (
+                        f"  {name}",
+                        str(len(named)),
+                        f"{sum(s.wall_sec for s in named):.2f}",
+                        f"{max(s.wall_sec for s in named):.2f}",
+                        f"{sum(s.cpu_sec for s in named):.2f}",
+                        str(sum(s.error is not None for s in named) or ""),
+                    )
+                )
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        return "\n".join(
+            "  ".join(
+                cell.ljust(width) if i == 0 else cell.rjust(width)
+                for i, (cell, width) in enumerate(zip(row, widths))
+            ).rstrip()
+            for row in rows
+        )
+
+    def export_chrome_trace(self, path: Union[str, Path]) -> Path:
+        """Write the spans as complete events of the Trace Event format"""
+        with self._lock:
+            spans = list(self.spans)
+        pid = os.getpid()
+        events = [
+            {
+                "name": s.name,
+                "cat": s.phase,
+                "ph": "X",
+                "ts": round(s.start_sec * 1e6),
+                "dur": round(s.wall_sec * 1e6),
+                "pid": pid,
+                "tid": s.thread_id,
+                "args": {"cpu_ms": round(s.cpu_sec * 1e3, 3), "error": s.error},
+            }
+            for s in spans
+        ]
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False
+            )
+        return path
+
+
+tracer = Tracer()
+span = tracer.span
+timed = tracer.timed
@@ -0,0 +1,53 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""DataRobot GUI URLs built from an API endpoint, which is parsed once."""
+
+from __future__ import annotations
+
+import functools
+from urllib.parse import urljoin, urlsplit
+
+
+class UrlBuilder:
+    """GUI URLs of the DataRobot instance serving `endpoint`
+
+    Parameters
+    ----------
+    endpoint : str
+        Public API endpoint, e.g. https://app.datarobot.com/api/v2
+    """
+
+    def __init__(self, endpoint: str) -> None:
+        self.endpoint = endpoint
+        self.base_url = urljoin(endpoint.rstrip("/"), "..")
+        parsed = urlsplit(endpoint)
+        self.origin = f"{parsed.scheme}://{parsed.netloc}"
+
+    def use_case(self, use_case_id: str) -> str:
+        return f"{self.base_url}usecases/{use_case_id}/overview"
+
+    def project(self, project_id: str, model_id: str) -> str:
+        return f"{self.base_url}projects/{project_id}/models/{model_id}/"
+
+    def deployment(self, deployment_id: str) -> str:
+        return f"{self.base_url}deployments/{deployment_id}/overview"
+
+    def console_deployment(self, deployment_id: str) -> str:
+        return f"{self.origin}/console-nextgen/deployments/{deployment_id}/"
+
+
+@functools.lru_cache(maxsize=None)
+def url_builder(endpoint: str) -> UrlBuilder:
+    return UrlBuilder(endpoint)
@@ -148,3 +148,17 @@ def pulumi_up(
 @pytest.fixture
 def dr_client(session_env_vars):
     return dr.Client()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def columnar_cache_dir(tmp_path_factory):
+    """Keep the Arrow copies of CSV files read by tests out of outputs/
+
+    Session-scoped so that module fixtures reading datasets are covered too.
+    """
+    from starter import dataset_io
+
+    cache_dir = tmp_path_factory.getbasetemp() / "columnar"
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(dataset_io, "columnar_cache_dir", cache_dir)
+        yield cache_dir
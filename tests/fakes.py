@@ -0,0 +1,277 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# type: ignore
+
+"""Local stand-ins for DataRobot services."""
+
+import gzip
+import io
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+
+class FakeBatchPredictionJob:
+    def __init__(self, backend, job_id, rows, polls_until_done, status):
+        self.id = job_id
+        self._backend = backend
+        self._rows = rows
+        self._polls_left = polls_until_done
+        self._final_status = status
+
+    def get_status(self):
+        self._backend.polls += 1
+        if self._polls_left > 0:
+            self._polls_left -= 1
+            return {"status": "RUNNING", "scored_rows": 0, "failed_rows": 0}
+        if self in self._backend.running:
+            self._backend.running.remove(self)
+        return {
+            "status": self._final_status,
+            "scored_rows": self._rows if self._final_status == "COMPLETED" else 0,
+            "failed_rows": 0 if self._final_status == "COMPLETED" else self._rows,
+            "status_details": f"Job {self._final_status.lower()}",
+        }
+
+
+class FakeBatchPredictionBackend:
+    """Drop-in for `dr.BatchPredictionJob` that finishes jobs after a few polls
+
+    Intake settings are dicts with optional `rows`, `polls` and `status` keys.
+    """
+
+    def __init__(self):
+        self._ids = itertools.count()
+        self.running = []
+        self.max_running = 0
+        self.polls = 0
+        self.submitted = []
+
+    def score(self, deployment, intake_settings=None, **kwargs):
+        settings = intake_settings or {}
+        if settings.get("status") == "REJECTED":
+            raise ValueError("Intake rejected")
+        job = FakeBatchPredictionJob(
+            self,
+            job_id=f"job-{next(self._ids)}",
+            rows=settings.get("rows", 100),
+            polls_until_done=settings.get("polls", 2),
+            status=settings.get("status", "COMPLETED"),
+        )
+        self.submitted.append((deployment, settings))
+        self.running.append(job)
+        self.max_running = max(self.max_running, len(self.running))
+        return job
+
+
+class FakeResponse:
+    def __init__(self, payload=None, content=b""):
+        self._payload = payload
+        self._content = content
+
+    def json(self):
+        return self._payload
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self._content), chunk_size):
+            yield self._content[start : start + chunk_size]
+
+
+class FakeBatchPredictionClient:
+    """Drop-in for the DataRobot REST client behind multipart `localFile` jobs
+
+    Parts are decompressed and parsed as they arrive. Jobs complete on the first
+    status poll after `finalizeMultipart`, and their results give every uploaded
+    row a probability of 0.25 next to the passthrough columns.
+    """
+
+    def __init__(self, fail_part=None, put_delay=0.0):
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.fail_part = fail_part
+        self.put_delay = put_delay
+        self.jobs = {}
+        self.deleted = []
+        self.uploading = 0
+        self.max_uploading = 0
+
+    def post(self, url, data=None, **kwargs):
+        if url == "batchPredictions/":
+            job_id = f"job-{next(self._ids)}"
+            self.jobs[job_id] = {"settings": data, "parts": {}, "finalized": False}
+            return FakeResponse(
+                {
+                    "id": job_id,
+                    "links": {"csvUpload": f"https://dr/{job_id}/csvUpload/"},
+                }
+            )
+        job_id = url.split("/")[-3]
+        self.jobs[job_id]["finalized"] = True
+        return FakeResponse()
+
+    def put(self, url, data=None, headers=None, **kwargs):
+        with self._lock:
+            self.uploading += 1
+            self.max_uploading = max(self.max_uploading, self.uploading)
+        try:
+            time.sleep(self.put_delay)
+            part_number = int(url.rsplit("/", 1)[-1])
+            if part_number == self.fail_part:
+                raise ConnectionError(f"Part {part_number} failed")
+            if (headers or {}).get("Content-Encoding") == "gzip":
+                data = gzip.decompress(data)
+            job_id = url.split("/")[-4]
+            self.jobs[job_id]["parts"][part_number] = pd.read_csv(io.BytesIO(data))
+        finally:
+            with self._lock:
+                self.uploading -= 1
+        return FakeResponse()
+
+    def get(self, url, params=None, stream=False, **kwargs):
+        if url.endswith("/download/"):
+            job = self.jobs[url.split("/")[-3]]
+            return FakeResponse(content=self.results(job).to_csv(index=False).encode())
+        job = self.jobs[url.split("/")[-2]]
+        status = "COMPLETED" if job["finalized"] else "INITIALIZING"
+        rows = sum(len(part) for part in job["parts"].values())
+        return FakeResponse(
+            {
+                "status": status,
+                "scoredRows": rows if job["finalized"] else 0,
+                "failedRows": 0,
+                "links": {"download": f"https://dr/{url.split('/')[-2]}/download/"},
+            }
+        )
+
+    def delete(self, url, **kwargs):
+        self.deleted.append(url.split("/")[-2])
+
+    def results(self, job):
+        uploaded = pd.concat(
+            [job["parts"][i] for i in sorted(job["parts"])], ignore_index=True
+        )
+        passthrough = job["settings"].get("passthrough_columns") or []
+        return uploaded[passthrough].assign(**{"ブリードアウト_True_PREDICTION": 0.25})
+
+
+class StubServer:
+    """Local HTTP/1.1 server recording request concurrency and client connections
+
+    Every request is answered with its path as JSON after `delay` seconds. `url`
+    is the API endpoint once the server is entered as a context manager.
+    """
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = []
+        self.connections = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def handle_request(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                with stub.lock:
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                    stub.requests.append((self.command, self.path, dict(self.headers)))
+                    stub.connections.add(self.client_address)
+                time.sleep(stub.delay)
+                with stub.lock:
+                    stub.in_flight -= 1
+                payload = json.dumps({"path": self.path}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PUT = do_DELETE = handle_request
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api/v2/"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeChallengerBackend:
+    """Challenger API of one deployment, raises when its slots are exceeded"""
+
+    def __init__(self, slots=5, delay=0.01, fail_names=()):
+        from starter.challengers import ExistingChallenger
+
+        self._challenger = ExistingChallenger
+        self._ids = itertools.count()
+        self.slots = slots
+        self.delay = delay
+        self.fail_names = set(fail_names)
+        self.lock = threading.Lock()
+        self.challengers = {}
+        self.created = []
+        self.creating = 0
+        self.max_creating = 0
+
+    def add(self, registered_model_version_id, name="existing"):
+        challenger_id = f"challenger-{next(self._ids)}"
+        self.challengers[challenger_id] = self._challenger(
+            id=challenger_id,
+            name=name,
+            registered_model_version_id=registered_model_version_id,
+        )
+        return challenger_id
+
+    def list(self, deployment_id):
+        with self.lock:
+            return list(self.challengers.values())
+
+    def create(
+        self,
+        deployment_id,
+        registered_model_version_id,
+        prediction_environment_id,
+        name,
+    ):
+        with self.lock:
+            self.creating += 1
+            self.max_creating = max(self.max_creating, self.creating)
+        try:
+            time.sleep(self.delay)
+            if name in self.fail_names:
+                raise ValueError(f"Could not create {name}")
+            with self.lock:
+                if len(self.challengers) >= self.slots:
+                    raise ValueError("Deployment has no free challenger slot")
+                self.created.append(name)
+                return self.add(registered_model_version_id, name)
+        finally:
+            with self.lock:
+                self.creating -= 1
@@ -0,0 +1,130 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# type: ignore
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from starter.accuracy import AccuracyStore, accuracy_decline
+from starter.drift_data import format_lot_ids
+
+
+@pytest.fixture
+def lots():
+    rng = np.random.default_rng(0)
+    n = 5000
+    return pd.DataFrame(
+        {
+            "ロット番号": format_lot_ids(10000, n),
+            # Bin centres, so the binned AUC has the same ties as the exact one
+            "probability": (rng.integers(0, 1000, n) + 0.5) / 1000,
+            "date_col": np.repeat(["2025-03-10", "2025-03-11"], n // 2),
+            "塗布長": rng.choice(["30m", "100m"], n),
+            "ブリードアウト": rng.random(n) < 0.3,
+        }
+    )
+
+
+def add(store, lots):
+    store.add_predictions(
+        lots["ロット番号"],
+        lots["probability"],
+        days=lots["date_col"],
+        segments={"塗布長": lots["塗布長"]},
+    )
+
+
+def exact_metrics(lots):
+    p, y = lots["probability"], lots["ブリードアウト"]
+    log_loss = -np.mean(np.where(y, np.log(p), np.log(1 - p)))
+    ranks = p.rank()
+    n_pos, n_neg = y.sum(), (~y).sum()
+    auc = (ranks[y].sum() - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg)
+    return log_loss, auc
+
+
+def test_index_grows_and_reopens(tmp_path, lots):
+    store = AccuracyStore(tmp_path, segment_attributes=["塗布長"])
+    for start in range(0, len(lots), 700):
+        add(store, lots.iloc[start : start + 700])
+    store.flush()
+
+    reopened = AccuracyStore(tmp_path)
+    assert AccuracyStore(tmp_path, segment_attributes=["塗布長"]).segments
+    with pytest.raises(ValueError, match="segmented by"):
+        AccuracyStore(tmp_path, segment_attributes=["種別"])
+    rows = reopened.lookup(lots["ロット番号"])
+    assert len(reopened) == len(lots)
+    assert sorted(rows) == list(range(len(lots)))
+    assert reopened.lookup(["SC9999999"]).tolist() == [-1]
+    np.testing.assert_array_equal(
+        reopened.columns["probability"][rows], lots["probability"]
+    )
+
+
+def test_incremental_join_matches_full_computation(tmp_path, lots):
+    store = AccuracyStore(tmp_path, segment_attributes=["塗布長"])
+    add(store, lots)
+    shuffled = lots.sample(frac=1, random_state=0)
+
+    for part in np.array_split(shuffled, 3):
+        matched = store.join_actuals(part["ロット番号"], part["ブリードアウト"])
+        assert matched == len(part)
+    report = store.report().set_index(["date", "segment", "value"])
+
+    for (date, length), group in lots.groupby(["date_col", "塗布長"]):
+        log_loss, auc = exact_metrics(group)
+        row = report.loc[(pd.Timestamp(date), "塗布長", length)]
+        assert row["rows"] == len(group)
+        assert row["logloss"] == pytest.approx(log_loss)
+        assert row["auc"] == pytest.approx(auc)
+    log_loss, auc = exact_metrics(lots[lots["date_col"] == "2025-03-10"])
+    assert report.loc[(pd.Timestamp("2025-03-10"), "", ""), "auc"] == pytest.approx(auc)
+    assert store.join_actuals(["SC9999999"], [True]) == 0
+
+
+def test_resubmitted_actuals_and_rescored_lots_replace(tmp_path, lots):
+    store = AccuracyStore(tmp_path, segment_attributes=["塗布長"])
+    add(store, lots)
+    store.join_actuals(lots["ロット番号"], ~lots["ブリードアウト"])
+    store.join_actuals(lots["ロット番号"], lots["ブリードアウト"].astype(str))
+    rescored = lots.assign(probability=0.5)
+    add(store, rescored.iloc[:100])
+    store.flush()
+
+    expected = pd.concat([rescored.iloc[:100], lots.iloc[100:]])
+    for report in (store.report(), AccuracyStore(tmp_path).report()):
+        overall = report[report["segment"] == ""].set_index("date")
+        log_loss, _ = exact_metrics(expected[expected["date_col"] == "2025-03-10"])
+        assert overall.loc["2025-03-10", "logloss"] == pytest.approx(log_loss)
+        assert overall["rows"].sum() == len(lots)
+
+
+def test_accuracy_decline():
+    report = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2025-03-10", "2025-03-11", "2025-03-12"]),
+            "segment": "",
+            "value": "",
+            "rows": 200,
+            "logloss": [0.25, 0.28, 0.4],
+            "auc": 0.7,
+        }
+    )
+
+    statuses = accuracy_decline(report, reference_logloss=0.25)
+
+    assert statuses["status"].tolist() == ["passing", "at risk", "failing"]
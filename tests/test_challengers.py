@@ -0,0 +1,97 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# type: ignore
+
+import pytest
+import yaml
+
+from starter.challengers import ChallengerManager, read_pending
+from tests.fakes import FakeChallengerBackend
+
+registered_ids = {f"retraining_dataset_{i}": f"version-{i}" for i in range(1, 7)}
+
+
+def manager(backend, state_path, **kwargs):
+    return ChallengerManager(
+        "deployment", "environment", state_path=state_path, backend=backend, **kwargs
+    )
+
+
+def test_interrupted_run_resumes_without_duplicates(tmp_path):
+    state_path = tmp_path / "challenger_state.yaml"
+    backend = FakeChallengerBackend(slots=10, fail_names={"retraining_dataset_2"})
+
+    with pytest.raises(ValueError, match="retraining_dataset_2"):
+        manager(backend, state_path, slots=10).create_bulk(registered_ids)
+
+    # Every success was checkpointed although the run failed
+    state = yaml.safe_load(state_path.read_text())
+    assert state["deployment_id"] == "deployment"
+    assert sorted(state["challengers"]) == sorted(
+        set(registered_ids) - {"retraining_dataset_2"}
+    )
+    assert backend.max_creating == 2
+
+    backend.fail_names.clear()
+    assert (
+        manager(backend, state_path, slots=10).create_bulk(registered_ids)
+        == registered_ids
+    )
+    assert sorted(backend.created) == sorted(registered_ids)
+
+    # Challengers created but not checkpointed are found on the deployment
+    state_path.unlink()
+    assert (
+        manager(backend, state_path, slots=10).create_bulk(registered_ids)
+        == registered_ids
+    )
+    assert len(backend.created) == len(registered_ids)
+    assert len(yaml.safe_load(state_path.read_text())["challengers"]) == 6
+
+
+def test_challengers_beyond_the_slot_limit_stay_pending(tmp_path):
+    state_path = tmp_path / "challenger_state.yaml"
+    backend = FakeChallengerBackend(slots=5)
+    unrelated = backend.add("version-0")
+
+    first = manager(backend, state_path, max_concurrency=4)
+    created = first.create_bulk(registered_ids)
+
+    assert len(created) == 4
+    assert len(backend.challengers) == 5
+    assert sorted(first.pending) == sorted(set(registered_ids) - set(created))
+    assert sorted(read_pending(state_path)) == sorted(first.pending)
+
+    # Slots freed since are used by the next run
+    del backend.challengers[unrelated]
+    second = manager(backend, state_path)
+    assert len(second.create_bulk(registered_ids)) == 5
+    assert len(second.pending) == 1
+    assert len(backend.created) == 5
+    assert read_pending(state_path) == second.pending
+    assert read_pending(tmp_path / "missing.yaml") == []
+
+
+def test_checkpoint_of_another_deployment_is_ignored(tmp_path):
+    state_path = tmp_path / "challenger_state.yaml"
+    manager(FakeChallengerBackend(), state_path).create_bulk(registered_ids)
+
+    other = ChallengerManager(
+        "other-deployment",
+        "environment",
+        state_path=state_path,
+        backend=FakeChallengerBackend(),
+    )
+    assert other.records == {}
@@ -0,0 +1,204 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# type: ignore
+
+import importlib
+import json
+import pickle
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from starter.custom_model import (
+    load_custom_hooks,
+    load_custom_model,
+    write_model_artifact,
+)
+from starter.paths import PROJECT_ROOT, custom_model_dir, default_training_data_path
+
+
+@pytest.fixture
+def hooks():
+    hooks = load_custom_hooks()
+    hooks._preprocessor = hooks.build_preprocessor(
+        None, hooks.load_imputation_values(str(custom_model_dir))
+    )
+    return hooks
+
+
+@pytest.fixture
+def training_data():
+    return pd.read_csv(default_training_data_path)
+
+
+def test_shipped_imputation_values_match_training_data(hooks, training_data):
+    assert (
+        hooks.fit_imputation_values(training_data)
+        == hooks._preprocessor.imputation_values
+    )
+
+
+def test_transform_fill_does_not_depend_on_batch(hooks, training_data):
+    row = training_data.drop(columns=[hooks.TARGET]).iloc[[0]].copy()
+    row["コーター部温度"] = np.nan
+
+    transformed = hooks.transform(row, None)
+
+    assert not transformed.isna().any().any()
+    assert transformed["コーター部温度"].iloc[0] == pytest.approx(
+        hooks._preprocessor.imputation_values["コーター部温度"]
+    )
+
+
+def test_transform_matches_preprocess(hooks):
+    data = pd.read_csv(PROJECT_ROOT / "assets" / "prediction_data.csv")
+    expected = hooks.preprocess(data.copy())[hooks.FEATURE_NAMES].fillna(
+        hooks._preprocessor.imputation_values
+    )
+
+    transformed = hooks.transform(data, None)
+
+    assert list(transformed.columns) == hooks.FEATURE_NAMES
+    assert (transformed.dtypes == np.float32).all()
+    np.testing.assert_allclose(transformed, expected.astype(np.float32))
+
+
+def test_transform_unknown_categories_stay_numeric(hooks):
+    data = pd.read_csv(PROJECT_ROOT / "assets" / "prediction_data.csv").head(3)
+    data.loc[0, "塗布長"] = "2000m"
+    data.loc[1, "種別"] = "新カテゴリ"
+
+    transformed = hooks.transform(data, None)
+
+    assert (transformed.dtypes == np.float32).all()
+    assert transformed.loc[0, "塗布長"] == 2000
+    assert transformed.loc[1, "種別"] == hooks._preprocessor.imputation_values["種別"]
+
+
+def test_declared_dtypes_score_like_inferred(hooks):
+    path = PROJECT_ROOT / "assets" / "prediction_data.csv"
+    inferred = pd.read_csv(path)
+
+    declared = hooks.read_input_data(path.read_bytes())
+
+    assert declared["塗布長"].dtype == "category"
+    assert declared["UV照度"].dtype == np.float32
+    assert (
+        declared.memory_usage(deep=True).sum()
+        < inferred.memory_usage(deep=True).sum() / 2
+    )
+    np.testing.assert_array_equal(
+        hooks.transform(declared, None), hooks.transform(inferred, None)
+    )
+
+
+@pytest.fixture
+def code_dir(tmp_path):
+    code_dir = tmp_path / "custom_model"
+    shutil.copytree(
+        custom_model_dir, code_dir, ignore=shutil.ignore_patterns("__pycache__")
+    )
+    return code_dir
+
+
+def test_model_artifact_scores_like_pickle(code_dir, training_data):
+    with open(code_dir / "clf_0.pkl", "rb") as f:
+        reference = pickle.load(f)
+    shutil.rmtree(code_dir / "clf_0.model")
+    write_model_artifact(code_dir)
+    hooks, model = load_custom_model(code_dir)
+    data = hooks.transform(training_data.drop(columns=[hooks.TARGET]), model)
+    # Unimputed values follow the branches the forest learned for them
+    data.iloc[::7, 2] = np.nan
+
+    assert type(model).__name__ == "CompactForest"
+    # Views of the read-only mapping of arrays.bin
+    assert not model.threshold.flags.owndata
+    assert not model.threshold.flags.writeable
+    np.testing.assert_allclose(
+        model.predict_proba(data), reference.predict_proba(data), rtol=1e-12
+    )
+    assert list(hooks.score(data, model).columns) == ["False", "True"]
+
+
+def test_model_artifact_scores_in_chunks_like_pickle(hooks, training_data):
+    model_artifact = importlib.import_module("model_artifact")
+    with open(custom_model_dir / "clf_0.pkl", "rb") as f:
+        reference = pickle.load(f)
+    model = model_artifact.load_forest(str(custom_model_dir / "clf_0.model"))
+    rows = 2 * model_artifact.PREDICT_CHUNK_ROWS + 17
+    data = hooks.transform(
+        training_data.drop(columns=[hooks.TARGET]).sample(
+            rows, replace=True, random_state=0
+        ),
+        model,
+    )
+    data.iloc[::5, 4] = np.nan
+
+    np.testing.assert_allclose(
+        model.predict_proba(data), reference.predict_proba(data), rtol=1e-12
+    )
+    assert model.predict_proba(data.iloc[:0]).shape == (0, 2)
+
+
+def test_shipped_model_artifact_is_current(code_dir):
+    hooks = load_custom_hooks(code_dir)
+
+    manifest = hooks.load_artifact_manifest(str(code_dir))
+
+    assert manifest is not None
+    assert manifest["imputation_values"] == hooks.load_imputation_values(str(code_dir))
+
+
+def test_stale_or_unknown_model_artifact(code_dir, caplog):
+    hooks = load_custom_hooks(code_dir)
+    # Retrained with the same hyperparameters, the pickle keeps its size
+    model_path = code_dir / "clf_0.pkl"
+    with open(model_path, "rb") as f:
+        threshold = pickle.load(f).estimators_[0].tree_.threshold[0]
+    old = np.float64(threshold).tobytes()
+    pickled = model_path.read_bytes()
+    assert old in pickled
+    model_path.write_bytes(pickled.replace(old, np.float64(threshold + 1).tobytes(), 1))
+
+    assert type(hooks.load_model(str(code_dir))).__name__ == "RandomForestClassifier"
+    assert "clf_0.model is stale" in caplog.text
+
+    with open(model_path, "ab") as f:
+        f.write(b"retrained")
+    assert hooks.load_artifact_manifest(str(code_dir)) is None
+
+    manifest_path = code_dir / "clf_0.model" / "manifest.json"
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    manifest_path.write_text(json.dumps({**manifest, "version": 99}), encoding="utf-8")
+    with pytest.raises(ValueError, match="Unsupported model artifact"):
+        hooks.load_model(str(code_dir))
+
+
+def test_load_model_warms_up(code_dir, monkeypatch):
+    hooks = load_custom_hooks(code_dir)
+    transformed = hooks.transform(hooks.synthetic_batch(20), None)
+    assert not transformed.isna().any().any()
+
+    monkeypatch.setenv(hooks.WARMUP_ROWS_ENV, "0")
+    hooks.load_model(str(code_dir))
+    assert hooks.readiness()["warmup_rows"] == 0
+
+    monkeypatch.delenv(hooks.WARMUP_ROWS_ENV)
+    hooks.load_model(str(code_dir))
+    assert hooks.readiness()["warmup_rows"] == hooks.DEFAULT_WARMUP_ROWS
+    assert hooks.readiness()["warmup_ms"] > 0
@@ -0,0 +1,85 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# type: ignore
+
+import pandas as pd
+import pytest
+
+from starter import dataset_cache, ingest
+from starter.dataset_cache import DatasetCache, get_or_create_dataset_from_file
+
+
+@pytest.fixture
+def uploads(monkeypatch):
+    uploaded = []
+
+    def fake_upload(**kwargs):
+        uploaded.append(pd.read_csv(kwargs["file_path"]))
+        return f"dataset-{len(uploaded)}"
+
+    monkeypatch.setattr(ingest.datasets, "get_or_create_dataset_from_file", fake_upload)
+    return uploaded
+
+
+def upload(cache, file_path, **kwargs):
+    return get_or_create_dataset_from_file(
+        endpoint="https://example.com/api/v2",
+        token="token",
+        file_path=file_path,
+        name="dataset",
+        cache=cache,
+        verify=False,
+        **kwargs,
+    )
+
+
+def double(df):
+    return df * 2
+
+
+def test_unchanged_file_skips_parse_and_upload(tmp_path, uploads, monkeypatch):
+    file_path = tmp_path / "data.csv"
+    file_path.write_text("a,b\n1,2\n")
+    cache = DatasetCache(tmp_path / "cache.json")
+
+    assert upload(cache, file_path) == "dataset-1"
+
+    def fail(*args, **kwargs):
+        raise AssertionError("file was read")
+
+    monkeypatch.setattr(ingest.pd, "read_csv", fail)
+    monkeypatch.setattr(dataset_cache, "file_sha256", fail)
+    assert upload(DatasetCache(tmp_path / "cache.json"), file_path) == "dataset-1"
+    assert len(uploads) == 1
+
+
+def test_content_and_preprocess_changes_upload_again(tmp_path, uploads):
+    file_path = tmp_path / "data.csv"
+    file_path.write_text("a,b\n1,2\n")
+    cache = DatasetCache(tmp_path / "cache.json")
+
+    assert upload(cache, file_path) == "dataset-1"
+    assert upload(cache, file_path, preprocess=double) == "dataset-2"
+    assert uploads[1]["a"].tolist() == [2]
+    assert upload(cache, file_path, extra_key=["2025-01-01"]) == "dataset-3"
+
+    file_path.write_text("a,b\n3,4\n")
+    assert upload(cache, file_path) == "dataset-4"
+    assert upload(cache, file_path, preprocess=double) == "dataset-5"
+    assert upload(cache, file_path, preprocess=double, chunk_rows=1) == "dataset-6"
+    assert upload(cache, file_path, chunk_rows=1) == "dataset-4"
+    assert upload(cache, file_path, preprocess=double) == "dataset-5"
+    assert upload(cache, file_path, preprocess=double, chunk_rows=1) == "dataset-6"
+    assert upload(cache, file_path, chunk_rows=1) == "dataset-4"
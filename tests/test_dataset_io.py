@@ -0,0 +1,102 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# type: ignore
+
+import pandas as pd
+import pytest
+
+from starter.dataset_io import (
+    column_names,
+    columnar_path,
+    iter_dataset_chunks,
+    read_dataset,
+)
+from starter.paths import PROJECT_ROOT, default_training_data_path
+
+
+@pytest.fixture(scope="module")
+def training_data():
+    return pd.read_csv(default_training_data_path)
+
+
+@pytest.mark.parametrize("name", ["train.csv", "prediction_data.csv"])
+@pytest.mark.parametrize("cache", [True, False])
+def test_csv_reads_match_read_csv(name, cache):
+    path = PROJECT_ROOT / "assets" / name
+    expected = pd.read_csv(path)
+
+    pd.testing.assert_frame_equal(read_dataset(path, cache=cache), expected)
+    chunks = list(iter_dataset_chunks(path, 700, cache=cache))
+    assert max(len(chunk) for chunk in chunks) == 700
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow", ".feather"])
+def test_columnar_formats_with_projection_and_dtypes(tmp_path, training_data, suffix):
+    path = tmp_path / f"train{suffix}"
+    if suffix == ".parquet":
+        training_data.to_parquet(path, index=False)
+    else:
+        training_data.to_feather(path)
+    columns = ["ロット番号", "塗布長", "ブリードアウト"]
+    expected = training_data[columns].astype({"ロット番号": "string"})
+
+    df = read_dataset(path, columns=columns, dtypes={"ロット番号": "string"})
+    chunks = iter_dataset_chunks(
+        path, 500, columns=columns, dtypes={"ロット番号": "string"}
+    )
+
+    assert column_names(path) == list(training_data.columns)
+    pd.testing.assert_frame_equal(df, expected)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+
+
+def test_conversion_is_reused_until_the_file_changes(
+    tmp_path, training_data, columnar_cache_dir
+):
+    path = tmp_path / "train.csv"
+    training_data.to_csv(path, index=False)
+
+    converted = columnar_path(path)
+    converted_at = converted.stat().st_mtime_ns
+    assert columnar_path(path) == converted
+    assert converted.stat().st_mtime_ns == converted_at
+
+    training_data.iloc[:10].to_csv(path, index=False)
+    refreshed = columnar_path(path)
+    assert refreshed != converted
+    assert not converted.exists()
+    assert len(read_dataset(path)) == 10
+    assert converted.parent == columnar_cache_dir
+
+
+@pytest.mark.parametrize("cache", [True, False])
+def test_csv_types_widen_for_later_blocks(tmp_path, columnar_cache_dir, cache):
+    # Later rows no longer fit the types inferred from the first block
+    path = tmp_path / "late.csv"
+    rows = 300_000
+    with open(path, "w") as f:
+        f.write("value,flag\n")
+        f.writelines(f"{i},true\n" for i in range(rows - 1))
+        f.write("1.5,maybe\n")
+
+    chunks = list(iter_dataset_chunks(path, 100_000, cache=cache))
+
+    assert [len(chunk) for chunk in chunks] == [100_000] * 3
+    df = pd.concat(chunks, ignore_index=True)
+    assert df["value"].dtype == "float64"
+    assert df["value"].iloc[-1] == 1.5
+    assert df["flag"].tolist()[-2:] == ["true", "maybe"]
+    assert not list(columnar_cache_dir.glob("*.tmp"))
@@ -0,0 +1,62 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# type: ignore
+
+import datetime
+
+import pandas as pd
+
+from starter.date_reanchor import DateReanchor
+from starter.ingest import write_preprocessed_csv_gz
+from starter.paths import PROJECT_ROOT
+
+prediction_data_path = PROJECT_ROOT / "assets" / "prediction_data.csv"
+anchor = datetime.date(2026, 1, 31)
+sample_start = datetime.date(2025, 3, 10)
+
+
+def make_stage(**kwargs):
+    return DateReanchor("date_col", "%Y-%m-%d", anchor=anchor, **kwargs)
+
+
+def test_chunked_shift_matches_whole_file(tmp_path):
+    original = pd.read_csv(prediction_data_path)
+    expected = pd.to_datetime(original["date_col"])
+    expected = expected + (pd.Timestamp(anchor) - expected.max())
+
+    output_path = tmp_path / "shifted.csv.gz"
+    write_preprocessed_csv_gz(
+        prediction_data_path,
+        output_path,
+        make_stage(only_if_starts_on=sample_start),
+        chunk_rows=500,
+    )
+    shifted = pd.read_csv(output_path)
+
+    assert shifted["date_col"].tolist() == expected.dt.strftime("%Y-%m-%d").tolist()
+    assert shifted["date_col"].max() == anchor.isoformat()
+    pd.testing.assert_frame_equal(
+        shifted.drop(columns="date_col"), original.drop(columns="date_col")
+    )
+
+
+def test_current_data_and_missing_dates_are_left_alone():
+    df = pd.DataFrame({"date_col": ["2025-04-01", None, "2025-04-03"], "x": [1, 2, 3]})
+
+    unchanged = make_stage(only_if_starts_on=sample_start)(df.copy())
+    pd.testing.assert_frame_equal(unchanged, df)
+
+    shifted = make_stage()(df.copy())
+    assert shifted["date_col"].tolist() == ["2026-01-29", None, "2026-01-31"]
@@ -0,0 +1,82 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# type: ignore
+
+import asyncio
+import logging
+
+import pytest
+import requests
+
+from starter.dr_client import AsyncDataRobot, gather_all, pool_connections, run
+from tests.fakes import StubServer
+
+
+@pytest.fixture
+def stub():
+    with StubServer() as server:
+        yield server
+
+
+def test_blocking_calls_overlap_on_a_pooled_session(stub, caplog):
+    # More threads than the default pool of 10 connections per host
+    session = pool_connections(requests.Session(), 16)
+
+    async def workflow():
+        async with AsyncDataRobot(max_concurrency=16) as drx:
+            await gather_all(
+                drx.call(session.get, f"{stub.url}datasets/{i}/") for i in range(48)
+            )
+
+    with caplog.at_level(logging.WARNING, logger="urllib3"):
+        asyncio.run(workflow())
+
+    assert stub.max_in_flight == 16
+    assert len(stub.connections) <= 16
+    # urllib3 closes connections returned to a full pool instead of keeping them
+    assert "pool is full" not in caplog.text
+
+
+def test_failed_call_raises_after_the_others_finish(stub):
+    def fail():
+        raise ValueError("upload failed")
+
+    async def workflow():
+        async with AsyncDataRobot(max_concurrency=4) as drx:
+            await gather_all(
+                [
+                    drx.call(fail),
+                    *(
+                        drx.call(requests.post, f"{stub.url}datasets/{i}/")
+                        for i in range(3)
+                    ),
+                ]
+            )
+
+    with pytest.raises(ValueError, match="upload failed"):
+        asyncio.run(workflow())
+    assert len(stub.requests) == 3
+
+
+def test_run_from_a_running_event_loop(stub):
+    async def workflow(drx):
+        responses = await gather_all([drx.call(requests.get, f"{stub.url}version/")])
+        return [r.json()["path"] for r in responses]
+
+    async def caller():
+        # e.g. a Pulumi apply calling a workflow function
+        return run(workflow)
+
+    assert asyncio.run(caller()) == ["/api/v2/version/"]
@@ -0,0 +1,111 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# type: ignore
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from starter.drift import (
+    DriftBaseline,
+    DriftTracker,
+    FeatureBins,
+    js_divergence,
+    psi,
+)
+from starter.drift_data import DriftScenario, iter_scenario_chunks, load_base_data
+from starter.paths import default_training_data_path
+
+
+@pytest.fixture(scope="module")
+def training_data():
+    return pd.read_csv(default_training_data_path)
+
+
+@pytest.fixture(scope="module")
+def baseline(training_data):
+    return DriftBaseline.fit(training_data)
+
+
+def test_divergences():
+    counts = np.array([10, 20, 70])
+
+    assert psi(counts, counts * 3) == pytest.approx(0)
+    assert js_divergence(counts, counts) == pytest.approx(0)
+    assert js_divergence(np.array([1, 0]), np.array([0, 1])) == pytest.approx(
+        1, abs=1e-2
+    )
+    assert psi(counts, np.array([70, 20, 10])) > 1
+
+
+def test_categorical_bins_unseen_and_missing():
+    bins = FeatureBins.fit("塗布長", pd.Series(["30m", "100m", "30m"]), 10, 25)
+
+    binned = bins.bin(pd.Series(["100m", "5m", None, "30m"]))
+
+    assert bins.categories.tolist() == ["100m", "30m"]
+    assert binned.tolist() == [0, 2, 3, 1]
+    assert bins.counts.tolist() == [1, 2, 0, 0]
+
+
+def test_baseline_round_trip(tmp_path, baseline, training_data):
+    path = tmp_path / "baseline.npz"
+    baseline.save(path)
+    loaded = DriftBaseline.load(path)
+
+    assert "ロット番号" not in loaded.features
+    assert list(loaded.features) == list(baseline.features)
+    for name, feature in baseline.features.items():
+        np.testing.assert_array_equal(loaded.features[name].counts, feature.counts)
+        np.testing.assert_array_equal(
+            loaded.features[name].bin(training_data[name]),
+            feature.bin(training_data[name]),
+        )
+
+
+def test_updates_are_incremental(baseline):
+    scenario = DriftScenario(days=4, rows_per_day=500)
+    data = pd.concat(iter_scenario_chunks(scenario, load_base_data()))
+    data.loc[data.index[:10], "date_col"] = None
+
+    whole = DriftTracker(baseline)
+    whole.update(data)
+    batched = DriftTracker(baseline)
+    for start in range(0, len(data), 300):
+        batched.update(data.iloc[start : start + 300])
+
+    pd.testing.assert_frame_equal(whole.report(), batched.report())
+    rows = whole.report().groupby("bucket", dropna=False)["rows"].max()
+    assert rows.tolist() == [490, 500, 500, 500, 10]
+
+
+def test_feature_drift_is_detected(baseline):
+    scenario = DriftScenario(days=7, rows_per_day=2000, label_flip_rates={})
+    tracker = DriftTracker(baseline)
+    for chunk in iter_scenario_chunks(scenario, load_base_data(), chunk_rows=5000):
+        tracker.update(chunk)
+
+    report = tracker.report()
+    drifted = report[report["drifted"]]
+    assert drifted[["bucket", "feature"]].values.tolist() == [
+        [pd.Timestamp("2025-03-16"), "塗布長"]
+    ]
+    assert set(tracker.report(by_bucket=False).columns) == {
+        "feature",
+        "rows",
+        "psi",
+        "js",
+        "drifted",
+    }
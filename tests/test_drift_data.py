@@ -0,0 +1,120 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# type: ignore
+
+import pandas as pd
+import pytest
+
+from starter.drift_data import (
+    DriftScenario,
+    FeatureDrift,
+    format_lot_ids,
+    iter_scenario_chunks,
+    load_base_data,
+    load_scenario,
+    write_scenario,
+)
+
+
+@pytest.fixture(scope="module")
+def base():
+    return load_base_data()
+
+
+def test_format_lot_ids_matches_zfill():
+    numbers = range(9_999_990, 10_000_010)
+    assert format_lot_ids(numbers.start, len(numbers)).tolist() == [
+        f"SC{str(n).zfill(7)}" for n in numbers
+    ]
+    assert format_lot_ids(10000, 0).tolist() == []
+
+
+def test_scenario_is_seeded_and_dated(base):
+    scenario = DriftScenario(days=3, rows_per_day=50)
+    first = pd.concat(iter_scenario_chunks(scenario, base, chunk_rows=40))
+    second = pd.concat(iter_scenario_chunks(scenario, base, chunk_rows=40))
+
+    pd.testing.assert_frame_equal(first, second)
+    assert first["ロット番号"].iloc[[0, -1]].tolist() == ["SC0010000", "SC0010149"]
+    assert first["date_col"].value_counts().to_dict() == {
+        "2025-03-10": 50,
+        "2025-03-11": 50,
+        "2025-03-12": 50,
+    }
+
+
+def test_label_flips_and_concept_drift(base):
+    scenario = DriftScenario(
+        days=2,
+        rows_per_day=20_000,
+        label_flip_rates={1: 0.5},
+        material_change_ratio=0.5,
+        feature_drifts=[],
+    )
+    original = DriftScenario(**{**scenario.model_dump(), "label_flip_rates": {}})
+    drifted = pd.concat(iter_scenario_chunks(scenario, base))
+    untouched = pd.concat(iter_scenario_chunks(original, base))
+    day = drifted["date_col"] == "2025-03-11"
+    flipped = drifted["ブリードアウト"] & ~untouched["ブリードアウト"]
+
+    assert not flipped[~day].any()
+    assert (drifted["塗布材料"][~day] == "A").all()
+    assert flipped[day].sum() == pytest.approx(
+        0.5 * (~untouched["ブリードアウト"][day]).sum(), rel=0.05
+    )
+    assert (drifted["塗布材料"][flipped] == "B").all()
+    assert (drifted["塗布材料"][day & ~flipped] == "B").any()
+
+
+def test_feature_drift_only_on_its_days(base):
+    scenario = DriftScenario(
+        days=3,
+        rows_per_day=1000,
+        feature_drifts=[FeatureDrift(days=[2], values=["5m"], probabilities=[1])],
+    )
+    data = pd.concat(iter_scenario_chunks(scenario, base))
+    lengths = data.groupby("date_col")["塗布長"].unique()
+
+    assert lengths["2025-03-12"].tolist() == ["5m"]
+    assert "5m" not in lengths["2025-03-10"]
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_write_scenario_with_actuals(tmp_path, base, suffix):
+    if suffix == ".parquet":
+        pytest.importorskip("pyarrow")
+    scenario = DriftScenario(days=2, rows_per_day=30)
+    output_path = tmp_path / f"prediction{suffix}"
+    actuals_path = tmp_path / f"actuals{suffix}"
+
+    rows = write_scenario(scenario, output_path, actuals_path, base, chunk_rows=25)
+
+    read = pd.read_csv if suffix == ".csv" else pd.read_parquet
+    prediction, actuals = read(output_path), read(actuals_path)
+    expected = pd.concat(iter_scenario_chunks(scenario, base, chunk_rows=25))
+    assert rows == len(prediction) == len(actuals) == 60
+    assert "ブリードアウト" not in prediction.columns
+    assert actuals.columns.tolist() == ["ロット番号", "ブリードアウト"]
+    assert actuals["ブリードアウト"].tolist() == expected["ブリードアウト"].tolist()
+
+
+def test_load_scenario_from_yaml(tmp_path):
+    path = tmp_path / "scenario.yaml"
+    path.write_text("days: 3\nlabel_flip_rates:\n  2: 0.3\n", encoding="utf-8")
+
+    scenario = load_scenario(path)
+
+    assert scenario.rows == 600
+    assert scenario.day_values(scenario.label_flip_rates).tolist() == [0, 0, 0.3]
@@ -0,0 +1,95 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# type: ignore
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+from starter import i18n
+from starter.i18n import LanguageCode, LocaleSettings, app_locale_env_name
+
+MESSAGE = "Submit"
+
+
+@pytest.fixture
+def locale_env(monkeypatch):
+    def set_locale(locale):
+        monkeypatch.setenv(app_locale_env_name, locale)
+        i18n.invalidate_translations()
+
+    yield set_locale
+    monkeypatch.delenv(app_locale_env_name, raising=False)
+    i18n.invalidate_translations()
+
+
+def test_catalog_is_loaded_once_per_locale(locale_env, monkeypatch):
+    locale_env(LanguageCode.JA)
+    LocaleSettings().setup_locale()
+    assert i18n.gettext(MESSAGE) == "送信"
+
+    def fail(*args):
+        pytest.fail("locale resolved again after the first message")
+
+    monkeypatch.setattr(i18n, "LocaleSettings", fail)
+    monkeypatch.setattr(i18n, "load_translations", fail)
+    for _ in range(100):
+        assert i18n.gettext(MESSAGE) == "送信"
+
+
+def test_invalidation_picks_up_locale_change(locale_env):
+    locale_env(LanguageCode.JA)
+    LocaleSettings().setup_locale()
+    assert i18n.gettext(MESSAGE) == "送信"
+
+    locale_env(LanguageCode.EN)
+    assert i18n.gettext(MESSAGE) == MESSAGE
+
+
+@pytest.fixture
+def locale_dir(tmp_path, monkeypatch):
+    source = Path(LocaleSettings().get_locale_dir()) / LanguageCode.JA.value
+    folder = tmp_path / LanguageCode.JA.value / "LC_MESSAGES"
+    folder.mkdir(parents=True)
+    shutil.copy(source / "LC_MESSAGES" / "base.po", folder / "base.po")
+    monkeypatch.setattr(LocaleSettings, "get_locale_dir", lambda self: str(tmp_path))
+    return folder
+
+
+def test_unchanged_catalog_is_not_recompiled(locale_dir):
+    assert i18n.compile_all_locales() == [LanguageCode.JA]
+    assert i18n.compile_all_locales() == []
+    assert i18n.compile_all_locales(force=True) == [LanguageCode.JA]
+
+    po_file = locale_dir / "base.po"
+    po_file.write_text(po_file.read_text(encoding="utf-8") + "\n", encoding="utf-8")
+    assert i18n.compile_all_locales() == [LanguageCode.JA]
+
+
+def test_read_only_folder_compiles_in_memory(locale_dir, locale_env, monkeypatch):
+    def read_only_open(file, mode="r", *args, **kwargs):
+        if "w" in mode:
+            raise PermissionError(file)
+        return open(file, mode, *args, **kwargs)
+
+    monkeypatch.setattr(i18n, "open", read_only_open, raising=False)
+    monkeypatch.setattr(i18n, "_in_memory_catalogs", {})
+    locale_env(LanguageCode.JA)
+    LocaleSettings().setup_locale()
+
+    assert not (locale_dir / "base.mo").exists()
+    assert i18n.gettext(MESSAGE) == "送信"
+    assert not i18n.compile_mo_from_po(str(locale_dir))
@@ -0,0 +1,95 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# type: ignore
+
+import os
+import subprocess
+import sys
+
+import yaml
+
+from benchmarks.bench_import_time import best_import_time, parse_importtime
+from starter.paths import PROJECT_ROOT
+
+# Cumulative import time of `starter.api` the app may spend at cold start. It is
+# about 1ms without the deferred libraries, which alone take over a second.
+API_IMPORT_BUDGET_US = 50_000
+DEFERRED_MODULES = {
+    "babel",
+    "datarobot",
+    "pydantic",
+    "starter.i18n",
+    "starter.resources",
+    "yaml",
+}
+
+
+def test_parse_importtime():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |     _io\n"
+        "import time:      2150 |       2270 |   starter.api\n"
+    )
+    assert parse_importtime(stderr) == {
+        "_io": (120, 120),
+        "starter.api": (2150, 2270),
+    }
+
+
+def test_api_import_stays_within_budget():
+    times = best_import_time("starter.api")
+
+    assert times["starter.api"][1] < API_IMPORT_BUDGET_US
+    assert not DEFERRED_MODULES & set(times)
+
+
+def test_settings_are_loaded_on_first_access(tmp_path):
+    settings = {
+        "registered_model_version_id": "version",
+        "registered_model_name": "model",
+        "use_case_id": "use-case",
+        "project_id": "project",
+        "model_id": "model",
+        "target": "ブリードアウト",
+        "training_dataset_id": "training",
+        "page_description": "",
+        "page_title": "",
+    }
+    with open(tmp_path / "train_model_output.import-test.yaml", "w") as f:
+        yaml.safe_dump(settings, f, allow_unicode=True)
+    script = (
+        "import sys; import starter.api as api; "
+        "assert 'yaml' not in sys.modules; "
+        "print(api.app_settings.use_case_id, api.deployment_id, api.scoring_dataset_id); "
+        "assert api.get_app_settings() is api.app_settings"
+    )
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(PROJECT_ROOT),
+        "PULUMI_STACK_CONTEXT": "import-test",
+        "DATAROBOT_DEPLOYMENT_ID": "deployment",
+        "DATAROBOT_DATASET_ID": "dataset",
+    }
+
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=tmp_path,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["use-case", "deployment", "dataset"]
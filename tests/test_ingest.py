@@ -0,0 +1,72 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# type: ignore
+
+import pandas as pd
+
+from starter.custom_model import load_coating_schema
+from starter.ingest import write_preprocessed_csv_gz
+from starter.paths import default_training_data_path
+
+
+def add_flag(df):
+    return df.assign(flag=df["ポンプ圧力"] > 0)
+
+
+def test_chunked_output_matches_whole_file(tmp_path):
+    chunked_path = tmp_path / "chunked.csv.gz"
+    whole_path = tmp_path / "whole.csv.gz"
+
+    rows = write_preprocessed_csv_gz(
+        default_training_data_path, chunked_path, chunk_rows=999
+    )
+    write_preprocessed_csv_gz(default_training_data_path, whole_path, chunk_rows=None)
+
+    expected = pd.read_csv(default_training_data_path)
+    assert rows == len(expected)
+    pd.testing.assert_frame_equal(pd.read_csv(chunked_path), expected)
+    pd.testing.assert_frame_equal(pd.read_csv(whole_path), expected)
+
+
+def test_output_is_reproducible(tmp_path):
+    first, second = tmp_path / "first.csv.gz", tmp_path / "second.csv.gz"
+    for path in (first, second):
+        write_preprocessed_csv_gz(
+            default_training_data_path, path, add_flag, chunk_rows=1000
+        )
+    assert first.read_bytes() == second.read_bytes()
+    assert "flag" in pd.read_csv(first).columns
+
+
+def test_columnar_input_matches_csv(tmp_path):
+    parquet_path = tmp_path / "train.parquet"
+    pd.read_csv(default_training_data_path).to_parquet(parquet_path, index=False)
+    from_csv, from_parquet = tmp_path / "csv.csv.gz", tmp_path / "parquet.csv.gz"
+
+    write_preprocessed_csv_gz(default_training_data_path, from_csv, add_flag)
+    write_preprocessed_csv_gz(parquet_path, from_parquet, add_flag, chunk_rows=999)
+
+    assert from_csv.read_bytes() == from_parquet.read_bytes()
+
+
+def test_declared_dtypes_do_not_change_output(tmp_path):
+    inferred, declared = tmp_path / "inferred.csv.gz", tmp_path / "declared.csv.gz"
+
+    write_preprocessed_csv_gz(default_training_data_path, inferred)
+    write_preprocessed_csv_gz(
+        default_training_data_path, declared, dtypes=load_coating_schema().DTYPES
+    )
+
+    assert inferred.read_bytes() == declared.read_bytes()
@@ -0,0 +1,108 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# type: ignore
+
+import json
+
+import pytest
+
+from starter.jobs import FAILED, LOST, QUEUED, SUCCEEDED, JobRunner, format_status
+
+target = "tests.test_jobs:workflow"
+
+
+def workflow(deployment_id, outcome):
+    print(f"Uploading data for {deployment_id}")
+    print("Training challengers...\n")
+    if outcome == "fail":
+        raise RuntimeError("Autopilot failed")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def spawned():
+    return []
+
+
+@pytest.fixture
+def runner(tmp_path, spawned):
+    return JobRunner(
+        tmp_path / "jobs",
+        spawn=lambda command, log_path: spawned.append(command),
+        clock=FakeClock(),
+        heartbeat_interval=1.0,
+    )
+
+
+def test_submitted_jobs_are_reconciled_instead_of_restarted(runner, spawned):
+    state = runner.submit("challengers", target, ["deployment", "ok"])
+    assert state.status == QUEUED
+    assert spawned[0][-4:] == ["--jobs-dir", str(runner.jobs_dir), "run", "challengers"]
+
+    # Still queued or running, a second `pulumi up` leaves it alone
+    runner.submit("challengers", target, ["deployment", "ok"])
+    assert len(spawned) == 1
+
+    state = runner.run("challengers")
+    assert state.status == SUCCEEDED
+    assert state.progress == "Training challengers..."
+    assert "Uploading data for deployment" in runner.log_path("challengers").read_text()
+    assert (
+        runner.submit("challengers", target, ["deployment", "ok"]).status == SUCCEEDED
+    )
+    assert len(spawned) == 1
+
+    # A new deployment is new work
+    runner.submit("challengers", target, ["new-deployment", "ok"])
+    assert len(spawned) == 2
+
+
+def test_failed_and_lost_jobs_are_resubmitted(runner, spawned):
+    runner.submit("prediction", target, ["deployment", "fail"])
+    state = runner.run("prediction")
+    assert state.status == FAILED
+    assert state.error == "RuntimeError: Autopilot failed"
+    assert "Traceback" in runner.log_path("prediction").read_text()
+    assert (
+        format_status(state)
+        == "prediction: failed after 0s - RuntimeError: Autopilot failed"
+    )
+
+    runner.submit("prediction", target, ["deployment", "fail"])
+    assert len(spawned) == 2
+
+    # The process never started, or died without recording a result
+    runner.clock.now += 10
+    assert runner.read("prediction").status == LOST
+    assert json.loads(runner.state_path("prediction").read_text())["status"] == QUEUED
+    runner.submit("prediction", target, ["deployment", "fail"])
+    assert len(spawned) == 3
+
+
+def test_detached_job_runs_to_completion(tmp_path):
+    runner = JobRunner(tmp_path / "jobs")
+    runner.submit("challengers", target, ["deployment", "ok"])
+
+    (state,) = runner.wait(poll_sec=0.1)
+
+    assert state.status == SUCCEEDED, runner.log_path("challengers").read_text()
+    assert state.progress == "Training challengers..."
@@ -0,0 +1,103 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# type: ignore
+
+import datetime
+
+import pandas as pd
+
+from starter.date_reanchor import DateReanchor
+from starter.local_intake import LocalFileBackend, score_local_files
+from starter.paths import PROJECT_ROOT
+from tests.fakes import FakeBatchPredictionClient
+
+prediction_data_path = PROJECT_ROOT / "assets" / "prediction_data.csv"
+passthrough = ["ロット番号", "date_col"]
+
+
+def test_parts_upload_concurrently_and_results_stream_to_files(tmp_path):
+    client = FakeBatchPredictionClient(put_delay=0.01)
+    backend = LocalFileBackend(client, upload_concurrency=3, chunk_rows=300)
+    intakes = {
+        suffix: {
+            "file_path": prediction_data_path,
+            "output_path": tmp_path / f"predictions.{suffix}",
+        }
+        for suffix in ("csv", "parquet")
+    }
+
+    results = score_local_files(
+        "deployment", intakes, backend=backend, passthrough_columns=passthrough
+    )
+
+    expected = pd.read_csv(prediction_data_path)
+    for job in client.jobs.values():
+        parts = [job["parts"][i] for i in sorted(job["parts"])]
+        assert len(parts) == 10
+        pd.testing.assert_frame_equal(pd.concat(parts, ignore_index=True), expected)
+        assert job["settings"]["intake_settings"]["multipart"]
+    assert 1 < client.max_uploading <= 3
+    assert [r.scored_rows for r in results] == [len(expected)] * 2
+    for predictions in (
+        pd.read_csv(tmp_path / "predictions.csv"),
+        pd.read_parquet(tmp_path / "predictions.parquet"),
+    ):
+        assert predictions[passthrough].equals(expected[passthrough])
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "predictions.csv",
+        "predictions.parquet",
+    ]
+
+
+def test_chunks_are_preprocessed_before_upload(tmp_path):
+    client = FakeBatchPredictionClient()
+    anchor = datetime.date(2026, 1, 31)
+    stage = DateReanchor("date_col", "%Y-%m-%d", anchor=anchor)
+
+    LocalFileBackend(client, chunk_rows=500, compress=False).score(
+        "deployment",
+        intake_settings={
+            "file_path": prediction_data_path,
+            "output_path": tmp_path / "predictions.csv",
+            "preprocess": stage,
+        },
+    )
+
+    (job,) = client.jobs.values()
+    uploaded = pd.concat(job["parts"].values())
+    # Fitted on the whole file, so every part is shifted by the same offset
+    assert uploaded["date_col"].max() == anchor.isoformat()
+    assert uploaded["date_col"].nunique() == 14
+
+
+def test_failed_part_aborts_the_job(tmp_path):
+    client = FakeBatchPredictionClient(fail_part=2)
+    backend = LocalFileBackend(client, chunk_rows=500)
+
+    (result,) = score_local_files(
+        "deployment",
+        {
+            "prediction_data": {
+                "file_path": prediction_data_path,
+                "output_path": tmp_path / "predictions.csv",
+            }
+        },
+        backend=backend,
+    )
+
+    assert result.status == "FAILED"
+    assert "Part 2" in result.status_details
+    assert client.deleted == ["job-0"]
+    assert not client.jobs["job-0"]["finalized"]
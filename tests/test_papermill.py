@@ -0,0 +1,98 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# type: ignore
+
+import nbformat
+import pytest
+import yaml
+
+from infra.common import papermill
+from infra.common.papermill import (
+    CELL_DURATIONS_KEY,
+    FINGERPRINT_KEY,
+    notebook_fingerprint,
+    run_notebook_if_changed,
+)
+
+
+@pytest.fixture
+def notebook(tmp_path):
+    nb_path = tmp_path / "nb.ipynb"
+    nb = nbformat.v4.new_notebook()
+    nb.cells = [
+        nbformat.v4.new_markdown_cell("# Train"),
+        nbformat.v4.new_code_cell("x = 1"),
+    ]
+    nbformat.write(nb, nb_path)
+    return nb_path
+
+
+@pytest.fixture
+def executions(monkeypatch, tmp_path):
+    executed = []
+
+    def fake_run_notebook(nb_path, output_path=None, parameters=None):
+        executed.append(nb_path)
+        with open(tmp_path / "output.yaml", "w") as f:
+            yaml.dump({"model_id": f"model-{len(executed)}"}, f)
+        return {"cell-1": 12.5}
+
+    monkeypatch.setattr(papermill, "run_notebook", fake_run_notebook)
+    return executed
+
+
+def test_fingerprint_covers_code_inputs_and_extra(notebook, tmp_path):
+    data = tmp_path / "train.csv"
+    data.write_text("a\n1\n")
+    fingerprint = notebook_fingerprint(notebook, input_paths=[data])
+    assert notebook_fingerprint(notebook, input_paths=[data]) == fingerprint
+
+    nb = nbformat.read(notebook, as_version=4)
+    nb.cells[0].source = "# Train the model"
+    nb.cells[1].outputs = [nbformat.v4.new_output("stream", text="1")]
+    nbformat.write(nb, notebook)
+    assert notebook_fingerprint(notebook, input_paths=[data]) == fingerprint
+
+    assert notebook_fingerprint(notebook, input_paths=[data], extra={"a": 1}) != (
+        fingerprint
+    )
+    data.write_text("a\n2\n")
+    assert notebook_fingerprint(notebook, input_paths=[data]) != fingerprint
+
+
+def test_notebook_runs_only_when_fingerprint_changes(notebook, tmp_path, executions):
+    output_path = tmp_path / "output.yaml"
+
+    assert run_notebook_if_changed(notebook, output_path, "a")
+    assert not run_notebook_if_changed(notebook, output_path, "a")
+    assert run_notebook_if_changed(notebook, output_path, "b")
+    assert len(executions) == 2
+
+    with open(output_path) as f:
+        outputs = yaml.safe_load(f)
+    assert outputs == {
+        "model_id": "model-2",
+        FINGERPRINT_KEY: "b",
+        CELL_DURATIONS_KEY: {"cell-1": 12.5},
+    }
+
+
+def test_outputs_without_fingerprint_are_adopted(notebook, tmp_path, executions):
+    output_path = tmp_path / "output.yaml"
+    output_path.write_text("model_id: existing\n")
+
+    assert not run_notebook_if_changed(notebook, output_path, "a")
+    assert not run_notebook_if_changed(notebook, output_path, "a")
+    assert executions == []
@@ -0,0 +1,65 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# type: ignore
+
+from starter.prediction_jobs import PredictionJobScheduler
+from tests.fakes import FakeBatchPredictionBackend
+
+
+def make_scheduler(backend, sleeps, **kwargs):
+    return PredictionJobScheduler(backend=backend, sleep=sleeps.append, **kwargs)
+
+
+def test_scheduler_bounds_jobs_in_flight():
+    backend = FakeBatchPredictionBackend()
+    sleeps = []
+    intakes = {f"dataset-{i}": {"rows": 10 * i, "polls": i % 3} for i in range(7)}
+
+    results = make_scheduler(backend, sleeps, max_in_flight=3).run(
+        "deployment", intakes
+    )
+
+    assert backend.max_running == 3
+    assert [r.key for r in results] == list(intakes)
+    assert all(r.succeeded for r in results)
+    assert [r.scored_rows for r in results] == [10 * i for i in range(7)]
+
+
+def test_scheduler_reports_failures_without_blocking_others():
+    backend = FakeBatchPredictionBackend()
+    intakes = {
+        "ok": {"rows": 5},
+        "failed": {"status": "FAILED", "rows": 3},
+        "rejected": {"status": "REJECTED"},
+    }
+
+    results = make_scheduler(backend, []).run("deployment", intakes)
+
+    assert [r.status for r in results] == ["COMPLETED", "FAILED", "FAILED"]
+    assert results[1].failed_rows == 3
+    assert results[2].job_id is None
+    assert "rejected" in results[2].status_details
+
+
+def test_scheduler_backs_off_while_jobs_run():
+    backend = FakeBatchPredictionBackend()
+    sleeps = []
+
+    make_scheduler(
+        backend, sleeps, poll_interval=1.0, max_poll_interval=4.0, backoff=2.0
+    ).run("deployment", {"slow": {"polls": 5}})
+
+    assert sleeps == [1.0, 2.0, 4.0, 4.0, 4.0]
+    assert backend.polls == 6
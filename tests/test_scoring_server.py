@@ -0,0 +1,129 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# type: ignore
+
+import json
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from starter.paths import PROJECT_ROOT
+from starter.scoring_server import ScoringServer, read_body
+
+pytest.importorskip("sklearn")
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    server = ScoringServer(("127.0.0.1", 0), workers=1, max_wait_ms=20)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def prediction_data():
+    return pd.read_csv(PROJECT_ROOT / "assets" / "prediction_data.csv")
+
+
+def request(url, body=None, content_type="text/csv"):
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": content_type})
+    with urllib.request.urlopen(req, timeout=30) as response:
+        return json.loads(response.read())
+
+
+def test_read_body_formats(prediction_data):
+    data = prediction_data.head(3)
+
+    from_csv = read_body(data.to_csv(index=False).encode(), "text/csv")
+    from_json = read_body(
+        data.to_json(orient="records", force_ascii=False).encode(),
+        "application/json; charset=utf-8",
+    )
+
+    pd.testing.assert_frame_equal(from_csv, data)
+    assert from_json["塗布長"].tolist() == data["塗布長"].tolist()
+    with pytest.raises(ValueError):
+        read_body(b"", "application/xml")
+
+
+def test_ready_reports_warmed_up_workers(server_url):
+    ready = request(f"{server_url}/ready")
+
+    assert len(ready["workers"]) == 1
+    assert ready["workers"][0]["class_labels"] == ["False", "True"]
+    assert ready["workers"][0]["warmup_rows"] > 0
+
+
+def test_ready_once_every_worker_has_loaded():
+    server = ScoringServer(("127.0.0.1", 0), workers=3)
+    try:
+        assert len({worker["pid"] for worker in server.workers}) == 3
+        assert all(worker["warmup_rows"] > 0 for worker in server.workers)
+    finally:
+        server.server_close()
+
+
+def test_predict_coalesces_concurrent_requests(server_url, prediction_data):
+    rows = [prediction_data.iloc[[i]].to_csv(index=False).encode() for i in range(20)]
+
+    with ThreadPoolExecutor(max_workers=20) as executor:
+        responses = list(
+            executor.map(lambda body: request(f"{server_url}/predict", body), rows)
+        )
+    stats = request(f"{server_url}/stats")
+
+    assert all(len(response["predictions"]) == 1 for response in responses)
+    assert set(responses[0]["predictions"][0]) == {"False", "True"}
+    assert stats["rows"] == 20
+    assert stats["batches"] < stats["requests"]
+    assert stats["p99_ms"] >= stats["p50_ms"] > 0
+
+
+def status_of(url, body, content_type="text/csv"):
+    try:
+        request(url, body, content_type)
+    except urllib.error.HTTPError as e:
+        return e.code
+    return 200
+
+
+def test_bad_request_fails_alone(server_url, prediction_data):
+    good = [prediction_data.iloc[[i]].to_csv(index=False).encode() for i in range(8)]
+    # Parsed without the declared dtypes, then fails in `transform`
+    unparsable = prediction_data.iloc[[0]].assign(UV照度="n/a")
+    missing_column = prediction_data.iloc[[0]].drop(columns=["UV照度"])
+    bodies = [(body, "text/csv") for body in good] + [
+        (
+            unparsable.to_json(orient="records", force_ascii=False).encode(),
+            "application/json",
+        ),
+        (missing_column.to_csv(index=False).encode(), "text/csv"),
+        (b"a,b\n1,2,3\n", "text/csv"),
+        (b"<rows/>", "application/xml"),
+    ]
+
+    with ThreadPoolExecutor(max_workers=len(bodies)) as executor:
+        statuses = list(
+            executor.map(lambda b: status_of(f"{server_url}/predict", *b), bodies)
+        )
+
+    assert statuses == [200] * len(good) + [422, 400, 400, 415]
@@ -0,0 +1,93 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# type: ignore
+
+import json
+
+import pytest
+
+from starter.stack_outputs import StackOutputCache, stack_context_env_name
+
+
+class FakePulumi:
+    def __init__(self):
+        self.calls = []
+        self.last_update = "2025-01-01T00:00:00Z"
+        self.outputs = {"DATAROBOT_DEPLOYMENT_ID": "deployment", "ports": [8080]}
+
+    def __call__(self, args):
+        self.calls.append(args[:2])
+        if args[:2] == ["stack", "ls"]:
+            return json.dumps(
+                [
+                    {"name": "other", "current": False},
+                    {"name": "dev", "current": True, "lastUpdate": self.last_update},
+                ]
+            )
+        if args[:2] == ["stack", "output"]:
+            return json.dumps(self.outputs)
+        raise AssertionError(args)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def pulumi(monkeypatch):
+    monkeypatch.delenv(stack_context_env_name, raising=False)
+    return FakePulumi()
+
+
+def make_cache(tmp_path, pulumi, clock, ttl=60):
+    return StackOutputCache(ttl=ttl, snapshot_dir=tmp_path, run=pulumi, clock=clock)
+
+
+def test_outputs_are_fetched_once_per_process(tmp_path, pulumi):
+    cache = make_cache(tmp_path, pulumi, Clock())
+
+    assert cache.stack_name() == "dev"
+    for _ in range(5):
+        outputs = cache.outputs()
+    assert outputs == {"DATAROBOT_DEPLOYMENT_ID": "deployment", "ports": "[8080]"}
+    assert pulumi.calls == [["stack", "ls"], ["stack", "output"]]
+
+
+def test_snapshot_is_reused_until_the_stack_is_updated(tmp_path, pulumi, monkeypatch):
+    clock = Clock()
+    make_cache(tmp_path, pulumi, clock).outputs()
+    pulumi.calls.clear()
+
+    # A new process with an unchanged stack only lists stacks
+    clock.now += 3600
+    assert make_cache(tmp_path, pulumi, clock).outputs()["ports"] == "[8080]"
+    assert pulumi.calls == [["stack", "ls"]]
+
+    # A fresh snapshot of a known stack needs no CLI call at all
+    monkeypatch.setenv(stack_context_env_name, "dev")
+    pulumi.calls.clear()
+    assert make_cache(tmp_path, pulumi, clock).outputs()["ports"] == "[8080]"
+    assert pulumi.calls == []
+
+    # An update invalidates the snapshot once its TTL has expired
+    clock.now += 3600
+    pulumi.last_update = "2025-01-02T00:00:00Z"
+    pulumi.outputs = {"ports": [9090]}
+    assert make_cache(tmp_path, pulumi, clock).outputs() == {"ports": "[9090]"}
+    assert pulumi.calls == [["stack", "ls"], ["stack", "output"]]
@@ -0,0 +1,96 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# type: ignore
+
+import json
+import threading
+import time
+
+import pytest
+
+from starter.timing import Tracer
+
+
+def test_phase_totals_count_nested_and_concurrent_spans_once():
+    tracer = Tracer()
+
+    @tracer.timed(phase="datasets")
+    def upload(delay):
+        time.sleep(delay)
+
+    def pipeline():
+        with tracer.span("pipeline", phase="datasets"):
+            upload(0.05)
+
+    threads = [threading.Thread(target=pipeline) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with pytest.raises(ValueError):
+        with tracer.span("run_notebook", phase="training"):
+            time.sleep(0.1)
+            raise ValueError
+
+    (training, datasets) = tracer.phase_totals()
+    assert training[0] == "training" and training[1] >= 0.1
+    # Three overlapping pipelines of 0.05s, each with a nested upload
+    assert datasets[0] == "datasets" and 0.05 <= datasets[1] < 0.1
+    assert [s.error for s in tracer.spans if s.name == "run_notebook"] == ["ValueError"]
+
+    summary = tracer.format_summary().splitlines()
+    assert summary[0].split() == [
+        "phase",
+        "/",
+        "span",
+        "calls",
+        "wall",
+        "s",
+        "max",
+        "s",
+        "cpu",
+        "s",
+        "errors",
+    ]
+    assert summary[1].split()[:2] == ["training", "1"]
+    assert summary[2].split()[:2] == ["run_notebook", "1"]
+    assert summary[2].split()[-1] == "1"
+    assert summary[3].split()[:2] == ["datasets", "6"]
+
+
+def test_chrome_trace_has_one_complete_event_per_span(tmp_path):
+    tracer = Tracer()
+    with tracer.span("prediction_and_upload_actual", phase="prediction"):
+        with tracer.span("get_or_create_dataset_from_file", phase="datasets"):
+            pass
+    tracer.add("Deployment", "resources", tracer.origin, tracer.origin + 2.5)
+
+    path = tracer.export_chrome_trace(tmp_path / "outputs" / "trace.json")
+
+    events = json.loads(path.read_text())["traceEvents"]
+    assert {e["ph"] for e in events} == {"X"}
+    by_name = {e["name"]: e for e in events}
+    outer = by_name["prediction_and_upload_actual"]
+    inner = by_name["get_or_create_dataset_from_file"]
+    assert (
+        outer["ts"] <= inner["ts"]
+        and inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+    )
+    assert by_name["Deployment"] == {
+        **by_name["Deployment"],
+        "cat": "resources",
+        "ts": 0,
+        "dur": 2500000,
+    }
@@ -0,0 +1,69 @@
+# Copyright 2024 DataRobot, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# type: ignore
+
+from types import SimpleNamespace
+
+from infra.common.urls import get_deployment_url
+from starter import api
+from starter.schema import AppSettings
+from starter.urls import url_builder
+
+ENDPOINT = "https://app.datarobot.com/api/v2"
+
+
+def test_url_builder():
+    urls = url_builder(ENDPOINT)
+    assert url_builder(ENDPOINT) is urls
+    assert url_builder(ENDPOINT + "/").base_url == urls.base_url
+    assert urls.use_case("u1") == "https://app.datarobot.com/usecases/u1/overview"
+    assert (
+        urls.project("p1", "m1") == "https://app.datarobot.com/projects/p1/models/m1/"
+    )
+    assert urls.deployment("d1") == "https://app.datarobot.com/deployments/d1/overview"
+    assert (
+        get_deployment_url("d1", ENDPOINT)
+        == "https://app.datarobot.com/console-nextgen/deployments/d1/"
+    )
+
+
+def test_get_app_urls_is_built_once(monkeypatch):
+    app_settings = AppSettings(
+        use_case_id="u1",
+        project_id="p1",
+        model_id="m1",
+        registered_model_name="registered",
+        registered_model_version_id="r1",
+        target="target",
+        training_dataset_id="t1",
+        page_description="",
+        page_title="",
+    )
+    monkeypatch.setattr(api, "_load_settings", lambda: (app_settings, "d1", "s1"))
+    calls = []
+
+    def get_client():
+        calls.append(1)
+        return SimpleNamespace(endpoint=ENDPOINT)
+
+    monkeypatch.setattr("starter.dr_client.get_client", get_client)
+    api.get_endpoint.cache_clear()
+    try:
+        urls = api.get_app_urls()
+        assert api.get_app_urls() is urls
+        assert len(calls) == 1
+        assert urls.deployment == "https://app.datarobot.com/deployments/d1/overview"
+    finally:
+        api.get_endpoint.cache_clear()